@@ -0,0 +1,336 @@
+"""Moteur d'analyse du tableau de bord, indépendant de l'interface.
+
+Une requête évalue un lot de métriques pour une spécification de filtres
+(FilterSpec) :
+
+- "rows", "people", "people:<col>", "counts:<col>", "distinct:<col>",
+  "periods", "pairs:<a>|<b>" : comptages des inscriptions ;
+- "heatmap" (SlotMatrix Jour × Horaires), "cross" (PairMatrix
+  Département × Activité) : matrices dérivées des comptages par couple ;
+- "attendance", "attendance:<activity|site>" : synthèse des présences.
+
+Sans autre filtre qu'un site, les comptages sont lus dans le cube
+d'agrégats (ou la base SQLite). Avec des filtres combinés, les lignes sont
+sélectionnées par l'index bitmap puis agrégées en une passe. Dans un lot,
+les résultats intermédiaires (inscriptions filtrées, couples étudiant ×
+colonne, synthèse des présences) ne sont calculés qu'une fois.
+"""
+import contextlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import db_suaps
+from attendance_suaps import get_index, rates_by
+from cube_suaps import ALL_SITES, PERIOD_COLUMN, PERIODS, STUDENT_KEY, value_counts
+from data_suaps import (
+    DATASETS, REGISTRATION_COLUMNS, cached, dataset_version, load_cube, load_dataset, load_filter_index,
+)
+from matrix_suaps import PairMatrix, SlotMatrix
+from timing_suaps import span
+
+
+class FilterSpec:
+    """Dataset and filters of an analytics query.
+
+    Attributes:
+        dataset: One of the keys of DATASETS.
+        filters: Dict of column -> tuple of retained values; unfiltered
+            columns ("Tous", None or no value) are left out.
+    """
+
+    def __init__(self, dataset, filters=None):
+        self.dataset = dataset
+        self.filters = {}
+        for column, value in (filters or {}).items():
+            if value is None or value == ALL_SITES:
+                continue
+            values = [value] if isinstance(value, str) or not np.iterable(value) else list(value)
+            if values:
+                self.filters[column] = tuple(sorted(str(v) for v in values))
+
+    @property
+    def site(self):
+        """The single selected site, or "Tous"."""
+        sites = self.filters.get("Site", ())
+        return sites[0] if len(sites) == 1 else ALL_SITES
+
+    @property
+    def site_only(self):
+        """True when the aggregate cube can answer (no filter but one site)."""
+        return set(self.filters) <= {"Site"} and len(self.filters.get("Site", ())) <= 1
+
+    def key(self):
+        """Hashable identity of the spec, for caches."""
+        return self.dataset, tuple(sorted(self.filters.items()))
+
+    @classmethod
+    def from_key(cls, key):
+        """Rebuild a spec from key()."""
+        dataset, filters = key
+        return cls(dataset, dict(filters))
+
+    def __repr__(self):
+        return f"FilterSpec({self.dataset!r}, {self.filters!r})"
+
+
+def _metric_columns(metric):
+    # Colonnes de l'export lues par une métrique
+    kind, _, argument = metric.partition(":")
+    if kind in ("counts", "distinct"):
+        return [argument]
+    if kind == "people":
+        return [STUDENT_KEY, argument] if argument else [STUDENT_KEY]
+    if kind == "pairs":
+        return argument.split("|")
+    return {"periods": [PERIOD_COLUMN], "heatmap": ["Jour", "Horaires"],
+            "cross": ["Département", "Activité"]}.get(kind, [])
+
+
+class Results:
+    """Metrics of one query, with the accessors used by the dashboard sections.
+
+    A metric missing from the batch is computed on first access, reusing the
+    intermediate results of the batch.
+
+    Attributes:
+        spec: FilterSpec of the query.
+        columns: Columns of the underlying export.
+    """
+
+    def __init__(self, engine, spec, columns):
+        self.spec = spec
+        self.columns = columns
+        self._engine = engine
+        self._values = {}
+        self._shared = {}
+
+    @property
+    def site(self):
+        return self.spec.site
+
+    def get(self, metric):
+        """Value of one metric (see the module docstring for the names)."""
+        if metric not in self._values:
+            self._values.update(self._engine._compute(self.spec, [metric], self._shared))
+        return self._values[metric]
+
+    def counts(self, column):
+        """Registrations per value of column, most frequent first."""
+        return self.get(f"counts:{column}")
+
+    def pairs(self, column_a, column_b, name="size"):
+        """Registrations per (column_a, column_b) pair, in a column called name."""
+        return self.get(f"pairs:{column_a}|{column_b}").rename(columns={"size": name})
+
+    def distinct(self, column):
+        """Number of distinct values of column."""
+        return self.get(f"distinct:{column}")
+
+    def people(self, by=None):
+        """Distinct people (student keys), optionally per value of a column."""
+        return self.get(f"people:{by}" if by else "people")
+
+    def periods(self):
+        """Registrations per period of the day (Matin / Après-midi / Soir)."""
+        return self.get("periods")
+
+    def rows(self):
+        """Number of registrations."""
+        return self.get("rows")
+
+    def heatmap(self):
+        """SlotMatrix of the registrations per Jour and Horaires."""
+        return self.get("heatmap")
+
+    def cross(self):
+        """PairMatrix of the registrations per Département and Activité."""
+        return self.get("cross")
+
+    def attendance(self, by=None):
+        """Attendance summary per register, or global rate per activity or site."""
+        return self.get(f"attendance:{by}" if by else "attendance")
+
+
+class Engine:
+    """Evaluate batches of dashboard metrics on the cube, the database or the store.
+
+    Attributes:
+        sqlite: Read site-level counts from the SQLite database instead of
+            the aggregate cube.
+    """
+
+    def __init__(self, sqlite=False):
+        self.sqlite = sqlite
+
+    def columns(self, spec):
+        """Columns of the export queried by spec."""
+        if self.sqlite:
+            return set(REGISTRATION_COLUMNS)
+        return set(load_cube(spec.dataset).columns)
+
+    def query(self, spec, metrics=()):
+        """Evaluate a batch of metrics in one pass.
+
+        Args:
+            spec: FilterSpec of the query.
+            metrics: Metric names; others can still be read from the result.
+
+        Returns:
+            A Results object.
+        """
+        results = Results(self, spec, self.columns(spec))
+        metrics = list(dict.fromkeys(metrics))
+        results._values.update(self._compute(spec, metrics, results._shared))
+        return results
+
+    def _compute(self, spec, metrics, shared):
+        values = {}
+        # Les matrices dérivent des comptages par couple, calculés une fois
+        derived = {"heatmap": "pairs:Jour|Horaires", "cross": "pairs:Département|Activité"}
+        base = [metric for metric in metrics if not metric.startswith(("attendance", *derived))]
+        base += [derived[metric] for metric in metrics if metric in derived and derived[metric] not in shared]
+        base = list(dict.fromkeys(base))
+        if spec.site_only:
+            counts = self._from_aggregates(spec, base)
+        else:
+            counts = self._from_frame(spec, base, shared)
+        for metric, value in counts.items():
+            if metric.startswith("pairs:"):
+                shared[metric] = value
+            values[metric] = value
+
+        for metric in metrics:
+            if metric == "heatmap":
+                with span("aggregate:heatmap"):
+                    values[metric] = SlotMatrix.from_frame(shared[derived[metric]], size="size")
+            elif metric == "cross":
+                with span("aggregate:cross"):
+                    values[metric] = PairMatrix.from_frame(shared[derived[metric]], layers=(), size="size")
+            elif metric.startswith("attendance"):
+                values[metric] = self._attendance(spec, metric, shared)
+        return {metric: values[metric] for metric in metrics}
+
+    def _from_aggregates(self, spec, metrics):
+        # Un site au plus : le cube (ou la base) a déjà tous les comptages
+        site = spec.site
+        # Connexion SQLite empruntée au pool le temps du lot
+        with db_suaps.connection() if self.sqlite else contextlib.nullcontext() as conn:
+            if self.sqlite:
+                dataset = db_suaps.dataset_name(spec.dataset)
+            else:
+                cube = load_cube(spec.dataset)
+            values = {}
+            for metric in metrics:
+                kind, _, argument = metric.partition(":")
+                with span(f"aggregate:{kind}", column=argument or None) as record:
+                    if self.sqlite:
+                        if kind == "counts":
+                            value = db_suaps.count_by(conn, dataset, argument, site)
+                        elif kind == "pairs":
+                            value = db_suaps.count_pairs(conn, dataset, *argument.split("|"), site)
+                        elif kind == "distinct":
+                            value = db_suaps.count_distinct(conn, dataset, argument, site)
+                        elif kind == "people":
+                            value = db_suaps.count_people(conn, dataset, site, argument or None)
+                        elif kind == "periods":
+                            value = db_suaps.count_periods(conn, dataset, site)
+                        elif kind == "rows":
+                            value = int(db_suaps.count_by(conn, dataset, "Site", site).sum())
+                        else:
+                            raise KeyError(metric)
+                    else:
+                        if kind == "counts":
+                            value = cube.counts(argument, site)
+                        elif kind == "pairs":
+                            value = cube.pairs(*argument.split("|"), site)
+                        elif kind == "distinct":
+                            value = cube.distinct(argument, site)
+                        elif kind == "people":
+                            value = cube.people(site, argument or None)
+                        elif kind == "periods":
+                            value = cube.periods(site)
+                        elif kind == "rows":
+                            value = cube.rows(site)
+                        else:
+                            raise KeyError(metric)
+                    record["rows"] = len(value) if isinstance(value, (pd.Series, pd.DataFrame)) else None
+                values[metric] = value
+        return values
+
+    def _frame(self, spec, columns, shared):
+        """Registrations matching spec, restricted to columns (shared by the batch)."""
+        frame = shared.get("frame")
+        if frame is not None and set(columns) <= set(frame.columns):
+            return frame
+        columns = sorted(set(columns) | (set(frame.columns) if frame is not None else set()))
+        csv_path = DATASETS[spec.dataset]
+
+        def select():
+            index = load_filter_index(spec.dataset)
+            indexed = {dim: values for dim, values in spec.filters.items() if dim in index.dimensions}
+            others = {dim: values for dim, values in spec.filters.items() if dim not in index.dimensions}
+            df = load_dataset(spec.dataset, columns + list(others))
+            df = df.take(index.rows(indexed))
+            # Colonnes sans bitmap : filtre classique sur les lignes déjà retenues
+            for dim, values in others.items():
+                df = df[df[dim].astype("string").isin(values).to_numpy()]
+            return df[[column for column in columns if column in df.columns]]
+
+        # Sous-ensemble partagé entre sessions, comme les exports du cache
+        with span("aggregate:filter", column=", ".join(spec.filters)):
+            frame = cached((os.path.abspath(csv_path), "filtered", spec.key()[1], tuple(columns)),
+                           dataset_version(spec.dataset), select)
+        shared["frame"] = frame
+        return frame
+
+    def _from_frame(self, spec, metrics, shared):
+        # Filtres combinés : une sélection de lignes, puis chaque métrique en une passe
+        # "rows" seul ne lit aucune colonne : la plus petite suffit à compter les lignes
+        columns = {column for metric in metrics for column in _metric_columns(metric)} or {"Site"}
+        df = self._frame(spec, columns, shared) if metrics else None
+        values = {}
+        for metric in metrics:
+            kind, _, argument = metric.partition(":")
+            with span(f"aggregate:{kind}", column=argument or None) as record:
+                if kind == "counts":
+                    value = value_counts(df[argument])
+                elif kind == "pairs":
+                    a, b = argument.split("|")
+                    value = df.groupby([a, b], observed=True).size().reset_index(name="size")
+                elif kind == "distinct":
+                    value = df[argument].nunique()
+                elif kind == "people" and argument:
+                    people = shared.get(metric)
+                    if people is None:
+                        people = shared[metric] = df[[STUDENT_KEY, argument]].drop_duplicates()
+                    value = value_counts(people[argument])
+                elif kind == "people":
+                    value = df[STUDENT_KEY].nunique()
+                elif kind == "periods":
+                    value = df[PERIOD_COLUMN].value_counts().reindex(PERIODS, fill_value=0)
+                    value.index = pd.CategoricalIndex(value.index, categories=PERIODS, name=PERIOD_COLUMN)
+                    value = value.sort_values(ascending=False, kind="stable")
+                elif kind == "rows":
+                    value = len(df)
+                else:
+                    raise KeyError(metric)
+                record["rows"] = len(value) if isinstance(value, (pd.Series, pd.DataFrame)) else None
+            values[metric] = value
+        return values
+
+    def _attendance(self, spec, metric, shared):
+        # Synthèse des feuilles de présence, lue une fois par lot
+        summary = shared.get("attendance")
+        if summary is None:
+            with span("aggregate:attendance"):
+                # Seules les feuilles des sites retenus sont lues
+                index = get_index()
+                entries = index.entries()
+                if "Site" in spec.filters:
+                    entries = entries[entries["site"].isin(spec.filters["Site"])]
+                summary = index.summary(set(entries["path"]))
+            shared["attendance"] = summary
+        _, _, by = metric.partition(":")
+        return rates_by(summary, by) if by else summary
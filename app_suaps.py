@@ -2,26 +2,45 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import sqlite3
+import numpy as np
+import base64
+import os
 import ssl
 from streamlit_extras.app_logo import add_logo
 
-# Định nghĩa theme color palette 
-COLORS = {
-    "primary": "#104C8D",       
-    "secondary": "#15A193",     
-    "accent": "#e28743",        
-    "neutral": "#78909C",       
-    "background": "#F5F7FA",    
-    "text": "#090D0F",          
-}
-
-# Color sequences cho các biểu đồ
-COLOR_SEQUENCE = [COLORS["primary"], COLORS["secondary"], COLORS["accent"], 
-                  "#7986CB", "#4DB6AC", "#FFB74D", "#BA68C8", "#4FC3F7"]
-
-# Color scales cho heatmap và continuous colors
-COLOR_SCALE = ["#BCE3FF", "#7CBFF7", "#42A5F5", "#1E88E5", "#1565C0"]
+import db_suaps
+from attendance_suaps import get_index
+from cube_suaps import STUDENT_KEY
+from ingest_suaps import start_watcher
+from warmup_suaps import start_warmup
+from data_suaps import (
+    DATASETS, SITE_CHOICES, cache_report, dataset_memory, dataset_version, file_fingerprint, load_compact,
+    load_filter_index,
+)
+from filter_suaps import FILTER_DIMENSIONS
+from analytics_suaps import Engine, FilterSpec
+from journey_suaps import load_transition, presence_patterns
+from explorer_suaps import EXPLORER_COLUMNS, PAGE_SIZES, page_count, page_frame, select_rows
+from search_suaps import ENTITY_COLUMNS, STUDENT_TYPE, load_search_index
+import sections_suaps
+from sections_suaps import COLORS, DATASET_SECTIONS
+from timing_suaps import finish_run, span, start_run
+
+# Backend optionnel : SUAPS_BACKEND=sqlite interroge data/suaps.db (python db_suaps.py)
+USE_SQLITE = os.environ.get("SUAPS_BACKEND") == "sqlite" and db_suaps.is_available()
+
+# Panneau de performance : SUAPS_DEBUG=1 ou ?debug=1 dans l'URL
+DEBUG_PANEL = os.environ.get("SUAPS_DEBUG") == "1"
+
+# Préchauffage en arrière-plan de toutes les vues jeu × site (SUAPS_WARMUP=0 pour désactiver)
+WARMUP = os.environ.get("SUAPS_WARMUP", "1") == "1"
+
+# Réingestion des exports modifiés toutes les SUAPS_WATCH_INTERVAL secondes, désactivée par
+# défaut : avec plusieurs serveurs, lancer plutôt un seul `python ingest_suaps.py --watch 60`.
+# Les caches suivent la version des données ; chaque run replanifie le préchauffage des
+# jeux réingérés par un autre processus (start_warmup())
+WATCH_INTERVAL = float(os.environ.get("SUAPS_WATCH_INTERVAL", "0"))
+WATCHER = start_watcher(WATCH_INTERVAL) if WATCH_INTERVAL > 0 else None
 
 def setting_web_attribute(page_title):
     """Set basic web attribute.
@@ -151,47 +170,79 @@ st.sidebar.title("Tableau de Bord")
 
 # Sidebar pour sélectionner le semestre ou l'événement
 st.sidebar.header("Sélectionnez le semestre")
+# Les exports importés avec bulk_suaps.py suivent les trois jeux d'origine
 option = st.sidebar.radio(
-    "Choisissez une option :", ["Semestre 1", "Semestre 2", "Événements"]
+    "Choisissez une option :", list(DATASETS)
 )
 
-# Chargement des données en fonction du choix
-if option == "Semestre 1":
-    DATA_PATH = "data/fixed_ses1.csv"
-elif option == "Semestre 2":
-    DATA_PATH = "data/fixed_ses2.csv"
-else:
-    DATA_PATH = "data/fixed_even.csv"
-
-# Load data
-df = pd.read_csv(DATA_PATH)
-# Load presence data (BASKET - LORIENT)
-df_confirme = pd.read_csv("data/presence_basket_confirme.csv")
-df_debutant = pd.read_csv("data/presence_basket_debutant.csv")
 
 # Site selection with improved styling
 VB_SPACE(1)
-selected_site = st.sidebar.selectbox("Sélectionnez le site :", ["Tous", "VANNES", "LORIENT"], index=0)
-
-if "Site" in df.columns and selected_site != "Tous":
-    df = df[df["Site"] == selected_site]
-
-# Header with banner style
-st.markdown(f"""
-<div style='background-color: {COLORS["primary"]}; padding: 1rem; border-radius: 10px; margin-bottom: 1rem;'>
-    <h1 style='color: white; text-align: center;'>Analyse du Service des Sports</h1>
-    <p style='color: white; text-align: center; font-style: italic;'>
-        {option} {f'- {selected_site}' if selected_site != 'Tous' else '- Tous les sites'}
-    </p>
-</div>
-""", unsafe_allow_html=True)
+selected_site = st.sidebar.selectbox("Sélectionnez le site :", SITE_CHOICES, index=0)
+
+# Filtres combinés : chaque valeur a sa bitmap dans l'index des filtres
+with st.sidebar.expander("Filtres"):
+    filter_index = load_filter_index(option)
+    selected_filters = {
+        dim: st.multiselect(dim, filter_index.values(dim), key=f"filter:{dim}")
+        for dim in FILTER_DIMENSIONS if dim != "Site" and dim in filter_index.dimensions
+    }
+
+run = start_run("app_suaps", option=option, site=selected_site, backend="sqlite" if USE_SQLITE else "cube")
+
+# Les sections interrogent le moteur d'analyse : cube (ou base) pour un site,
+# index bitmap et store dès qu'un autre filtre est choisi
+engine = Engine(sqlite=USE_SQLITE)
+spec = FilterSpec(option, {"Site": selected_site, **selected_filters})
+run.context["filters"] = spec.filters
+with span("load") as record:
+    columns = engine.columns(spec)
+    if not USE_SQLITE:
+        record["rows"] = engine.query(spec, ["rows"]).rows()
+
+# Version des données : clé des caches de section, change à chaque ré-export
+version = file_fingerprint(db_suaps.DB_PATH) if USE_SQLITE else dataset_version(option)
+
+
+def _array_size(value):
+    # Plotly peut stocker les tableaux numpy encodés en base64 ({"dtype", "bdata"})
+    if isinstance(value, dict) and "bdata" in value:
+        return len(base64.b64decode(value["bdata"])) // np.dtype(value["dtype"]).itemsize
+    return int(np.size(value))
+
+
+def chart_points(fig):
+    """Number of data points a figure sends to the browser."""
+    points = 0
+    for trace in fig.data:
+        for attr in ("z", "x", "values", "ids"):
+            if attr in trace and trace[attr] is not None:
+                points += _array_size(trace[attr])
+                break
+    return points
+
+
+def plotly_chart(name, fig, **kwargs):
+    """st.plotly_chart() timed as a "chart:<name>" span (serialization and send)."""
+    with span(f"chart:{name}", rows=chart_points(fig)):
+        st.plotly_chart(fig, **kwargs)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_section(section, spec_key, version):
+    """Figures and metrics of a section of sections_suaps.
+
+    The metrics of the section are evaluated by the engine in one batch for
+    the FilterSpec of spec_key; version only keys the cache.
+    """
+    metrics, compute, build = sections_suaps.SECTIONS[section]
+    return build(compute(engine.query(FilterSpec.from_key(spec_key), metrics)))
 
-# Tab structure with improved styling
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Vue d'ensemble", "📈 Statistiques Principales", 
-                                       "🔍 Analyse Avancée","👥 Analyse des Étudiants" ,"🏀 Présence BASKET - LORIENT", 
-                                       ])
 
-with tab1:
+def render_overview():
+    """Render the "Vue d'ensemble" section."""
+    with span("build:overview"):
+        figs = build_section("overview", spec.key(), version)
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
         st.markdown("""
@@ -199,10 +250,7 @@ with tab1:
             <h3 style='color: #1E88E5; margin-top: 0;'>Nombre Total d'Étudiants</h3>
         """, unsafe_allow_html=True)
         
-        if "Prénom" in df.columns and "Nom de famille" in df.columns:
-            total_students = df.drop_duplicates(subset=["Prénom", "Nom de famille"]).shape[0]
-        else:
-            total_students = df.shape[0]
+        total_students = figs["total_students"]
         st.markdown(f"<div class='metric-container'>{total_students}</div>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
         
@@ -211,26 +259,8 @@ with tab1:
             <h3 style='color: #1E88E5; margin-top: 0;'>Répartition par Groupement d'activités</h3>
         """, unsafe_allow_html=True)
         
-        if "Groupement d’activités" in df.columns:
-            groupement_counts = df["Groupement d’activités"].value_counts().reset_index()
-            groupement_counts.columns = ["Groupement d’activités", "Nombre d'étudiants"]
-            fig_groupement = px.bar(
-                groupement_counts, 
-                x="Groupement d’activités", 
-                y="Nombre d'étudiants",
-                text_auto=True,
-                color="Nombre d'étudiants",
-                color_continuous_scale=COLOR_SCALE
-            )
-            fig_groupement.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color=COLORS["text"]),
-                margin=dict(l=0, r=0, t=10, b=40),  
-                height=400,
-                autosize=True   
-            )
-            st.plotly_chart(fig_groupement, use_container_width=True,config={'responsive': True})
+        if "Groupement d’activités" in columns:
+            plotly_chart("groupement", figs["groupement"], use_container_width=True,config={'responsive': True})
         
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -241,7 +271,7 @@ with tab1:
             <h3 style='color: #1E88E5; margin-top: 0;'>Nombre d'Activités </h3>
         """, unsafe_allow_html=True)
         
-        st.markdown(f"<div class='metric-container'>{df['Activité'].nunique()}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-container'>{figs['activities']}</div>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
         
         st.markdown("""
@@ -249,22 +279,8 @@ with tab1:
             <h3 style='color: #1E88E5; margin-top: 0;'>Type d'inscription</h3>
         """, unsafe_allow_html=True)
         
-        if "Type d’inscription" in df.columns:
-            inscription_counts = df["Type d’inscription"].value_counts()
-            fig_inscription = px.pie(
-                values=inscription_counts.values,
-                names=inscription_counts.index,
-                color_discrete_sequence=COLOR_SEQUENCE,
-                hole=0.4
-            )
-            fig_inscription.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color=COLORS["text"]),
-                margin=dict(l=20, r=20, t=10, b=20),
-                legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5)
-            )
-            st.plotly_chart(fig_inscription, use_container_width=True)
+        if "Type d’inscription" in columns:
+            plotly_chart("inscription", figs["inscription"], use_container_width=True)
         
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -275,7 +291,7 @@ with tab1:
             <h3 style='color: #1E88E5; margin-top: 0;'>Nombre d'Enseignants</h3>
         """, unsafe_allow_html=True)
         
-        st.markdown(f"<div class='metric-container'>{df['Enseignant'].nunique()}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-container'>{figs['teachers']}</div>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
         
         st.markdown("""
@@ -283,28 +299,16 @@ with tab1:
             <h3 style='color: #1E88E5; margin-top: 0;'>Type de participants</h3>
         """, unsafe_allow_html=True)
         
-        if "Type" in df.columns:
-            df_unique = df.drop_duplicates(subset=["Prénom", "Nom de famille", "Type"])
-            type_counts = df_unique["Type"].value_counts()
-            fig_type = px.pie(
-                values=type_counts.values,
-                names=type_counts.index,
-                color_discrete_sequence=COLOR_SEQUENCE,
-                hole=0.4
-            )
-            fig_type.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color=COLORS["text"]),
-                margin=dict(l=20, r=20, t=10, b=20),
-                legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5)
-            )
-            st.plotly_chart(fig_type, use_container_width=True)
+        if "Type" in columns:
+            plotly_chart("type", figs["type"], use_container_width=True)
         
         st.markdown("</div>", unsafe_allow_html=True)
 
 
-with tab2:
+def render_stats():
+    """Render the "Statistiques Principales" section."""
+    with span("build:stats"):
+        figs = build_section("stats", spec.key(), version)
     st.markdown(f"""
     <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
         <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Statistiques Principales</h2>
@@ -321,24 +325,7 @@ with tab2:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Top Activités les Plus Populaires</h3>
         """, unsafe_allow_html=True)
         
-        top_activites = df["Activité"].value_counts().head(10).reset_index()
-        top_activites.columns = ["Activité", "Nombre d'inscriptions"]
-        fig = px.bar(
-            top_activites, 
-            x="Activité", 
-            y="Nombre d'inscriptions", 
-            text_auto=True,
-            color="Nombre d'inscriptions",
-            color_continuous_scale=COLOR_SCALE
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=10, b=80),
-            xaxis=dict(tickangle=-45)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("top_activites", figs["top_activites"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
         # Répartition des inscriptions par département
@@ -347,24 +334,7 @@ with tab2:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Répartition des Inscriptions par Département</h3>
         """, unsafe_allow_html=True)
         
-        departments = df["Département"].value_counts().reset_index()
-        departments.columns = ["Département", "Nombre d'inscriptions"]
-        departments = departments.sort_values(by="Nombre d'inscriptions", ascending=True)
-        fig = px.bar(
-            departments, 
-            y="Département", 
-            x="Nombre d'inscriptions",
-            color="Nombre d'inscriptions",
-            color_continuous_scale=COLOR_SCALE,
-            text_auto=True
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=10, b=40)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("departments", figs["departments"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
     # Répartition des inscriptions par jour
@@ -375,24 +345,7 @@ with tab2:
         """, unsafe_allow_html=True)
 
         
-        inscriptions_par_jour = df["Jour"].value_counts().reset_index()
-        inscriptions_par_jour.columns = ["Jour", "Nombre d'inscriptions"]
-        fig = px.bar(
-            inscriptions_par_jour, 
-            x="Jour", 
-            y="Nombre d'inscriptions", 
-            text_auto=True,
-            color="Nombre d'inscriptions",
-            color_continuous_scale=COLOR_SCALE
-        )
-        
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=10, b=40)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("jours", figs["jours"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
         # Répartition des inscriptions par site
@@ -401,26 +354,13 @@ with tab2:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Répartition des Inscriptions par Site</h3>
         """, unsafe_allow_html=True)
         
-        inscriptions_par_site = df["Site"].value_counts().reset_index()
-        inscriptions_par_site.columns = ["Site", "Nombre d'inscriptions"]
-        fig = px.bar(
-            inscriptions_par_site, 
-            x="Site", 
-            y="Nombre d'inscriptions",
-            text_auto=True,
-            color="Nombre d'inscriptions",
-            color_continuous_scale=COLOR_SCALE
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=10, b=40)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("sites", figs["sites"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
-with tab3:
+def render_advanced():
+    """Render the "Analyse Avancée" section."""
+    with span("build:advanced"):
+        figs = build_section("advanced", spec.key(), version)
     st.markdown(f"""
     <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
         <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Analyse Avancée</h2>
@@ -437,23 +377,7 @@ with tab3:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Distribution des Inscriptions par Niveau</h3>
         """, unsafe_allow_html=True)
         
-        niveau_dist = df["Niveau"].value_counts().reset_index()
-        niveau_dist.columns = ["Niveau", "Nombre d'inscriptions"]
-        fig = px.bar(
-            niveau_dist, 
-            x="Niveau", 
-            y="Nombre d'inscriptions",
-            text_auto=True,
-            color="Nombre d'inscriptions",
-            color_continuous_scale=COLOR_SCALE
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin_autoexpand=True
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("niveaux", figs["niveaux"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
         # Répartition par Horaires
@@ -462,28 +386,7 @@ with tab3:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Répartition des Inscriptions par Horaires</h3>
         """, unsafe_allow_html=True)
         
-        df["Période"] = pd.cut(pd.to_datetime(df["Horaires"].str[:5], format="%H:%M", errors='coerce').dt.hour,
-                               bins=[0, 12, 18, 24],
-                               labels=["Matin", "Après-midi", "Soir"],
-                               right=False)
-        horaires_dist = df["Période"].value_counts().reset_index()
-        horaires_dist.columns = ["Période", "Nombre d'inscriptions"]
-        fig = px.bar(
-            horaires_dist, 
-            x="Période", 
-            y="Nombre d'inscriptions",
-            text_auto=True,
-            color="Nombre d'inscriptions",
-            color_continuous_scale=COLOR_SCALE
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=10, b=40),
-            xaxis=dict(categoryorder='array', categoryarray=['Matin', 'Après-midi', 'Soir'])
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("periodes", figs["periodes"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
     with col2:
@@ -493,24 +396,7 @@ with tab3:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Top Enseignants les Plus Populaires</h3>
         """, unsafe_allow_html=True)
         
-        top_enseignants = df["Enseignant"].value_counts().head(10).reset_index()
-        top_enseignants.columns = ["Enseignant", "Nombre d'inscriptions"]
-        fig = px.bar(
-            top_enseignants, 
-            x="Enseignant", 
-            y="Nombre d'inscriptions",
-            text_auto=True,
-            color="Nombre d'inscriptions",
-            color_continuous_scale=COLOR_SCALE
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=10, b=80),
-            xaxis=dict(tickangle=-45)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("enseignants", figs["enseignants"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
         # Heatmap des Inscriptions par Jour et Heure
@@ -519,24 +405,21 @@ with tab3:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Heatmap des Inscriptions par Jour et Heure</h3>
         """, unsafe_allow_html=True)
         
-        heatmap_data = df.groupby(["Jour", "Horaires"]).size().reset_index(name="Nombre d'inscriptions")
-        fig = px.density_heatmap(
-            heatmap_data, 
-            x="Jour", 
-            y="Horaires", 
-            z="Nombre d'inscriptions", 
-            color_continuous_scale=COLOR_SCALE
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=10, b=40)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("heatmap", figs["heatmap"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
+
+    # Créneaux les plus chargés, lus dans la même matrice que la heatmap
+    st.markdown(f"""
+    <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-top: 20px;'>
+        <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Créneaux les Plus Chargés</h3>
+    """, unsafe_allow_html=True)
+    plotly_chart("creneaux", figs["creneaux"], use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
         
-with tab4:
+def render_students():
+    """Render the "Analyse des Étudiants" section."""
+    with span("build:students"):
+        figs = build_section("students", spec.key(), version)
     st.markdown(f"""
     <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
         <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Analyse des Étudiants - Département vs Activité</h2>
@@ -545,36 +428,14 @@ with tab4:
     """, unsafe_allow_html=True)
 
     # Vérifier si les colonnes Département et Activité existent
-    if "Département" in df.columns and "Activité" in df.columns:
+    if "Département" in columns and "Activité" in columns:
         st.markdown(f"""
         <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Répartition des Étudiants</h3>
         """, unsafe_allow_html=True)
         
         # Calculer les effectifs par Département et Activité
-        department_activity = df.groupby(["Département", "Activité"]).size().reset_index(name="Nombre d'étudiants")
-
-        # Créer le scatter plot avec taille ajustée
-        fig_scatter = px.scatter(
-            department_activity,
-            x="Département",
-            y="Activité",
-            size="Nombre d'étudiants",
-            color="Département",
-            hover_data=["Nombre d'étudiants"],
-            color_discrete_sequence=COLOR_SEQUENCE,
-            title="Répartition des Étudiants par Département et Activité"
-        )
-        
-        fig_scatter.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=40, r=40, t=50, b=80),
-            height=600
-        )
-
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        plotly_chart("scatter", figs["scatter"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
         
         
@@ -586,34 +447,7 @@ with tab4:
                 <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Top Départements</h3>
             """, unsafe_allow_html=True)
             
-            dept_counts = df["Département"].value_counts().head(8)
-            dept_df = pd.DataFrame({
-                "Département": dept_counts.index,
-                "Nombre d'inscriptions": dept_counts.values
-            })
-            dept_df = dept_df.sort_values(by="Nombre d'inscriptions", ascending=True)
-
-            fig_dept = px.bar(
-                dept_df,
-                x="Nombre d'inscriptions",
-                y="Département",
-                orientation='h',
-                color="Nombre d'inscriptions",
-                color_continuous_scale=COLOR_SCALE,
-                text_auto=True
-            )
-            
-            fig_dept.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color=COLORS["text"]),
-                margin=dict(l=20, r=40, t=10, b=20),
-                xaxis_title="Nombre d'étudiants",
-                yaxis_title="Département",
-                showlegend=False
-            )
-            
-            st.plotly_chart(fig_dept, use_container_width=True)
+            plotly_chart("departments", figs["departments"], use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
         with col2:
@@ -623,42 +457,271 @@ with tab4:
                 <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Marimekko Plot - Top Départements & Activités</h3>
             """, unsafe_allow_html=True)
             
-            top_departments = department_activity.groupby("Département")["Nombre d'étudiants"].sum().nlargest(10).index
-            top_activities = department_activity.groupby("Activité")["Nombre d'étudiants"].sum().nlargest(10).index
-
-            department_activity_filtered = department_activity[department_activity["Département"].isin(top_departments)]
-            department_activity_filtered = department_activity_filtered[department_activity_filtered["Activité"].isin(top_activities)]
-
-            # Créer le graphique Treemap (Marimekko)
-            fig_mosaic = px.treemap(
-                department_activity_filtered, 
-                path=["Département", "Activité"], 
-                values="Nombre d'étudiants",
-                color="Nombre d'étudiants",
-                color_continuous_scale="Blues",
-                title="Distribution des Inscriptions - Top Départements et Activités"
-            )
-
-            fig_mosaic.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color=COLORS["text"]),
-                margin=dict(l=20, r=20, t=50, b=20),
-                height=500
-            )
-            
-            st.plotly_chart(fig_mosaic, use_container_width=True)
+            plotly_chart("mosaic", figs["mosaic"], use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
 
     else:
         st.error("Les colonnes 'Département' et 'Activité' ne sont pas disponibles dans les données.")
 
         
-with tab5:
+def pager(key, total, default_size=PAGE_SIZES[1]):
+    """Page size and page number widgets; return (page, page_size).
+
+    The page number is clamped when the number of rows shrinks.
+    """
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Lignes par page", PAGE_SIZES, index=PAGE_SIZES.index(default_size),
+                                 key=f"{key}:size")
+    pages = page_count(total, page_size)
+    if st.session_state.get(f"{key}:page", 1) > pages:
+        st.session_state[f"{key}:page"] = pages
+    with col2:
+        page = st.number_input(f"Page (sur {pages})", min_value=1, max_value=pages, step=1, key=f"{key}:page")
+    with col3:
+        first = (page - 1) * page_size
+        st.caption(f"Lignes {min(first + 1, total)}–{min(first + page_size, total)} sur {total}")
+    return int(page), page_size
+
+
+def render_explorer():
+    """Render the "Inscriptions" section: sorted, filtered and paginated on the server."""
+    st.markdown(f"""
+    <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
+        <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Explorateur des Inscriptions</h2>
+        <p style='color: {COLORS["text"]};'>Inscriptions filtrées par la sidebar ; seule la page affichée est envoyée au navigateur.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        sort = st.selectbox("Trier par", ["(ordre de l'export)", *EXPLORER_COLUMNS], key="explorer:sort")
+    with col2:
+        descending = st.toggle("Décroissant", key="explorer:descending")
+    with span("build:explorer") as record:
+        rows = select_rows(spec, None if sort == "(ordre de l'export)" else sort, descending)
+        record["rows"] = len(rows)
+    page, page_size = pager("explorer", len(rows))
+    with span("build:explorer_page"):
+        frame = page_frame(option, rows, page, page_size)
+    st.dataframe(frame, hide_index=True, use_container_width=True)
+
+
+def render_search():
+    """Render the "Recherche" section: students, activities, teachers and places by fragment."""
+    st.markdown(f"""
+    <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
+        <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Recherche</h2>
+        <p style='color: {COLORS["text"]};'>Nom, prénom, courriel, activité, enseignant ou lieu, sans accents ni majuscules, dans tous les jeux de données.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        query = st.text_input("Rechercher", placeholder="ex. le goff, badminton, kerolay", key="search:query")
+    with col2:
+        kinds = st.multiselect("Types", [STUDENT_TYPE, *ENTITY_COLUMNS.values()], key="search:kinds")
+    if not query.strip():
+        return
+    with span("build:search", query=query) as record:
+        results = load_search_index().search(query, limit=50, kinds=kinds)
+        record["rows"] = len(results)
+    if results.empty:
+        st.info("Aucun résultat.")
+        return
+    st.dataframe(results.drop(columns=[STUDENT_KEY, "Score"]), hide_index=True, use_container_width=True)
+
+    # Inscriptions d'un étudiant trouvé, tous jeux de données confondus
+    students = results[results["Type"] == STUDENT_TYPE]
+    if students.empty:
+        return
+    labels = {f"{row['Libellé']} ({row['Détail']})": row[STUDENT_KEY] for _, row in students.iterrows()}
+    student = st.selectbox("Inscriptions de :", list(labels), key="search:student")
+    frames = []
+    for name in DATASETS:
+        compact = load_compact(name)
+        rows = np.flatnonzero(compact.frame([STUDENT_KEY])[STUDENT_KEY].to_numpy() == labels[student])
+        if len(rows):
+            frames.append(compact.take(rows, EXPLORER_COLUMNS).assign(**{"Jeu de données": name}))
+    if frames:
+        st.dataframe(pd.concat(frames, ignore_index=True), hide_index=True, use_container_width=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_journey(source, target, site, departments, versions):
+    """Figures and metrics of the "Parcours" section.
+
+    The join of the two datasets is shared by every session (load_transition);
+    versions only keys the cache.
+    """
+    patterns = presence_patterns(list(DATASETS), site, departments)
+    data = sections_suaps.journey_data(load_transition(source, target), site, departments, patterns)
+    return sections_suaps.journey_figures(data)
+
+
+def render_journey():
+    """Render the "Parcours" section: retention and transitions between two datasets."""
+    st.markdown(f"""
+    <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
+        <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Parcours des Étudiants</h2>
+        <p style='color: {COLORS["text"]};'>Étudiants retrouvés d'un jeu de données à l'autre, par site et département d'origine.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    options = list(DATASETS)
+    col1, col2 = st.columns(2)
+    with col1:
+        source = st.selectbox("De :", options, index=options.index(option), key="journey:source")
+    with col2:
+        targets = [name for name in options if name != source]
+        target = st.selectbox("Vers :", targets, key="journey:target")
+    departments = tuple(selected_filters.get("Département", ()))
+    with span("build:journey"):
+        figs = build_journey(source, target, selected_site, departments,
+                             tuple(dataset_version(name) for name in options))
+
+    col1, col2, col3, col4 = st.columns(4)
+    for col, label, key in [(col1, "Taux de rétention", "rate"), (col2, "Étudiants retenus", "retained"),
+                            (col3, "Départs", "churned"), (col4, "Arrivées", "new")]:
+        with col:
+            value = f"{figs[key]} %" if key == "rate" else figs[key]
+            st.markdown(f"""
+            <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
+                <h3 style='color: #1E88E5; margin-top: 0;'>{label}</h3>
+                <div class='metric-container'>{value}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.markdown(f"<h3 style='color: {COLORS['primary']};'>Statut des Étudiants</h3>", unsafe_allow_html=True)
+        plotly_chart("statuses", figs["statuses"], use_container_width=True)
+    with col2:
+        st.markdown(f"<h3 style='color: {COLORS['primary']};'>Parcours sur Tous les Jeux de Données</h3>",
+                    unsafe_allow_html=True)
+        plotly_chart("patterns", figs["patterns"], use_container_width=True)
+
+    st.markdown(f"<h3 style='color: {COLORS['primary']};'>Transitions {source} → {target} - Top Activités</h3>",
+                unsafe_allow_html=True)
+    plotly_chart("transitions", figs["transitions"], use_container_width=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_presence(path, activite, niveau_choice, version):
+    """Attendance table, register and figures of one presence export.
+
+    The version argument only keys the cache on the presence export.
+    """
+    # Feuille lue à la demande et convertie en table longue (étudiant, séance, statut)
+    register = get_index().register(path)
+    presence_df = register.session_stats()
+
+    genre_counts = register.gender_counts().reset_index()
+    genre_counts.columns = ["Sexe", "Nombre d'étudiants"]
+
+    fig_pie = px.pie(
+        genre_counts,
+        names="Sexe",
+        values="Nombre d'étudiants",
+        title="Répartition des Genres",
+        color_discrete_sequence=[COLORS["primary"], COLORS["accent"]],
+        hole=0.4
+    )
+    fig_pie.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color=COLORS["text"]),
+        margin=dict(l=20, r=20, t=30, b=20),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.2)
+    )
+
+    # Graphique de ligne pour la présence (trié par cours)
+    fig = px.line(
+        presence_df,
+        x="Cours",
+        y="Nombre d'étudiants présents",
+        title=f"Présence des Étudiants - {activite} ({niveau_choice})",
+        markers=True,
+        color_discrete_sequence=[COLORS["primary"]]
+    )
+
+    # Ajouter une ligne pour le taux de participation
+    fig.add_trace(
+        go.Scatter(
+            x=presence_df["Cours"],
+            y=presence_df["Taux de Participation (%)"],
+            name="Taux de Participation (%)",
+            yaxis="y2",
+            line=dict(color=COLORS["accent"], width=2, dash="dot"),
+            mode="lines+markers"
+        )
+    )
+
+    # Configurer le deuxième axe y
+    fig.update_layout(
+        yaxis2=dict(
+            title="Taux de Participation (%)",
+            overlaying="y",
+            side="right",
+            range=[0, 100],
+            ticksuffix="%"
+        ),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color=COLORS["text"]),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.2),
+        margin=dict(l=40, r=60, t=50, b=60),
+        hovermode="x unified"
+    )
+
+    figs = {"genres": fig_pie, "evolution": fig}
+
+    avg_presence_rate = presence_df["Taux de Participation (%)"].mean()
+
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=avg_presence_rate,
+        title={"text": f"Taux Moyen de Participation - {niveau_choice}"},
+        gauge={
+            "axis": {"range": [0, 100], "ticksuffix": "%"},
+            "bar": {"color": COLORS["primary"]},
+            "steps": [
+                {"range": [0, 50], "color": "#FFCDD2"},
+                {"range": [50, 75], "color": "#FFECB3"},
+                {"range": [75, 100], "color": "#C8E6C9"}
+            ],
+            "threshold": {
+                "line": {"color": COLORS["accent"], "width": 4},
+                "thickness": 0.75,
+                "value": avg_presence_rate
+            }
+        }
+    ))
+
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color=COLORS["text"]),
+        margin=dict(l=20, r=20, t=60, b=20),
+    )
+
+    figs["moyenne"] = fig
+    return presence_df, register, figs
+
+
+def render_presence():
+    """Render the "Présences" section."""
+    index = get_index()
+    entries = index.entries()
+    if entries.empty:
+        st.info("Aucune feuille de présence n'a été trouvée dans le dossier des données.")
+        return
+
+    activites = sorted(entries["activity"].unique())
+    default = activites.index("BASKET - LORIENT") if "BASKET - LORIENT" in activites else 0
+    activite = st.selectbox("Sélectionnez l'activité :", activites, index=default)
+
     st.markdown(f"""
     <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
-        <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Présence des Étudiants - BASKET - LORIENT</h2>
-        <p style='color: {COLORS["text"]};'>Analyse de la présence des étudiants aux cours de basket à Lorient.</p>
+        <h2 style='color: {COLORS["primary"]}; margin-top: 0;'>Présence des Étudiants - {activite}</h2>
+        <p style='color: {COLORS["text"]};'>Analyse de la présence des étudiants aux cours de l'activité, par niveau.</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -670,34 +733,18 @@ with tab5:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Données de Présence</h3>
         """, unsafe_allow_html=True)
 
-        # Choisir niveau (Débutant ou Confirmé)
-        niveau_choice = st.selectbox("Sélectionnez le niveau :", ["Débutant", "Confirmé"], index=0)
-
-        # Utiliser les données de présence
-        if niveau_choice == "Débutant":
-            df_basket = df_debutant[df_debutant["Activité"] == "BASKET - LORIENT"]
-        else:
-            df_basket = df_confirme[df_confirme["Activité"] == "BASKET - LORIENT"]
-
-        # Traiter les noms des colonnes de cours
-        original_cours_columns = [col for col in df_basket.columns if col.startswith("Cours n°")]
-        renamed_cours_columns = {col: "Cours " + col.split(" ")[1] for col in original_cours_columns}
-
-        # Renommer les colonnes
-        df_basket.rename(columns=renamed_cours_columns, inplace=True)
+        # Choisir le niveau parmi les feuilles de l'activité
+        niveaux = list(dict.fromkeys(entries.loc[entries["activity"] == activite, "level"]))
+        niveau_choice = st.selectbox("Sélectionnez le niveau :", niveaux, index=0)
+        # Plusieurs feuilles pour une même activité et un même niveau : choix du fichier
+        matches = index.find(activite, niveau_choice)
+        entry = matches[0]
+        if len(matches) > 1:
+            files = [os.path.basename(match["path"]) for match in matches]
+            entry = matches[files.index(st.selectbox("Feuille de présence :", files, index=0))]
 
-        # Compter les présences (Présent ou En retard considérés comme Présent)
-        presence_data = []
-        total_students = len(df_basket)
-
-        for col in renamed_cours_columns.values():
-            if col in df_basket.columns:
-                count_present = df_basket[col].isin(["Présent", "En retard"]).sum()
-                taux_participation = (count_present / total_students) * 100
-                presence_data.append([col, count_present, round(taux_participation, 2)])
-
-        presence_df = pd.DataFrame(presence_data, columns=["Cours", "Nombre d'étudiants présents", "Taux de Participation (%)"])
-        presence_df = presence_df.sort_values(by="Cours")
+        with span("build:presence"):
+            presence_df, register, figs = build_presence(entry["path"], activite, niveau_choice, entry["fingerprint"])
 
         # Styliser le tableau avec un thème cohérent
         st.dataframe(
@@ -733,20 +780,16 @@ with tab5:
         if selected_cours:
             st.subheader(f"Participants au {selected_cours}")
 
-            if selected_cours in df_basket.columns:
-                # Filtrer les étudiants présents ou en retard
-                participants = df_basket[df_basket[selected_cours].isin(["Présent", "En retard"])]
+            if selected_cours in set(register.sessions["Cours"]):
+                # Étudiants présents ou en retard, avec leur statut
+                participant_names = register.participants(selected_cours)
 
                 # Afficher la liste des étudiants avec un statut
-                if "Prénom" in participants.columns and "Nom de famille" in participants.columns:
-                    participant_names = participants[["Prénom", "Nom de famille", "Adresse de courriel", "Sexe"]]
-                    
-                    # Ajouter une colonne de statut
-                    participant_names["Statut"] = participants[selected_cours]
-                    
-                    # Appliquer un style cohérent aux données
+                if "Prénom" in participant_names.columns and "Nom de famille" in participant_names.columns:
+                    # Appliquer un style cohérent aux données, une page à la fois
+                    page, page_size = pager("participants", len(participant_names), PAGE_SIZES[0])
                     st.dataframe(
-                        participant_names,
+                        participant_names.iloc[(page - 1) * page_size:page * page_size],
                         column_config={
                             "Statut": st.column_config.TextColumn(
                                 "Statut",
@@ -784,28 +827,7 @@ with tab5:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Répartition des Genres</h3>
         """, unsafe_allow_html=True)
         
-        presence_df = presence_df.sort_values(by="Cours")
-        df_basket["Sexe"] = df_basket["Sexe"].replace({"F": "Femme", "M": "Homme"})
-
-        genre_counts = df_basket["Sexe"].value_counts().reset_index()
-        genre_counts.columns = ["Sexe", "Nombre d'étudiants"]
-
-        fig_pie = px.pie(
-            genre_counts, 
-            names="Sexe", 
-            values="Nombre d'étudiants",
-            title="Répartition des Genres",
-            color_discrete_sequence=[COLORS["primary"], COLORS["accent"]],
-            hole=0.4
-        )
-        fig_pie.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=20, r=20, t=30, b=20),
-            legend=dict(orientation="h", yanchor="bottom", y=-0.2)
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        plotly_chart("genres", figs["genres"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
         # Graphique d'évolution de présence
@@ -814,45 +836,7 @@ with tab5:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Évolution de la Présence</h3>
         """, unsafe_allow_html=True)
         
-        # Graphique de ligne pour la présence (trié par cours)
-        fig = px.line(
-            presence_df, 
-            x="Cours", 
-            y="Nombre d'étudiants présents",
-            title=f"Présence des Étudiants - BASKET - LORIENT ({niveau_choice})",
-            markers=True,
-            color_discrete_sequence=[COLORS["primary"]]
-        )
-        
-        # Ajouter une ligne pour le taux de participation
-        fig.add_trace(
-            go.Scatter(
-                x=presence_df["Cours"],
-                y=presence_df["Taux de Participation (%)"],
-                name="Taux de Participation (%)",
-                yaxis="y2",
-                line=dict(color=COLORS["accent"], width=2, dash="dot"),
-                mode="lines+markers"
-            )
-        )
-        
-        # Configurer le deuxième axe y
-        fig.update_layout(
-            yaxis2=dict(
-                title="Taux de Participation (%)",
-                overlaying="y",
-                side="right",
-                range=[0, 100],
-                ticksuffix="%"
-            ),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            legend=dict(orientation="h", yanchor="bottom", y=-0.2),
-            margin=dict(l=40, r=60, t=50, b=60),
-            hovermode="x unified"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("evolution", figs["evolution"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
         
         # Ajouter un graphique de type jauge pour le taux de présence moyen
@@ -861,41 +845,114 @@ with tab5:
             <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Taux de Présence Moyen</h3>
         """, unsafe_allow_html=True)
         
-        avg_presence_rate = presence_df["Taux de Participation (%)"].mean()
-        
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=avg_presence_rate,
-            title={"text": f"Taux Moyen de Participation - {niveau_choice}"},
-            gauge={
-                "axis": {"range": [0, 100], "ticksuffix": "%"},
-                "bar": {"color": COLORS["primary"]},
-                "steps": [
-                    {"range": [0, 50], "color": "#FFCDD2"},
-                    {"range": [50, 75], "color": "#FFECB3"},
-                    {"range": [75, 100], "color": "#C8E6C9"}
-                ],
-                "threshold": {
-                    "line": {"color": COLORS["accent"], "width": 4},
-                    "thickness": 0.75,
-                    "value": avg_presence_rate
-                }
-            }
-        ))
-        
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=COLORS["text"]),
-            margin=dict(l=20, r=20, t=60, b=20),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart("moyenne", figs["moyenne"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
-        
-        
+
+    # Vue transversale : toutes les feuilles de présence indexées
+    st.markdown(f"""
+    <div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px;'>
+        <h3 style='color: {COLORS["primary"]}; margin-top: 0;'>Taux de Présence Global</h3>
+    """, unsafe_allow_html=True)
+
+    # Le taux global lit toutes les feuilles : calculé seulement à la demande
+    if st.toggle(f"Calculer sur les {len(entries)} feuilles de présence", key="presence:overview"):
+        with span("build:presence_overview"):
+            overview = build_section("presence", FilterSpec(option).key(), tuple(entries["fingerprint"]))
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.markdown("**Par activité**")
+            plotly_chart("activity", overview["activity"], use_container_width=True)
+        with col2:
+            st.markdown("**Par site**")
+            plotly_chart("site", overview["site"], use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+def render_performance(run):
+    """Render the timing spans of the last run, the shared cache and the dataset footprints in the sidebar."""
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.markdown(f"**Run {run.id}** : {run.total_ms:.0f} ms")
+        spans = pd.DataFrame(run.spans, columns=["name", "kind", "parent", "start_ms", "ms", "rows"])
+        st.dataframe(spans.sort_values("start_ms"), hide_index=True, use_container_width=True)
+        report = cache_report()
+        st.markdown(f"**Cache partagé** : {report.attrs['total_mb']:.1f} / {report.attrs['budget_mb']:.0f} Mo")
+        st.dataframe(report, hide_index=True, use_container_width=True)
+        # Empreinte de chaque jeu de données : export brut vs schéma compact
+        memory = pd.DataFrame([
+            {"jeu": name, "lignes": usage.attrs["rows"], "étudiants": usage.attrs["students"],
+             "brut_mb": usage.attrs["raw_mb"], "compact_mb": usage.attrs["compact_mb"], "ratio": usage.attrs["ratio"]}
+            for name, usage in ((name, dataset_memory(name)) for name in DATASETS)])
+        st.markdown("**Mémoire par jeu de données**")
+        st.dataframe(memory, hide_index=True, use_container_width=True)
+        st.dataframe(dataset_memory(option), hide_index=True, use_container_width=True)
+        if WATCHER is not None:
+            status = WATCHER.status()
+            st.markdown(f"**Réingestion** : {status['runs']} passage(s), {status['ingested']} export(s), "
+                        f"dernier à {status['last_run'] or '-'}")
+            for error in status["errors"]:
+                st.caption(f"Réingestion : {error}")
+
+
+def warm_figures(option, site):
+    """Fill the figure caches of one view; run by the warm-up thread."""
+    version = file_fingerprint(db_suaps.DB_PATH) if USE_SQLITE else dataset_version(option)
+    spec_key = FilterSpec(option, {"Site": site}).key()
+    for section in DATASET_SECTIONS:
+        build_section(section, spec_key, version)
+    options = list(DATASETS)
+    others = [name for name in options if name != option]
+    if others:
+        build_journey(option, others[0], site, (), tuple(dataset_version(name) for name in options))
+
+
+def render_warmup(scheduler):
+    """Show the progress of the background warm-up in the sidebar while it runs."""
+    status = scheduler.status()
+    if status["state"] == "running" and status["total"]:
+        st.sidebar.progress(status["done"] / status["total"],
+                            text=f"Préchauffage des vues : {status['done']}/{status['total']}")
+    for error in status["errors"]:
+        st.sidebar.caption(f"Préchauffage : {error}")
+
+
+# Les vues sont préchauffées au démarrage du serveur, puis après chaque réingestion,
+# y compris faite par un autre processus
+if WARMUP:
+    render_warmup(start_warmup(sqlite=USE_SQLITE, tasks=[warm_figures]))
+
+# Header with banner style
+st.markdown(f"""
+<div style='background-color: {COLORS["primary"]}; padding: 1rem; border-radius: 10px; margin-bottom: 1rem;'>
+    <h1 style='color: white; text-align: center;'>Analyse du Service des Sports</h1>
+    <p style='color: white; text-align: center; font-style: italic;'>
+        {option} {f'- {selected_site}' if selected_site != 'Tous' else '- Tous les sites'}
+    </p>
+</div>
+""", unsafe_allow_html=True)
+
+# Navigation : seule la section affichée est calculée (st.tabs exécute les huit)
+SECTIONS = {
+    "📊 Vue d'ensemble": render_overview,
+    "📈 Statistiques Principales": render_stats,
+    "🔍 Analyse Avancée": render_advanced,
+    "👥 Analyse des Étudiants": render_students,
+    "🏀 Présences": render_presence,
+    "🔁 Parcours": render_journey,
+    "📋 Inscriptions": render_explorer,
+    "🔎 Recherche": render_search,
+}
+section = st.radio("Section", list(SECTIONS), horizontal=True, label_visibility="collapsed", key="section")
+run.context["section"] = section
+with span("section", section=section):
+    SECTIONS[section]()
+
 # Footer avec informations de copyright et version
 st.markdown(f"""
 <div style='background-color: {COLORS["primary"]}; padding: 15px; border-radius: 10px; margin-top: 20px; text-align: center;'>
     <p style='color: white; margin: 0;'>© 2025 - Analyse du Service des Sports | Université Bretagne Sud</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+run = finish_run()
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    render_performance(run)
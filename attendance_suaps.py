@@ -0,0 +1,337 @@
+"""Moteur de calcul des présences.
+
+Une feuille de présence exportée est large : une ligne par étudiant et une
+colonne "Cours n°… du <date>, <heure>" par séance. Elle est convertie une
+seule fois en table longue (étudiant, séance, statut) ; tous les indicateurs
+(présents par séance, taux, totaux par étudiant, répartition des statuts)
+sont ensuite des opérations groupées vectorisées.
+
+Les feuilles d'un répertoire sont indexées par activité, niveau et site ;
+une feuille n'est lue en entier que lorsqu'on la consulte.
+"""
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_suaps import SITES, cached, file_fingerprint, load_csv
+
+# Répertoire et motif des feuilles de présence exportées
+PRESENCE_DIR = "data"
+PRESENCE_PATTERN = re.compile(r"^presence_(.+)\.csv$")
+
+# Niveau lu dans le nom de fichier (presence_<activité>_<niveau>.csv), dans l'ordre d'affichage
+LEVELS = {"debutant": "Débutant", "intermediaire": "Intermédiaire", "confirme": "Confirmé"}
+
+# Lignes lues pour reconnaître l'activité d'une feuille à l'indexation
+INDEX_ROWS = 50
+
+
+# Statuts comptés comme une présence
+PRESENT_STATUSES = ["Présent", "En retard"]
+
+# Colonnes d'identité conservées pour chaque étudiant d'une feuille
+IDENTITY_COLUMNS = ["Prénom", "Nom de famille", "Adresse de courriel", "Sexe"]
+
+SESSION_PATTERN = re.compile(r"^Cours n°(\d+) du \w+ (\d{1,2}) (\w+) (\d{4}), (\d{1,2}):(\d{2})$")
+
+MONTHS = {
+    "janvier": 1, "février": 2, "mars": 3, "avril": 4, "mai": 5, "juin": 6,
+    "juillet": 7, "août": 8, "septembre": 9, "octobre": 10, "novembre": 11, "décembre": 12,
+}
+
+
+def session_columns(df):
+    """Return the "Cours n°…" columns of a presence export."""
+    return [col for col in df.columns if col.startswith("Cours n°")]
+
+
+def parse_sessions(columns):
+    """Describe the session columns of a presence export.
+
+    Args:
+        columns: "Cours n°16 du lundi 6 janvier 2025, 19:00" style headers.
+
+    Returns:
+        A DataFrame with one row per column (column, Cours, numero, date),
+        ordered by session number. Unparsable dates are NaT.
+    """
+    records = []
+    for col in columns:
+        label = "Cours " + col.split(" ")[1]
+        match = SESSION_PATTERN.match(col)
+        if match:
+            numero, day, month, year, hour, minute = match.groups()
+            date = pd.Timestamp(int(year), MONTHS.get(month.lower(), 1), int(day), int(hour), int(minute))
+            records.append((col, label, int(numero), date))
+        else:
+            digits = re.findall(r"\d+", col)
+            records.append((col, label, int(digits[0]) if digits else -1, pd.NaT))
+    sessions = pd.DataFrame(records, columns=["column", "Cours", "numero", "date"])
+    return sessions.sort_values("numero", kind="stable").reset_index(drop=True)
+
+
+class Register:
+    """Attendance register of one class, stored in long format.
+
+    Attributes:
+        students: One row per student of the register (identity columns).
+        sessions: One row per session (column, Cours, numero, date).
+        long: One row per (student, session) with a categorical status.
+    """
+
+    def __init__(self, students, sessions, long):
+        self.students = students
+        self.sessions = sessions
+        self.long = long
+
+    @classmethod
+    def from_export(cls, df, activity=None):
+        """Convert a wide presence export into a register.
+
+        Args:
+            df: Presence export with "Cours n°…" columns.
+            activity: Optional Activité value the rows are restricted to.
+        """
+        if activity is not None and "Activité" in df.columns:
+            df = df[df["Activité"] == activity]
+        df = df.reset_index(drop=True)
+        sessions = parse_sessions(session_columns(df))
+        students = df[[col for col in df.columns if col not in set(sessions["column"])]]
+
+        # Table longue : statut de chaque étudiant à chaque séance
+        n_students, n_sessions = len(df), len(sessions)
+        values = df[sessions["column"].tolist()].to_numpy(dtype=object).ravel(order="F")
+        long = pd.DataFrame({
+            "student": np.tile(np.arange(n_students, dtype=np.int32), n_sessions),
+            "session": pd.Categorical.from_codes(
+                np.repeat(np.arange(n_sessions, dtype=np.int16), n_students),
+                categories=sessions["Cours"], ordered=True),
+            "status": pd.Categorical(values),
+        })
+        long["present"] = long["status"].isin(PRESENT_STATUSES)
+        return cls(students, sessions, long)
+
+    def __len__(self):
+        return len(self.students)
+
+    def session_stats(self):
+        """Present students and participation rate of every session.
+
+        Returns:
+            A DataFrame (Cours, Nombre d'étudiants présents,
+            Taux de Participation (%)) ordered by session number. The rate is
+            computed over every student of the register.
+        """
+        present = self.long.groupby("session", observed=False)["present"].sum()
+        rate = (present / len(self) * 100).round(2) if len(self) else present * 0.0
+        return pd.DataFrame({
+            "Cours": present.index.astype(str),
+            "Nombre d'étudiants présents": present.to_numpy(dtype=np.int64),
+            "Taux de Participation (%)": rate.to_numpy(dtype=float),
+        })
+
+    def status_breakdown(self):
+        """Number of students per (session, status), one column per status."""
+        return (self.long.dropna(subset=["status"])
+                .groupby(["session", "status"], observed=False).size()
+                .unstack("status", fill_value=0))
+
+    def student_stats(self):
+        """Per-student totals: sessions attended, per-status counts and rate."""
+        counts = (self.long.dropna(subset=["status"])
+                  .groupby(["student", "status"], observed=False).size()
+                  .unstack("status", fill_value=0)
+                  .reindex(range(len(self)), fill_value=0))
+        attended = self.long.groupby("student")["present"].sum().reindex(range(len(self)), fill_value=0)
+        stats = self.students[[c for c in IDENTITY_COLUMNS if c in self.students.columns]].copy()
+        stats = stats.join(counts)
+        stats["Présences"] = attended.to_numpy()
+        n_sessions = len(self.sessions)
+        stats["Taux de Présence (%)"] = (attended.to_numpy() / n_sessions * 100).round(2) if n_sessions else 0.0
+        return stats
+
+    def participants(self, session):
+        """Students present (or late) at a session, with their status.
+
+        Args:
+            session: Session label (e.g. "Cours n°16").
+        """
+        long = self.long
+        rows = long[(long["session"] == session) & long["present"]]
+        columns = [c for c in IDENTITY_COLUMNS if c in self.students.columns]
+        participants = self.students.loc[rows["student"].to_numpy(), columns]
+        return participants.assign(Statut=rows["status"].astype(str).to_numpy())
+
+    def gender_counts(self):
+        """Students of the register per gender (Femme / Homme)."""
+        return self.students["Sexe"].replace({"F": "Femme", "M": "Homme"}).value_counts()
+
+
+def register_activity(activities):
+    """Return the activity of a register: the most frequent Activité value.
+
+    A presence export lists the students of one class, joined with all their
+    registrations, so other activities also appear in the Activité column.
+    """
+    counts = activities.dropna().value_counts()
+    return counts.index[0] if len(counts) else None
+
+
+def activity_site(activity):
+    """Return the site an activity takes place on, from its label."""
+    parts = [part.strip().upper() for part in str(activity).split(" - ")]
+    for part in reversed(parts):
+        if part in SITES:
+            return part
+    return "Inconnu"
+
+
+def file_level(path):
+    """Return the level encoded at the end of a presence file name."""
+    match = PRESENCE_PATTERN.match(os.path.basename(path))
+    token = match.group(1).rsplit("_", 1)[-1] if match else ""
+    return LEVELS.get(token.lower(), "Tous niveaux")
+
+
+class PresenceIndex:
+    """Index of the presence exports of a directory.
+
+    Scanning a directory only reads the Activité column of the first
+    INDEX_ROWS rows of new or changed files, so indexing costs the same
+    whatever the size of a register; a register is fully parsed the first
+    time it is requested and then kept in the shared cache of data_suaps
+    until its file changes.
+    """
+
+    def __init__(self, directory=PRESENCE_DIR):
+        self.directory = directory
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rescan the directory, indexing only new or changed files."""
+        with self._lock:
+            seen = set()
+            for item in os.scandir(self.directory):
+                if not item.is_file() or not PRESENCE_PATTERN.match(item.name):
+                    continue
+                path = item.path
+                seen.add(path)
+                fingerprint = file_fingerprint(path)
+                entry = self._entries.get(path)
+                if entry is not None and entry["fingerprint"] == fingerprint:
+                    continue
+                head = pd.read_csv(path, usecols=lambda c: c == "Activité", nrows=INDEX_ROWS)
+                activities = head.get("Activité")
+                activity = register_activity(activities) if activities is not None else None
+                self._entries[path] = {
+                    "path": path,
+                    "activity": activity or os.path.basename(path),
+                    "level": file_level(path),
+                    "site": activity_site(activity),
+                    "fingerprint": fingerprint,
+                }
+            for path in set(self._entries) - seen:
+                del self._entries[path]
+        return self
+
+    def entries(self):
+        """Indexed registers as a DataFrame (path, activity, level, site, fingerprint)."""
+        columns = ["path", "activity", "level", "site", "fingerprint"]
+        ranks = {level: rank for rank, level in enumerate(LEVELS.values())}
+        entries = sorted(self._snapshot(),
+                         key=lambda e: (e["activity"], ranks.get(e["level"], len(ranks)), e["level"]))
+        return pd.DataFrame(entries, columns=columns)
+
+    def _snapshot(self):
+        # Copie des entrées : refresh() peut les modifier depuis un autre thread
+        with self._lock:
+            return list(self._entries.values())
+
+    def find(self, activity, level=None):
+        """Return every entry of an activity (and level), sorted by path.
+
+        Several registers can share an activity and a level (e.g. two time
+        slots of the same class); the caller chooses among them.
+        """
+        return sorted((entry for entry in self._snapshot()
+                       if entry["activity"] == activity and (level is None or entry["level"] == level)),
+                      key=lambda entry: entry["path"])
+
+    def register(self, path):
+        """Return the Register of a file, parsing it on first request.
+
+        Args:
+            path: Path of an indexed presence export.
+
+        Raises:
+            KeyError: The file is not (or no longer) indexed.
+        """
+        with self._lock:
+            entry = self._entries[path]
+        return cached((os.path.abspath(path), "register", entry["activity"]), entry["fingerprint"],
+                      lambda: Register.from_export(load_csv(path), activity=entry["activity"]))
+
+    def summary(self, paths=None):
+        """Attendance totals of indexed registers.
+
+        Nothing is read at indexing time: the totals of a register are
+        computed the first time they are requested, from its parsed
+        Register, and shared until its file changes.
+
+        Args:
+            paths: Registers to summarize; every indexed register when None.
+
+        Returns:
+            A DataFrame with one row per register: activity, level, site,
+            students, sessions, presences and the global rate (presences over
+            students × sessions, i.e. the mean of the session rates).
+        """
+        records = []
+        for entry in self.entries().to_dict("records"):
+            if paths is not None and entry["path"] not in paths:
+                continue
+            register = self.register(entry["path"])
+            presences = int(register.long["present"].sum())
+            slots = len(register) * len(register.sessions)
+            records.append({
+                "activity": entry["activity"], "level": entry["level"], "site": entry["site"],
+                "students": len(register), "sessions": len(register.sessions),
+                "presences": presences, "slots": slots,
+            })
+        summary = pd.DataFrame(records, columns=["activity", "level", "site", "students",
+                                                 "sessions", "presences", "slots"])
+        summary["rate"] = _rate(summary["presences"], summary["slots"])
+        return summary
+
+
+def rates_by(summary, column):
+    """Global attendance rate per value of a column of summary().
+
+    Args:
+        summary: Frame returned by PresenceIndex.summary(), possibly filtered.
+        column: "activity" or "site".
+    """
+    totals = summary.groupby(column)[["presences", "slots"]].sum()
+    totals["rate"] = _rate(totals["presences"], totals["slots"])
+    return totals.sort_values("rate", ascending=False)
+
+
+def _rate(presences, slots):
+    return (presences / slots.where(slots > 0) * 100).round(2).fillna(0.0)
+
+
+_index = None
+_index_guard = threading.Lock()
+
+
+def get_index(directory=PRESENCE_DIR):
+    """Return the process-wide presence index, refreshed."""
+    global _index
+    with _index_guard:
+        if _index is None or _index.directory != directory:
+            _index = PresenceIndex(directory)
+    return _index.refresh()
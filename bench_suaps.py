@@ -0,0 +1,232 @@
+"""Benchmark des chemins de données du tableau de bord.
+
+Les chemins de données du tableau de bord (lecture, index des filtres,
+requêtes du moteur analytics_suaps, fonctions *_data des sections, cube,
+présences) sont exécutés sans interface sur les exports de data/ puis sur
+des copies agrandies (10×, 100× par défaut). La copie est inscrite comme jeu
+de données le temps de la mesure, de sorte que le moteur la lit par le même
+cache et le même store que l'application. Le temps et la mémoire de chaque
+étape sont affichés et ajoutés à bench/results.jsonl pour comparer les
+exécutions entre elles :
+
+- peak_mb : pic du tas Python (tracemalloc) ;
+- arrow_mb : mémoire Arrow retenue après l'étape (pyarrow), invisible de
+  tracemalloc ;
+- rss_mb : hausse du pic de mémoire résidente du processus.
+
+    python bench_suaps.py                       # 1×, 10×, 100× sur Semestre 1
+    python bench_suaps.py --scales 1 10 --repeat 5
+    python bench_suaps.py --compare             # écart avec l'exécution précédente
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import tempfile
+import time
+import sys
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+from analytics_suaps import Engine, FilterSpec
+from attendance_suaps import Register
+from cube_suaps import build_cube, slot_columns
+from data_suaps import (
+    DATASETS, clear_cache, cube_path, ingest_csv, load_compact, load_cube, load_dataset, store_path,
+)
+from filter_suaps import FILTER_DIMENSIONS, FilterIndex
+from schema_suaps import CompactFrame
+from sections_suaps import DATASET_SECTIONS, SECTIONS, section_metrics
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure de la mémoire résidente
+    resource = None
+
+RESULTS_PATH = "bench/results.jsonl"
+PRESENCE_PATH = "data/presence_basket_debutant.csv"
+
+
+def scale_frame(df, factor):
+    """Replicate a registration frame factor times with distinct students.
+
+    Each copy gets its own student numbers and family names, so distinct
+    counts grow with the data instead of collapsing onto the original rows.
+    """
+    if factor == 1:
+        return df
+    copies = []
+    for k in range(factor):
+        copy = df.copy()
+        if k:
+            if "Numéro étudiant" in copy.columns:
+                copy["Numéro étudiant"] = copy["Numéro étudiant"] + k * 10_000_000
+            for col in ("Nom de famille", "Adresse de courriel"):
+                if col in copy.columns:
+                    copy[col] = copy[col].astype("string") + f"~{k}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def _max_rss_mb():
+    # Pic de mémoire résidente du processus (Ko sous Linux, octets sous macOS)
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def measure(func, repeat):
+    """Run func repeat times; return (best seconds, memory of the first run, result).
+
+    The memory is a dict: peak_mb (Python heap, tracemalloc), arrow_mb
+    (Arrow buffers still allocated after the run) and rss_mb (growth of the
+    resident peak of the process, 0 when below an earlier peak).
+    """
+    best, memory, result = float("inf"), {}, None
+    for i in range(repeat):
+        gc.collect()
+        if i == 0:
+            arrow_before, rss_before = pa.total_allocated_bytes(), _max_rss_mb()
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+        if i == 0:
+            memory = {"peak_mb": tracemalloc.get_traced_memory()[1] / 1e6,
+                      "arrow_mb": (pa.total_allocated_bytes() - arrow_before) / 1e6,
+                      "rss_mb": _max_rss_mb() - rss_before}
+            tracemalloc.stop()
+    return best, memory, result
+
+
+def attendance(register_df):
+    register = Register.from_export(register_df)
+    return register.session_stats(), register.student_stats(), register.status_breakdown()
+
+
+def run_scale(source, factor, repeat, site, workdir):
+    """Benchmark every stage on one scaled copy of the source export."""
+    base = scale_frame(pd.read_csv(source), factor)
+    csv_path = os.path.join(workdir, f"bench_x{factor}.csv")
+    base.to_csv(csv_path, index=False)
+    # La copie passe par le store et le cache de l'application, le temps de la mesure
+    ingest_csv(csv_path)
+    parquet_path = store_path(csv_path)
+    option = f"bench x{factor}"
+    DATASETS[option] = csv_path
+
+    presence = pd.read_csv(PRESENCE_PATH)
+    presence = pd.concat([presence] * factor, ignore_index=True)
+
+    site_spec = FilterSpec(option, {"Site": site})
+    filtered_spec = FilterSpec(option, {"Site": site, "Jour": ["lundi", "jeudi"], "Type d’inscription": "libre"})
+    metrics = section_metrics(DATASET_SECTIONS)
+    holder = {}
+    stages = [
+        ("load_csv", lambda: pd.read_csv(csv_path)),
+        ("load_parquet", lambda: pd.read_parquet(parquet_path)),
+        ("compact", lambda: CompactFrame.from_frame(holder["df"])),
+        ("filter_index", lambda: FilterIndex.from_frame(load_dataset(option, FILTER_DIMENSIONS))),
+        ("bitmap_filter", lambda: holder["index"].rows(filtered_spec.filters)),
+        # Requêtes du tableau de bord : cube pour un site, index bitmap pour des filtres combinés
+        ("query_site", lambda: Engine().query(site_spec, metrics)),
+        ("query_filters", lambda: (clear_cache("filtered"), Engine().query(filtered_spec, metrics))[1]),
+        *[(f"{section}_data", lambda section=section: SECTIONS[section][1](holder["results"]))
+          for section in DATASET_SECTIONS],
+        ("slot_parsing", lambda: slot_columns(holder["df"])),
+        ("cube_build", lambda: build_cube(holder["df"])),
+        ("attendance", lambda: attendance(presence)),
+    ]
+    results = []
+    try:
+        for name, func in stages:
+            seconds, memory, value = measure(func, repeat)
+            if name == "load_parquet":
+                holder["df"] = value
+                # Jeu compact et cube chargés une fois, comme au premier affichage
+                load_compact(option)
+                load_cube(option)
+            elif name == "filter_index":
+                holder["index"] = value
+            elif name == "query_site":
+                holder["results"] = value
+            rows = len(presence) if name == "attendance" else len(base)
+            results.append({"scale": factor, "stage": name, "rows": rows, "seconds": round(seconds, 6),
+                            **{key: round(mb, 3) for key, mb in memory.items()}})
+    finally:
+        del DATASETS[option]
+        clear_cache()
+        for path in (parquet_path, cube_path(csv_path)):
+            if os.path.exists(path):
+                os.remove(path)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_runs(path=RESULTS_PATH):
+    """Return the stored results as a DataFrame (one row per run × scale × stage)."""
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path, encoding="utf-8") as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def compare(runs):
+    """Print the timing ratio of the last run against the previous one."""
+    run_ids = list(dict.fromkeys(runs["run"]))
+    if len(run_ids) < 2:
+        print("Il faut au moins deux exécutions enregistrées pour comparer.")
+        return
+    previous, last = (runs[runs["run"] == r].set_index(["scale", "stage"]) for r in run_ids[-2:])
+    # Les exécutions antérieures à arrow_mb et rss_mb n'ont que peak_mb
+    columns = [col for col in ("seconds", "peak_mb", "arrow_mb", "rss_mb")
+               if col in last.columns and col in previous.columns and previous[col].notna().any()]
+    joined = last[columns].join(previous[columns], rsuffix="_prev", how="inner")
+    joined["ratio"] = (joined["seconds"] / joined["seconds_prev"]).round(2)
+    print(f"{run_ids[-1]} vs {run_ids[-2]}")
+    print(joined.to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des calculs du tableau de bord SUAPS.")
+    parser.add_argument("--dataset", default="Semestre 1", choices=list(DATASETS))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3, help="nombre d'exécutions par étape (meilleur temps)")
+    parser.add_argument("--site", default="VANNES", help="site utilisé pour l'étape de filtrage")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--compare", action="store_true", help="comparer les deux dernières exécutions")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(load_runs(args.output))
+        return
+
+    run = {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": git_revision(), "dataset": args.dataset}
+    records = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for factor in args.scales:
+            for result in run_scale(DATASETS[args.dataset], factor, args.repeat, args.site, workdir):
+                records.append({**run, **result})
+                print(f"x{factor:<4} {result['stage']:<16} {result['rows']:>9} lignes "
+                      f"{result['seconds'] * 1000:>10.1f} ms {result['peak_mb']:>9.1f} Mo python "
+                      f"{result['arrow_mb']:>9.1f} Mo arrow {result['rss_mb']:>9.1f} Mo rss")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
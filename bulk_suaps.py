@@ -0,0 +1,248 @@
+"""Import en masse d'un répertoire d'exports SUAPS (CSV et Excel).
+
+Chaque fichier est lu (les classeurs Excel en lecture seule, ligne à ligne),
+reconnu comme export d'inscriptions ou feuille de présence, validé puis
+écrit dans les données du tableau de bord :
+
+- inscriptions : 26 colonnes de l'export, converties dans le store Parquet
+  avec leur cube d'agrégats, inscrites au catalogue de la sidebar et à
+  l'index de recherche ;
+- présences : réécrites en presence_<nom>.csv dans le répertoire lu par
+  l'onglet de présence.
+
+Les fichiers sont traités en parallèle par un pool de processus (un par
+cœur) ; ceux dont l'empreinte n'a pas changé depuis le dernier import sont
+ignorés.
+
+    python bulk_suaps.py archives/ --workers 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import db_suaps
+from attendance_suaps import IDENTITY_COLUMNS, PRESENCE_DIR, parse_sessions, session_columns
+from data_suaps import (
+    DATASETS, REGISTRATION_COLUMNS, STORE_DIR, file_fingerprint, read_export, register_exports, store_lock,
+    temp_path,
+)
+from ingest_suaps import ingest_incremental, read_manifest, write_manifest
+from search_suaps import write_search_index
+
+EXPORT_EXTENSIONS = (".csv", ".xlsx", ".xlsm")
+
+
+class SchemaError(ValueError):
+    """An export does not match the registration or presence layout."""
+
+
+def discover(directory):
+    """CSV and Excel files of a directory and its subdirectories, sorted."""
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            # ~$fichier.xlsx : verrou d'un classeur ouvert dans Excel
+            if name.lower().endswith(EXPORT_EXTENSIONS) and not name.startswith("~$"):
+                paths.append(os.path.normpath(os.path.join(root, name)))
+    return sorted(paths)
+
+
+def export_kind(df):
+    """Return "registrations", "presence" or None for an unrecognized layout."""
+    if set(REGISTRATION_COLUMNS) <= set(df.columns):
+        return "registrations"
+    if session_columns(df) and set(IDENTITY_COLUMNS) <= set(df.columns):
+        return "presence"
+    return None
+
+
+def validate_registrations(df):
+    """Check an export against the 26-column registration layout.
+
+    Args:
+        df: Export read by read_export().
+
+    Returns:
+        (df, warnings): the frame restricted to the 26 columns in export
+        order, and a list of non-blocking remarks.
+
+    Raises:
+        SchemaError: Columns are missing or the export is empty.
+    """
+    missing = [col for col in REGISTRATION_COLUMNS if col not in df.columns]
+    if missing:
+        raise SchemaError(f"colonnes manquantes : {', '.join(missing)}")
+    if df.empty:
+        raise SchemaError("aucune inscription")
+    warnings = []
+    extra = [col for col in df.columns if col not in REGISTRATION_COLUMNS]
+    if extra:
+        warnings.append(f"colonnes ignorées : {', '.join(map(str, extra))}")
+    numbers = df["Numéro étudiant"]
+    invalid = int((numbers.notna() & pd.to_numeric(numbers, errors="coerce").isna()).sum())
+    if invalid:
+        warnings.append(f"{invalid} numéros étudiants non numériques")
+    return df[REGISTRATION_COLUMNS], warnings
+
+
+def validate_presence(df):
+    """Check a presence sheet: identity columns and "Cours n°…" session columns.
+
+    Returns:
+        A list of non-blocking remarks.
+
+    Raises:
+        SchemaError: The identity or session columns are missing.
+    """
+    missing = [col for col in IDENTITY_COLUMNS if col not in df.columns]
+    if missing:
+        raise SchemaError(f"colonnes manquantes : {', '.join(missing)}")
+    sessions = parse_sessions(session_columns(df))
+    if sessions.empty:
+        raise SchemaError("aucune colonne de séance (Cours n°…)")
+    undated = int(sessions["date"].isna().sum())
+    return [f"{undated} séances sans date lisible"] if undated else []
+
+
+def presence_target(path, presence_dir=PRESENCE_DIR):
+    """Return the presence_<nom>.csv file written for a presence sheet."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    name = name[len("presence_"):] if name.startswith("presence_") else name
+    return os.path.join(presence_dir, f"presence_{name}.csv")
+
+
+def import_file(path, store_dir=STORE_DIR, presence_dir=PRESENCE_DIR):
+    """Read, validate and write one export; run in a worker process.
+
+    Args:
+        path: CSV or Excel export.
+        store_dir: Directory of the columnar store.
+        presence_dir: Directory of the presence exports of the dashboard.
+
+    Returns:
+        A dict (path, kind, rows, status, message, seconds) where status is
+        "ok" or "error".
+    """
+    started = time.perf_counter()
+    result = {"path": path, "kind": None, "rows": 0, "status": "ok", "message": ""}
+    try:
+        df = read_export(path)
+        result["kind"] = kind = export_kind(df)
+        result["rows"] = len(df)
+        if kind == "registrations":
+            df, warnings = validate_registrations(df)
+            ingested = ingest_incremental(path, store_dir, export=df)
+            warnings.append(f"cube {ingested['mode']}")
+        elif kind == "presence":
+            warnings = validate_presence(df)
+            target = presence_target(path, presence_dir)
+            if os.path.abspath(target) != os.path.abspath(path):
+                os.makedirs(presence_dir, exist_ok=True)
+                tmp_path = temp_path(target)
+                df.to_csv(tmp_path, index=False)
+                os.replace(tmp_path, target)
+        else:
+            missing = [col for col in REGISTRATION_COLUMNS if col not in df.columns]
+            raise SchemaError(f"format non reconnu ({len(missing)} colonnes d'inscription manquantes)")
+        result["message"] = "; ".join(warnings)
+    except Exception as exc:
+        result["status"] = "error"
+        result["message"] = str(exc) or repr(exc)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _name_conflicts(paths):
+    # Le store nomme ses fichiers d'après le nom de l'export : deux sources
+    # homonymes écraseraient le même fichier
+    owners = {os.path.splitext(os.path.basename(path))[0]: path for path in DATASETS.values()}
+    conflicts = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        owner = owners.setdefault(name, path)
+        if os.path.abspath(owner) != os.path.abspath(path):
+            conflicts[path] = f"même nom de fichier que {owner}"
+    return conflicts
+
+
+def bulk_import(directory, store_dir=STORE_DIR, presence_dir=PRESENCE_DIR, workers=None, force=False,
+                sqlite=False, progress=print):
+    """Import every export of a directory with a process pool.
+
+    Args:
+        directory: Directory scanned recursively for CSV and Excel files.
+        store_dir: Directory of the columnar store.
+        presence_dir: Directory of the presence exports of the dashboard.
+        workers: Number of processes (all cores by default).
+        force: Reimport files whose fingerprint did not change.
+        sqlite: Also load the registrations into the SQLite database.
+        progress: Callable receiving one line per processed file.
+
+    Returns:
+        A DataFrame with one row per file (see import_file()).
+    """
+    # Le store n'a qu'un écrivain à la fois : l'observateur attend la fin de l'import
+    with store_lock(store_dir):
+        manifest = read_manifest(store_dir)
+        paths = discover(directory)
+        todo = [path for path in paths if force or manifest.get(path) != file_fingerprint(path)]
+        conflicts = _name_conflicts(todo)
+        results = [{"path": path, "kind": None, "rows": 0, "status": "error", "message": message, "seconds": 0.0}
+                   for path, message in conflicts.items()]
+        todo = [path for path in todo if path not in conflicts]
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(import_file, path, store_dir, presence_dir): path for path in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.append(result)
+                progress(f"[{done}/{len(todo)}] {result['path']}: {result['kind'] or '?'}, {result['rows']} lignes, "
+                         f"{result['status']} {result['message']}".rstrip())
+
+        imported = [result for result in results if result["status"] == "ok"]
+        registrations = [result["path"] for result in imported if result["kind"] == "registrations"]
+        known = {os.path.abspath(path) for path in DATASETS.values()}
+        register_exports({os.path.splitext(os.path.basename(path))[0]: path
+                          for path in registrations if os.path.abspath(path) not in known}, store_dir)
+        for result in imported:
+            manifest[result["path"]] = file_fingerprint(result["path"])
+        write_manifest(manifest, store_dir)
+        if registrations:
+            write_search_index(store_dir)
+
+        # SQLite n'accepte qu'un écrivain : chargement séquentiel après le pool
+        if sqlite and registrations:
+            conn = db_suaps.connect(db_suaps.DB_PATH, read_only=False)
+            try:
+                for path in registrations:
+                    db_suaps.ingest_dataframe(conn, os.path.splitext(os.path.basename(path))[0], read_export(path))
+            finally:
+                conn.close()
+
+    columns = ["path", "kind", "rows", "status", "message", "seconds"]
+    return pd.DataFrame(results, columns=columns).sort_values("path", ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importe un répertoire d'exports SUAPS (CSV et Excel).")
+    parser.add_argument("directory", help="répertoire parcouru récursivement")
+    parser.add_argument("--store", default=STORE_DIR, help="répertoire du store Parquet")
+    parser.add_argument("--presence-dir", default=PRESENCE_DIR, help="répertoire des feuilles de présence")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (tous les cœurs)")
+    parser.add_argument("--force", action="store_true", help="réimporte aussi les fichiers inchangés")
+    parser.add_argument("--sqlite", action="store_true", help="alimente aussi la base SQLite")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = bulk_import(args.directory, args.store, args.presence_dir, args.workers, args.force, args.sqlite)
+    counts = report.groupby(["kind", "status"], dropna=False).size()
+    print(counts.to_string() if len(counts) else "aucun fichier à importer")
+    print(f"{len(report)} fichier(s) en {time.perf_counter() - started:.1f} s")
+    return int((report["status"] == "error").any())
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
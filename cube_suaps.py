@@ -0,0 +1,377 @@
+"""Cube d'agrégats du tableau de bord.
+
+Tous les comptages des onglets 1 à 4 sont calculés une seule fois, à
+l'ingestion, pour chaque site présent dans l'export ainsi que pour "Tous".
+Les onglets ne font ensuite que des lectures dans le cube.
+
+Sur disque, le cube est une table Parquet au format long
+(metric, site, a, b, count) rangée à côté de l'export dans le store.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ALL_SITES = "Tous"
+
+# Colonnes dont les onglets affichent la répartition des inscriptions
+COUNT_COLUMNS = [
+    "Groupement d’activités", "Type d’inscription", "Activité", "Département",
+    "Jour", "Site", "Niveau", "Enseignant",
+]
+
+# Colonnes dont les onglets affichent le nombre de valeurs distinctes
+DISTINCT_COLUMNS = ["Activité", "Enseignant"]
+
+# Croisements affichés (heatmap et analyse Département vs Activité)
+PAIR_COLUMNS = [("Jour", "Horaires"), ("Département", "Activité")]
+
+PERIODS = ["Matin", "Après-midi", "Soir"]
+
+# Bornes des périodes en minutes depuis minuit : [0h, 12h), [12h, 18h), [18h, 24h)
+PERIOD_BOUNDS = [0, 12 * 60, 18 * 60, 24 * 60]
+
+WEEKDAYS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+
+# Colonnes dérivées de Jour et Horaires à l'ingestion (-1 : horaire illisible)
+START_COLUMN = "Début (min)"
+END_COLUMN = "Fin (min)"
+PERIOD_COLUMN = "Période"
+WEEKDAY_COLUMN = "Jour de la semaine"
+
+# Clé entière de la personne derrière chaque inscription, ajoutée à l'ingestion
+STUDENT_KEY = "Clé étudiant"
+
+# Colonnes dont les onglets affichent le nombre de personnes distinctes par valeur
+PEOPLE_COLUMNS = ["Type", "Activité"]
+
+
+def value_counts(series):
+    """value_counts() restricted to observed values.
+
+    Columns read from the Parquet store are categoricals, whose value_counts()
+    also lists the categories filtered out by a site selection.
+    """
+    counts = series.value_counts()
+    return counts[counts > 0]
+
+
+def parse_horaires(horaires):
+    """Start and end minutes of "HH:MM-HH:MM" slots.
+
+    Only the distinct values are parsed (a few dozen slots per export), then
+    mapped back onto the rows.
+
+    Args:
+        horaires: Horaires column (strings or categorical).
+
+    Returns:
+        A DataFrame with int16 START_COLUMN and END_COLUMN, -1 where the
+        slot (or its end) cannot be read.
+    """
+    codes, uniques = pd.factorize(horaires)
+    parts = pd.Series(uniques, dtype="string").str.extract(
+        r"^\s*(\d{1,2}):(\d{2})(?:\s*-\s*(\d{1,2}):(\d{2}))?").astype("float64")
+    minutes = []
+    for hour, minute in ((parts[0], parts[1]), (parts[2], parts[3])):
+        value = (hour * 60 + minute).where((hour < 24) & (minute < 60))
+        value = value.fillna(-1).to_numpy(dtype=np.int16)
+        minutes.append(np.where(codes >= 0, np.append(value, -1)[codes], -1).astype(np.int16))
+    return pd.DataFrame({START_COLUMN: minutes[0], END_COLUMN: minutes[1]}, index=horaires.index)
+
+
+def period_of(start):
+    """Period of the day (Matin / Après-midi / Soir) of start minutes."""
+    return pd.cut(start.where(start >= 0), bins=PERIOD_BOUNDS, labels=PERIODS, right=False).rename(PERIOD_COLUMN)
+
+
+def periods(horaires):
+    """Period of the day (Matin / Après-midi / Soir) of each Horaires slot."""
+    return period_of(parse_horaires(horaires)[START_COLUMN])
+
+
+def weekday(jour):
+    """Jour as an ordered categorical (lundi … dimanche)."""
+    codes, uniques = pd.factorize(jour)
+    days = pd.Series(uniques, dtype="string").str.strip().str.lower()
+    day_codes = np.append(pd.Categorical(days, categories=WEEKDAYS).codes, -1)
+    return pd.Series(pd.Categorical.from_codes(day_codes[codes], categories=WEEKDAYS, ordered=True),
+                     index=jour.index, name=WEEKDAY_COLUMN)
+
+
+def slot_columns(df):
+    """Numeric and categorical columns derived from Jour and Horaires.
+
+    Returns:
+        A dict of column name -> Series (START_COLUMN, END_COLUMN,
+        PERIOD_COLUMN, WEEKDAY_COLUMN) for the columns present in df.
+    """
+    columns = {}
+    if "Horaires" in df.columns:
+        slots = parse_horaires(df["Horaires"])
+        columns[START_COLUMN] = slots[START_COLUMN]
+        columns[END_COLUMN] = slots[END_COLUMN]
+        columns[PERIOD_COLUMN] = period_of(slots[START_COLUMN])
+    if "Jour" in df.columns:
+        columns[WEEKDAY_COLUMN] = weekday(df["Jour"])
+    return columns
+
+
+def student_key(df, source=None):
+    """Integer key of the person behind each registration.
+
+    The key is the Numéro étudiant, also looked up on the other rows of the
+    same e-mail address. People without a number (staff, external guests) get
+    a 64-bit hash of their e-mail address, or of Prénom + Nom de famille,
+    made negative so it never collides with a student number. The key only
+    depends on the person's number or address, so it is stable across
+    exports and years.
+
+    Rows with no number, no e-mail and an empty Prénom and Nom de famille
+    cannot be matched to anyone: each gets its own key, a hash of the source
+    and of its row position. They count as one person per row, and never
+    merge with the anonymous rows of another export (journey, search,
+    SQLite students). These keys are only stable within one export.
+
+    Args:
+        df: Registration frame (CSV or Parquet store).
+        source: Path or name of the export df comes from; its file name
+            without extension ("fixed_ses1", as in the SQLite database)
+            salts the keys of anonymous rows.
+
+    Returns:
+        An int64 Series aligned on df.
+    """
+    empty = pd.Series(pd.NA, index=df.index, dtype="string")
+    email = df.get("Adresse de courriel", empty).astype("string").str.strip().str.lower().replace("", pd.NA)
+    numbers = pd.to_numeric(df.get("Numéro étudiant", empty), errors="coerce")
+    numbers = numbers.fillna(numbers.groupby(email).transform("max"))
+    names = (df.get("Prénom", empty).astype("string").fillna("").str.strip().str.lower() + " "
+             + df.get("Nom de famille", empty).astype("string").fillna("").str.strip().str.lower())
+    identity = email.fillna(names.str.strip().replace("", pd.NA))
+    # Personne sans numéro, courriel ni nom : une clé par ligne et par export
+    rows = pd.Series(np.arange(len(df)), index=df.index).astype("string")
+    name = os.path.splitext(os.path.basename(str(source)))[0] if source is not None else ""
+    identity = identity.fillna(f"#ligne {name} " + rows)
+    hashed = pd.util.hash_pandas_object(identity, index=False).to_numpy()
+    hashed = -((hashed >> np.uint64(1)).astype(np.int64)) - 1
+    keys = np.where(numbers.notna(), numbers.fillna(0).to_numpy(dtype=np.int64), hashed)
+    return pd.Series(keys, index=df.index, name=STUDENT_KEY)
+
+
+def _additive_entries(df, site):
+    # Comptages qu'un delta de lignes met à jour par addition
+    entries = {("rows", site): len(df)}
+    for col in COUNT_COLUMNS:
+        if col in df.columns:
+            entries[(f"count:{col}", site)] = value_counts(df[col])
+    if PERIOD_COLUMN in df.columns:
+        entries[("period", site)] = df[PERIOD_COLUMN].value_counts()
+    for a, b in PAIR_COLUMNS:
+        if a in df.columns and b in df.columns:
+            entries[(f"pair:{a}|{b}", site)] = df.groupby([a, b], observed=True).size().reset_index(name="size")
+    return entries
+
+
+def _distinct_entries(df, site):
+    # Comptages de valeurs distinctes, recalculés sur le jeu complet
+    entries = {}
+    if STUDENT_KEY in df.columns:
+        entries[("people", site)] = df[STUDENT_KEY].nunique()
+        for col in PEOPLE_COLUMNS:
+            if col in df.columns:
+                entries[(f"people:{col}", site)] = value_counts(
+                    df[[STUDENT_KEY, col]].drop_duplicates()[col])
+    for col in DISTINCT_COLUMNS:
+        if col in df.columns:
+            entries[(f"distinct:{col}", site)] = df[col].nunique()
+    return entries
+
+
+def _is_distinct(metric):
+    return metric == "people" or metric.startswith(("people:", "distinct:"))
+
+
+def _prepare(df):
+    if STUDENT_KEY not in df.columns:
+        df = df.assign(**{STUDENT_KEY: student_key(df)})
+    if PERIOD_COLUMN not in df.columns:
+        df = df.assign(**slot_columns(df))
+    return df
+
+
+def _per_site(df, compute):
+    entries = compute(df, ALL_SITES)
+    if "Site" in df.columns:
+        for site, part in df.groupby("Site", observed=True, sort=False):
+            entries.update(compute(part, str(site)))
+    return entries
+
+
+def _site_entries(df, site):
+    return {**_additive_entries(df, site), **_distinct_entries(df, site)}
+
+
+def build_cube(df):
+    """Compute every dashboard count of a registration frame, per site.
+
+    Args:
+        df: Registration frame (CSV or Parquet store).
+
+    Returns:
+        A Cube covering "Tous" and every site present in the frame.
+    """
+    return Cube(_per_site(_prepare(df), _site_entries), list(df.columns))
+
+
+def _add(current, delta, sign):
+    """current + sign * delta for one cube entry (int, Series or pairs frame)."""
+    if isinstance(delta, pd.DataFrame):
+        a, b = delta.columns[:2]
+        delta = delta.astype({a: str, b: str}).assign(size=delta["size"] * sign)
+        frames = [delta] if current is None else [current.astype({a: str, b: str}), delta]
+        total = pd.concat(frames, ignore_index=True).groupby([a, b], sort=True)["size"].sum()
+        return total[total > 0].astype("int64").reset_index(name="size")
+    if isinstance(delta, pd.Series):
+        delta = pd.Series(delta.to_numpy(), index=delta.index.astype(str), name="count") * sign
+        total = delta if current is None else pd.Series(
+            current.to_numpy(), index=current.index.astype(str), name="count").add(delta, fill_value=0)
+        if delta.index.name == PERIOD_COLUMN or (current is not None and current.index.name == PERIOD_COLUMN):
+            total = total.reindex(PERIODS, fill_value=0)
+            total.index = pd.CategoricalIndex(total.index, categories=PERIODS, name=PERIOD_COLUMN)
+        else:
+            total = total[total > 0]
+            total.index.name = (current if current is not None else delta).index.name
+        return total.astype("int64").sort_values(ascending=False, kind="stable")
+    return (current or 0) + sign * delta
+
+
+def update_cube(cube, df, added, removed):
+    """Apply a row-level delta to a cube instead of rebuilding it.
+
+    Additive metrics (rows, counts, periods, pairs) are updated from the
+    added and removed rows only. Distinct counts are not additive: they are
+    recomputed on df, the frame after the change, with nunique and
+    drop_duplicates on integer keys.
+
+    Args:
+        cube: Cube of the frame before the change.
+        df: Registration frame after the change.
+        added: Rows present in df but not before.
+        removed: Rows present before but not in df.
+
+    Returns:
+        The updated Cube.
+    """
+    entries = {key: value for key, value in cube._entries.items() if not _is_distinct(key[0])}
+    for part, sign in ((added, 1), (removed, -1)):
+        if len(part):
+            for key, value in _per_site(_prepare(part), _additive_entries).items():
+                entries[key] = _add(entries.get(key), value, sign)
+    # Un site sans plus aucune inscription disparaît du cube
+    empty_sites = {site for (metric, site), value in entries.items() if metric == "rows" and value <= 0}
+    empty_sites.discard(ALL_SITES)
+    entries = {key: value for key, value in entries.items() if key[1] not in empty_sites}
+    entries.update(_per_site(_prepare(df), _distinct_entries))
+    return Cube(entries, list(df.columns))
+
+
+class Cube:
+    """Precomputed counts of one dataset, per site ("Tous" included)."""
+
+    def __init__(self, entries, columns):
+        self._entries = entries
+        self.columns = columns
+
+    @property
+    def sites(self):
+        return sorted({site for _, site in self._entries})
+
+    def _get(self, metric, site, default):
+        return self._entries.get((metric, site or ALL_SITES), default)
+
+    def counts(self, column, site=ALL_SITES):
+        """Registrations per value of column, most frequent first."""
+        empty = pd.Series([], index=pd.Index([], name=column), name="count", dtype="int64")
+        return self._get(f"count:{column}", site, empty)
+
+    def pairs(self, column_a, column_b, site=ALL_SITES):
+        """Registrations per (column_a, column_b) pair, in a "size" column."""
+        empty = pd.DataFrame({column_a: [], column_b: [], "size": pd.Series([], dtype="int64")})
+        return self._get(f"pair:{column_a}|{column_b}", site, empty)
+
+    def distinct(self, column, site=ALL_SITES):
+        """Number of distinct values of column."""
+        return self._get(f"distinct:{column}", site, 0)
+
+    def people(self, site=ALL_SITES, by=None):
+        """Distinct people (student keys), optionally per value of a PEOPLE_COLUMNS column."""
+        if by is not None:
+            empty = pd.Series([], index=pd.Index([], name=by), name="count", dtype="int64")
+            return self._get(f"people:{by}", site, empty)
+        return self._get("people", site, 0)
+
+    def periods(self, site=ALL_SITES):
+        """Registrations per period of the day."""
+        empty = pd.Series(0, index=pd.CategoricalIndex(PERIODS, categories=PERIODS, name=PERIOD_COLUMN),
+                          name="count")
+        return self._get("period", site, empty)
+
+    def rows(self, site=ALL_SITES):
+        """Number of registrations."""
+        return self._get("rows", site, 0)
+
+    def to_frame(self):
+        """Long-format (metric, site, a, b, count) table of the cube."""
+        records = [("column", ALL_SITES, col, None, 0) for col in self.columns]
+        for (metric, site), value in self._entries.items():
+            if isinstance(value, pd.DataFrame):
+                a, b = value.columns[:2]
+                records.extend((metric, site, str(x), str(y), int(n))
+                               for x, y, n in zip(value[a], value[b], value["size"]))
+            elif isinstance(value, pd.Series):
+                records.extend((metric, site, str(x), None, int(n)) for x, n in value.items())
+            else:
+                records.append((metric, site, None, None, int(value)))
+        return pd.DataFrame(records, columns=["metric", "site", "a", "b", "count"])
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Rebuild a Cube from its long-format table."""
+        columns = frame.loc[frame["metric"] == "column", "a"].tolist()
+        entries = {}
+        for (metric, site), part in frame.groupby(["metric", "site"], sort=False):
+            if metric == "column":
+                continue
+            if metric.startswith("pair:"):
+                a, b = metric[len("pair:"):].split("|")
+                entries[(metric, site)] = pd.DataFrame({
+                    a: part["a"].to_numpy(), b: part["b"].to_numpy(), "size": part["count"].to_numpy()})
+            elif metric.startswith(("count:", "people:")) or metric == "period":
+                name = PERIOD_COLUMN if metric == "period" else metric.split(":", 1)[1]
+                index = pd.Index(part["a"].to_numpy(), name=name)
+                if metric == "period":
+                    index = pd.CategoricalIndex(index, categories=PERIODS, name=name)
+                entries[(metric, site)] = pd.Series(part["count"].to_numpy(), index=index, name="count")
+            else:
+                entries[(metric, site)] = int(part["count"].iloc[0])
+        return cls(entries, columns)
+
+
+def write_cube(cube, path):
+    """Write a cube as a Parquet file (atomically replaced)."""
+    # Import différé : data_suaps importe ce module
+    from data_suaps import temp_path
+
+    # Nom temporaire unique : deux processus peuvent écrire le même cube
+    tmp_path = temp_path(path)
+    pq.write_table(pa.Table.from_pandas(cube.to_frame(), preserve_index=False), tmp_path,
+                   use_dictionary=True, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def read_cube(path):
+    """Read a cube written by write_cube."""
+    return Cube.from_frame(pq.read_table(path, memory_map=True).to_pandas())
@@ -0,0 +1,556 @@
+"""Chargement des exports SUAPS pour le tableau de bord.
+
+Les fichiers sont lus une seule fois par processus et partagés entre toutes
+les sessions Streamlit : les DataFrames renvoyés sont donc en lecture seule,
+toute colonne dérivée doit être calculée sur une copie ou dans une variable
+locale. Le cache partagé a un budget mémoire (SUAPS_CACHE_MB) : au-delà, les
+entrées les moins récemment utilisées sont libérées. Chaque jeu de données y
+est gardé une fois, dans le schéma compact de schema_suaps (catégories,
+petits entiers, table des étudiants à part).
+
+Les exports d'inscriptions peuvent être convertis en Parquet avec
+`python data_suaps.py` (qui écrit aussi l'index de recherche de
+search_suaps) : le tableau de bord lit alors ce store colonnaire,
+mappé en mémoire, à la place des CSV. Les exports importés en masse
+(`python bulk_suaps.py`) sont inscrits dans le catalogue du store et
+s'ajoutent aux jeux de données de la sidebar.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cube_suaps import (
+    ALL_SITES, END_COLUMN, PERIOD_COLUMN, START_COLUMN, STUDENT_KEY, WEEKDAY_COLUMN, build_cube, read_cube, slot_columns,
+    student_key, write_cube,
+)
+from filter_suaps import FILTER_DIMENSIONS, FilterIndex
+from schema_suaps import CompactFrame, memory_report
+from timing_suaps import span
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+# Exports d'inscriptions disponibles dans la sidebar
+DATASETS = {
+    "Semestre 1": "data/fixed_ses1.csv",
+    "Semestre 2": "data/fixed_ses2.csv",
+    "Événements": "data/fixed_even.csv",
+}
+
+# Les 26 colonnes d'un export d'inscriptions
+REGISTRATION_COLUMNS = [
+    "Type", "Numéro étudiant", "Prénom", "Nom de famille", "Adresse de courriel",
+    "Sexe", "Institution", "Département", "Centre de gestion", "Code étape",
+    "Calendrier", "Type de calendrier", "Site", "Type d’inscription",
+    "Inscription (semestre)", "Liste (statut inscription)", "Groupement d’activités",
+    "Activité", "Libellé complémentaire", "Niveau", "Jour", "Horaires", "Lieu",
+    "Enseignant", "Cohorte", "Activité détaillée",
+]
+
+# Sites de l'université, et choix de site des vues ("Tous" en tête)
+SITES = ["VANNES", "LORIENT"]
+SITE_CHOICES = [ALL_SITES, *SITES]
+
+# Store colonnaire alimenté par `python data_suaps.py`
+STORE_DIR = "data/store"
+
+# Exports importés en masse (python bulk_suaps.py) : libellé -> fichier source
+CATALOG_NAME = "catalog.json"
+
+# Verrou d'un passage d'ingestion, partagé par tous les processus écrivant dans le store
+LOCK_NAME = "ingest.lock"
+
+# Colonnes lues par les onglets du tableau de bord (26 dans l'export) : seules
+# celles-ci sont gardées dans la copie compacte d'un jeu de données
+DASHBOARD_COLUMNS = [
+    "Type", "Numéro étudiant", "Prénom", "Nom de famille", "Adresse de courriel", "Département", "Site",
+    "Type d’inscription", "Liste (statut inscription)", "Groupement d’activités", "Activité",
+    "Niveau", "Jour", "Horaires", "Lieu", "Enseignant", "Activité détaillée", STUDENT_KEY,
+    START_COLUMN, END_COLUMN, PERIOD_COLUMN, WEEKDAY_COLUMN,
+]
+
+# Au-delà de ce ratio valeurs distinctes / lignes, pas d'encodage dictionnaire
+DICTIONARY_MAX_RATIO = 0.5
+
+# Budget mémoire du cache partagé, en octets
+CACHE_BUDGET = int(float(os.environ.get("SUAPS_CACHE_MB", "1024")) * 2**20)
+
+# Clé -> (empreinte, valeur, taille en octets), du moins au plus récemment utilisé
+_cache = OrderedDict()
+_cache_guard = threading.Lock()
+# Clé -> [verrou, nombre de threads qui le tiennent ou l'attendent], le temps d'un chargement
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def file_fingerprint(path):
+    """Return the (mtime_ns, size) pair identifying the current file content.
+
+    Args:
+        path: Path of the file on disk.
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def footprint(value):
+    """Approximate memory size of a cached value, in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    if isinstance(value, dict):
+        return sum(footprint(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(footprint(item) for item in value)
+    if hasattr(value, "__dict__"):
+        return sum(footprint(item) for item in vars(value).values())
+    return sys.getsizeof(value)
+
+
+@contextmanager
+def _key_lock(key):
+    # Le verrou d'une clé n'existe que pendant son chargement : _locks ne garde
+    # que les clés en cours de calcul, quel que soit le nombre de clés du cache
+    with _locks_guard:
+        entry = _locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[key]
+
+
+def _lookup(key, fingerprint):
+    with _cache_guard:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            _cache.move_to_end(key)
+            return entry
+    return None
+
+
+def _evict():
+    # Libère les entrées les moins récemment utilisées ; la plus récente reste
+    total = sum(entry[2] for entry in _cache.values())
+    while total > CACHE_BUDGET and len(_cache) > 1:
+        _, entry = _cache.popitem(last=False)
+        total -= entry[2]
+
+
+def cached(key, fingerprint, loader):
+    """Return the shared value for key, calling loader when it is missing or stale.
+
+    Values are shared read-only by every session of the process and count
+    against CACHE_BUDGET; the least recently used ones are evicted first.
+
+    Args:
+        key: Hashable cache key.
+        fingerprint: Version of the data behind the key (e.g. file_fingerprint()).
+        loader: Callable building the value.
+    """
+    entry = _lookup(key, fingerprint)
+    if entry is not None:
+        return entry[1]
+
+    # Un verrou par clé : deux sessions ne parsent pas le même export
+    with _key_lock(key):
+        entry = _lookup(key, fingerprint)
+        if entry is None:
+            parts = key if isinstance(key, tuple) else (key,)
+            kinds = [part for part in parts[1:] if isinstance(part, str)]
+            with span(f"load:{os.path.basename(str(parts[0]))}", kind=", ".join(kinds) or None) as record:
+                value = loader()
+                record["rows"] = len(value) if isinstance(value, pd.DataFrame) else None
+            entry = (fingerprint, value, footprint(value))
+            with _cache_guard:
+                _cache[key] = entry
+                _cache.move_to_end(key)
+                _evict()
+    return entry[1]
+
+
+def cache_report():
+    """Current content of the shared cache, least recently used first.
+
+    Returns:
+        A DataFrame (path, kind, size_mb) with one row per cached value;
+        its attrs hold the total and the budget in MB.
+    """
+    with _cache_guard:
+        items = list(_cache.items())
+    records = []
+    for key, entry in items:
+        key = key if isinstance(key, tuple) else (key,)
+        kind = ", ".join(f"{len(part)} colonnes" if isinstance(part, tuple) else str(part)
+                         for part in key[1:] if part is not None)
+        records.append((key[0], kind or "fichier", round(entry[2] / 2**20, 3)))
+    report = pd.DataFrame(records, columns=["path", "kind", "size_mb"])
+    report.attrs["total_mb"] = round(float(report["size_mb"].sum()), 3)
+    report.attrs["budget_mb"] = round(CACHE_BUDGET / 2**20, 3)
+    return report
+
+
+def load_csv(path, columns=None):
+    """Load a CSV export, parsing it at most once per file version.
+
+    The cache is keyed on the absolute path and validated against the file
+    fingerprint, so a re-exported file is parsed again on the next call.
+
+    Args:
+        path: Path of the CSV file.
+        columns: Optional list of columns to read; unknown names are ignored.
+
+    Returns:
+        The parsed DataFrame, shared by all sessions (read-only).
+    """
+    key = (os.path.abspath(path), tuple(columns) if columns else None)
+    usecols = (lambda name: name in columns) if columns else None
+    return cached(key, file_fingerprint(path), lambda: pd.read_csv(path, usecols=usecols))
+
+
+def read_export(path):
+    """Read a registration or presence export from a CSV or Excel file.
+
+    Excel workbooks are streamed in read-only mode: only the first sheet is
+    read, row by row, and fully empty rows are dropped.
+
+    Args:
+        path: Path of a .csv or .xlsx file.
+    """
+    if not path.lower().endswith((".xlsx", ".xlsm")):
+        return pd.read_csv(path)
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        df = pd.DataFrame.from_records(rows, columns=[str(name).strip() for name in header])
+    finally:
+        workbook.close()
+    return df.dropna(how="all").reset_index(drop=True).infer_objects()
+
+
+def temp_path(path, suffix=".tmp"):
+    """Unique temporary file next to path, to be renamed over it with os.replace().
+
+    Two processes writing the same file never share a temporary name, so a
+    rename only ever publishes a complete file.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix, prefix=os.path.basename(path) + ".",
+                                    dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    return tmp_path
+
+
+@contextmanager
+def store_lock(store_dir=STORE_DIR):
+    """Hold the ingest lock of a store (one writer at a time across processes).
+
+    Blocks until the passes of other processes (watcher, bulk import,
+    `python data_suaps.py`) are finished.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, LOCK_NAME), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_catalog(store_dir=STORE_DIR):
+    """Exports imported into the store by bulk_suaps, as {label: source path}."""
+    path = os.path.join(store_dir, CATALOG_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def register_exports(exports, store_dir=STORE_DIR):
+    """Add imported exports to the catalog of the store and to DATASETS.
+
+    Args:
+        exports: Dict of label -> source path.
+        store_dir: Directory of the columnar store.
+    """
+    catalog = {**load_catalog(store_dir), **exports}
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, CATALOG_NAME)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+    DATASETS.update(exports)
+    return catalog
+
+
+# Les exports importés en masse s'ajoutent à ceux de la sidebar
+DATASETS.update({label: path for label, path in load_catalog().items() if path not in DATASETS.values()})
+
+
+def store_path(csv_path, store_dir=STORE_DIR):
+    """Return the Parquet file of the store matching a CSV export."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_dir, name + ".parquet")
+
+
+def cube_path(csv_path, store_dir=STORE_DIR):
+    """Return the aggregate cube file of the store matching a CSV export."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_dir, name + ".cube.parquet")
+
+
+def _store_is_fresh(csv_path, parquet_path):
+    if not os.path.exists(parquet_path):
+        return False
+    # Export Excel ou archive déplacée : le store est la seule copie lisible
+    if not csv_path.lower().endswith(".csv") or not os.path.exists(csv_path):
+        return True
+    return file_fingerprint(parquet_path)[0] >= file_fingerprint(csv_path)[0]
+
+
+def dictionary_encode(df, max_ratio=DICTIONARY_MAX_RATIO):
+    """Convert low-cardinality text columns to categoricals.
+
+    Args:
+        df: Frame read from a CSV export.
+        max_ratio: Maximum distinct values / rows ratio for a column to be encoded.
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_string_dtype(series) or series.dtype == object:
+            if series.nunique() <= max_ratio * max(len(series), 1):
+                df[col] = series.astype("category")
+    return df
+
+
+def prepare_export(df, source=None):
+    """Add the derived columns of the store to a registration export.
+
+    An integer STUDENT_KEY column and the slot columns parsed from Jour and
+    Horaires (start/end minutes, period, weekday) are added to the 26
+    columns of the export.
+
+    Args:
+        df: Registration export.
+        source: Path of the export (see student_key()).
+    """
+    df = df.copy()
+    df[STUDENT_KEY] = student_key(df, source)
+    return df.assign(**slot_columns(df))
+
+
+def write_store(df, csv_path, store_dir=STORE_DIR, cube=None):
+    """Write a prepared export and its aggregate cube into the store.
+
+    Files are written under a temporary name then renamed, so readers never
+    see a partial file.
+
+    Args:
+        df: Frame returned by prepare_export().
+        csv_path: Path of the CSV export the frame comes from.
+        store_dir: Directory of the columnar store.
+        cube: Cube of the frame; built from df when None.
+
+    Returns:
+        Path of the written Parquet file.
+    """
+    df = dictionary_encode(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    path = store_path(csv_path, store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = temp_path(path)
+    pq.write_table(table, tmp_path, use_dictionary=True, compression="zstd")
+    os.replace(tmp_path, path)
+    write_cube(cube if cube is not None else build_cube(df), cube_path(csv_path, store_dir))
+    return path
+
+
+def ingest_csv(csv_path, store_dir=STORE_DIR):
+    """Convert a CSV export into a dictionary-encoded Parquet file.
+
+    The derived columns of prepare_export() are added and the aggregate cube
+    of the export is materialized at the same time.
+
+    Args:
+        csv_path: Path of the CSV export.
+        store_dir: Directory of the columnar store.
+
+    Returns:
+        Path of the written Parquet file.
+    """
+    return write_store(prepare_export(read_export(csv_path), csv_path), csv_path, store_dir)
+
+
+def ingest_all(store_dir=STORE_DIR):
+    """Ingest every registration export of DATASETS into the store.
+
+    The fingerprint of each converted export is recorded in the manifest of
+    ingest_suaps, so the watcher does not ingest it a second time.
+    """
+    # Import local : ingest_suaps importe ce module
+    from ingest_suaps import read_manifest, write_manifest
+
+    with store_lock(store_dir):
+        manifest = read_manifest(store_dir)
+        written = []
+        for path in DATASETS.values():
+            fingerprint = file_fingerprint(path)
+            written.append(ingest_csv(path, store_dir))
+            manifest[path] = fingerprint
+        write_manifest(manifest, store_dir)
+    return written
+
+
+def load_compact(option):
+    """Load the registrations of a sidebar option in the compact schema.
+
+    The export is read from the Parquet store when it is up to date,
+    otherwise from the CSV file, and kept once per process and version.
+    Only the DASHBOARD_COLUMNS are read and kept.
+
+    Args:
+        option: One of the keys of DATASETS.
+
+    Returns:
+        A CompactFrame shared by all sessions (read-only).
+    """
+    csv_path = DATASETS[option]
+    parquet_path = store_path(csv_path)
+
+    def load():
+        if _store_is_fresh(csv_path, parquet_path):
+            names = pq.read_schema(parquet_path).names
+            columns = [col for col in DASHBOARD_COLUMNS if col in names]
+            df = pq.read_table(parquet_path, columns=columns, memory_map=True).to_pandas()
+        else:
+            df = prepare_export(read_export(csv_path), csv_path)
+            df = df[[col for col in DASHBOARD_COLUMNS if col in df.columns]]
+        return CompactFrame.from_frame(df)
+
+    return cached((os.path.abspath(csv_path), "compact"), dataset_version(option), load)
+
+
+def load_dataset(option, columns=None):
+    """Load the registration export matching a sidebar option.
+
+    Columns are views of the compact copy of load_compact(); the identity
+    columns (Prénom, Nom de famille…) are attached from the student table.
+
+    Args:
+        option: One of the keys of DATASETS.
+        columns: Optional list of columns to read; unknown names are ignored.
+    """
+    return load_compact(option).frame(columns)
+
+
+def dataset_memory(option):
+    """Memory footprint of an export read as-is and in the compact schema.
+
+    The raw export is parsed once per version to measure it, then released.
+
+    Args:
+        option: One of the keys of DATASETS.
+
+    Returns:
+        A DataFrame per column (see schema_suaps.memory_report()).
+    """
+    csv_path = DATASETS[option]
+
+    def measure():
+        compact = load_compact(option)
+        raw = read_export(csv_path) if os.path.exists(csv_path) else compact.frame(REGISTRATION_COLUMNS)
+        report = memory_report(raw, compact)
+        report.attrs.update(rows=len(compact), students=len(compact.students))
+        return report
+
+    return cached((os.path.abspath(csv_path), "memory"), dataset_version(option), measure)
+
+
+def load_cube(option):
+    """Load the aggregate cube of the export matching a sidebar option.
+
+    Reads the cube materialized at ingest when it is up to date, otherwise
+    builds it once per version of the export.
+
+    Args:
+        option: One of the keys of DATASETS.
+    """
+    csv_path = DATASETS[option]
+    path = cube_path(csv_path)
+    if _store_is_fresh(csv_path, path):
+        return cached((os.path.abspath(path), "cube"), file_fingerprint(path), lambda: read_cube(path))
+    return cached((os.path.abspath(csv_path), "cube"), file_fingerprint(csv_path),
+                   lambda: build_cube(load_dataset(option)))
+
+
+def load_filter_index(option):
+    """Load the bitmap filter index of the export matching a sidebar option.
+
+    The index is built once per version of the export and shared by all
+    sessions.
+
+    Args:
+        option: One of the keys of DATASETS.
+    """
+    csv_path = DATASETS[option]
+    return cached((os.path.abspath(csv_path), "filters"), dataset_version(option),
+                   lambda: FilterIndex.from_frame(load_dataset(option, FILTER_DIMENSIONS)))
+
+
+def dataset_version(option):
+    """Return a token that changes whenever the data behind an option changes.
+
+    Args:
+        option: One of the keys of DATASETS.
+    """
+    csv_path = DATASETS[option]
+    paths = [csv_path, store_path(csv_path), cube_path(csv_path)]
+    return tuple(file_fingerprint(path) if os.path.exists(path) else None for path in paths)
+
+
+def clear_cache(kind=None):
+    """Drop every cached dataset, or only the entries of one kind.
+
+    Args:
+        kind: Second element of the cache keys to drop ("filtered",
+            "compact"…); None drops everything.
+    """
+    with _cache_guard:
+        if kind is None:
+            _cache.clear()
+        else:
+            for key in [key for key in _cache if len(key) > 1 and key[1] == kind]:
+                del _cache[key]
+
+
+if __name__ == "__main__":
+    from search_suaps import write_search_index
+
+    for written in ingest_all():
+        print(written)
+    write_search_index()
@@ -0,0 +1,402 @@
+"""Base SQLite des inscriptions SUAPS.
+
+Backend optionnel du tableau de bord : toutes les années de semestres et
+d'événements sont rangées dans une seule base normalisée (students,
+activities, slots, registrations) et les onglets interrogent la base par des
+GROUP BY indexés au lieu de charger l'export complet dans chaque processus.
+
+Alimentation :
+    python db_suaps.py                          # les exports de DATASETS
+    python db_suaps.py export.csv --dataset 2024-S1
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from cube_suaps import END_COLUMN, PERIODS, START_COLUMN, parse_horaires, student_key
+from data_suaps import DATASETS, load_csv
+
+DB_PATH = "data/suaps.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    numero_etudiant INTEGER,
+    prenom TEXT,
+    nom TEXT,
+    email TEXT,
+    sexe TEXT
+);
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    groupement TEXT,
+    activite TEXT
+);
+CREATE TABLE IF NOT EXISTS slots (
+    id INTEGER PRIMARY KEY,
+    activity_id INTEGER REFERENCES activities(id),
+    activite_detaillee TEXT,
+    libelle_complementaire TEXT,
+    niveau TEXT,
+    jour TEXT,
+    horaires TEXT,
+    lieu TEXT,
+    enseignant TEXT,
+    debut_min INTEGER,
+    fin_min INTEGER
+);
+CREATE TABLE IF NOT EXISTS registrations (
+    id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    student_id INTEGER REFERENCES students(id),
+    slot_id INTEGER REFERENCES slots(id),
+    institution TEXT,
+    departement TEXT,
+    centre_gestion TEXT,
+    code_etape TEXT,
+    calendrier TEXT,
+    type_calendrier TEXT,
+    site TEXT,
+    type_inscription TEXT,
+    inscription_semestre TEXT,
+    statut TEXT,
+    cohorte TEXT,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_students_numero ON students(numero_etudiant);
+CREATE INDEX IF NOT EXISTS idx_activities_activite ON activities(activite);
+CREATE INDEX IF NOT EXISTS idx_slots_jour ON slots(jour);
+CREATE INDEX IF NOT EXISTS idx_registrations_site ON registrations(dataset, site);
+CREATE INDEX IF NOT EXISTS idx_registrations_departement ON registrations(dataset, departement);
+CREATE INDEX IF NOT EXISTS idx_registrations_student ON registrations(student_id);
+CREATE INDEX IF NOT EXISTS idx_registrations_slot ON registrations(slot_id);
+"""
+
+# Colonne de l'export -> (table, colonne SQL)
+STUDENT_COLUMNS = {
+    "Numéro étudiant": "numero_etudiant",
+    "Prénom": "prenom",
+    "Nom de famille": "nom",
+    "Adresse de courriel": "email",
+    "Sexe": "sexe",
+}
+ACTIVITY_COLUMNS = {
+    "Groupement d’activités": "groupement",
+    "Activité": "activite",
+}
+SLOT_COLUMNS = {
+    "Activité détaillée": "activite_detaillee",
+    "Libellé complémentaire": "libelle_complementaire",
+    "Niveau": "niveau",
+    "Jour": "jour",
+    "Horaires": "horaires",
+    "Lieu": "lieu",
+    "Enseignant": "enseignant",
+}
+REGISTRATION_COLUMNS = {
+    "Institution": "institution",
+    "Département": "departement",
+    "Centre de gestion": "centre_gestion",
+    "Code étape": "code_etape",
+    "Calendrier": "calendrier",
+    "Type de calendrier": "type_calendrier",
+    "Site": "site",
+    "Type d’inscription": "type_inscription",
+    "Inscription (semestre)": "inscription_semestre",
+    "Liste (statut inscription)": "statut",
+    "Cohorte": "cohorte",
+    # Le Type (étudiant, personnel…) peut changer d'un export à l'autre : porté par l'inscription
+    "Type": "type",
+}
+
+# Expression SQL de chaque colonne de l'export dans la requête jointe
+COLUMN_EXPRESSIONS = {
+    **{name: f"st.{col}" for name, col in STUDENT_COLUMNS.items()},
+    **{name: f"a.{col}" for name, col in ACTIVITY_COLUMNS.items()},
+    **{name: f"sl.{col}" for name, col in SLOT_COLUMNS.items()},
+    **{name: f"r.{col}" for name, col in REGISTRATION_COLUMNS.items()},
+}
+
+# Minutes de début et de fin du créneau, calculées à l'ingestion (-1 : illisible)
+SLOT_MINUTE_COLUMNS = {START_COLUMN: "debut_min", END_COLUMN: "fin_min"}
+
+# Même découpage que cube_suaps.period_of, sur les minutes de début
+PERIOD_EXPRESSION = """
+CASE WHEN sl.debut_min >= 0 THEN
+    CASE WHEN sl.debut_min < 720 THEN 'Matin'
+         WHEN sl.debut_min < 1080 THEN 'Après-midi'
+         WHEN sl.debut_min < 1440 THEN 'Soir'
+    END
+END
+"""
+
+FROM_CLAUSE = """
+FROM registrations r
+JOIN students st ON st.id = r.student_id
+JOIN slots sl ON sl.id = r.slot_id
+JOIN activities a ON a.id = sl.activity_id
+"""
+
+# Connexions en lecture inactives gardées par base, prêtes pour la prochaine requête
+POOL_SIZE = 4
+_pool = {}
+_pool_guard = threading.Lock()
+
+
+def connect(path=DB_PATH, read_only=True):
+    """Open a connection to the registration database.
+
+    Args:
+        path: Path of the SQLite file.
+        read_only: Open the file in read-only mode (dashboard side).
+    """
+    if read_only:
+        # Passée d'un thread à l'autre par le pool, jamais utilisée par deux à la fois
+        return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, check_same_thread=False)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    return conn
+
+
+def _migrate(conn):
+    # Bases créées avant le découpage des horaires : ajout et calcul des minutes
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(slots)")}
+    missing = [col for col in SLOT_MINUTE_COLUMNS.values() if col not in existing]
+    for col in missing:
+        conn.execute(f"ALTER TABLE slots ADD COLUMN {col} INTEGER")
+    if missing:
+        slots = pd.read_sql_query("SELECT id, horaires FROM slots", conn)
+        minutes = parse_horaires(slots["horaires"]).rename(columns=SLOT_MINUTE_COLUMNS)
+        conn.executemany(
+            "UPDATE slots SET debut_min = ?, fin_min = ? WHERE id = ?",
+            zip(minutes["debut_min"].tolist(), minutes["fin_min"].tolist(), slots["id"].tolist()),
+        )
+
+    # Bases où le Type était celui de la première inscription de l'étudiant : repris
+    # tel quel jusqu'à la prochaine ingestion du jeu de données
+    if "type" not in {row[1] for row in conn.execute("PRAGMA table_info(registrations)")}:
+        conn.execute("ALTER TABLE registrations ADD COLUMN type TEXT")
+        conn.execute("UPDATE registrations SET type = (SELECT st.type FROM students st "
+                     "WHERE st.id = registrations.student_id)")
+    conn.commit()
+
+
+@contextmanager
+def connection(path=DB_PATH):
+    """Borrow a read-only connection for the duration of a block.
+
+    Streamlit runs every session in its own thread and sqlite3 connections
+    cannot be used by two threads at once: each block gets a connection of
+    its own, taken from the pool of the database and given back afterwards.
+    At most POOL_SIZE idle connections are kept; the others are closed.
+    """
+    with _pool_guard:
+        idle = _pool.setdefault(path, [])
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = connect(path)
+    try:
+        yield conn
+    finally:
+        with _pool_guard:
+            idle = _pool.setdefault(path, [])
+            if len(idle) < POOL_SIZE:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+
+def is_available(path=DB_PATH):
+    """Return True when the database file exists."""
+    return os.path.exists(path)
+
+
+def dataset_name(option):
+    """Return the dataset key stored in the database for a sidebar option."""
+    return os.path.splitext(os.path.basename(DATASETS[option]))[0]
+
+
+def _upsert_dimension(conn, table, rows, sql_columns):
+    """Insert missing dimension rows and return their ids aligned on rows.
+
+    The dimension table is small (a few thousand rows), so existing rows are
+    matched in pandas, where NaN keys compare equal.
+    """
+    existing = pd.read_sql_query(f"SELECT id, {', '.join(sql_columns)} FROM {table}", conn)
+    unique = rows.drop_duplicates()
+    merged = unique.merge(existing, on=sql_columns, how="left")
+    missing = merged["id"].isna()
+    if missing.any():
+        start = int(existing["id"].max()) + 1 if len(existing) else 1
+        merged.loc[missing, "id"] = range(start, start + int(missing.sum()))
+        new_rows = merged.loc[missing, ["id", *sql_columns]].astype(object)
+        placeholders = ", ".join("?" * (len(sql_columns) + 1))
+        conn.executemany(
+            f"INSERT INTO {table} (id, {', '.join(sql_columns)}) VALUES ({placeholders})",
+            new_rows.where(new_rows.notna(), None).itertuples(index=False, name=None),
+        )
+    merged["id"] = merged["id"].astype(int)
+    return rows.merge(merged, on=sql_columns, how="left")["id"].to_numpy()
+
+
+def ingest_dataframe(conn, dataset, df):
+    """Replace the registrations of a dataset with the rows of an export.
+
+    Args:
+        conn: Writable connection.
+        dataset: Dataset key (e.g. "fixed_ses1" or "2024-S1").
+        df: Registration export with the 26 columns.
+    """
+    df = df.reset_index(drop=True)
+
+    # L'identifiant d'un étudiant est sa clé entière : la même personne garde
+    # le même id d'un semestre et d'une année à l'autre
+    student_ids = student_key(df, dataset)
+    first = ~student_ids.duplicated()
+    students = df.loc[first, list(STUDENT_COLUMNS)].rename(columns=STUDENT_COLUMNS)
+    students["numero_etudiant"] = students["numero_etudiant"].astype("Int64")
+    students = students.astype(object).where(students.notna(), None)
+    students.insert(0, "id", student_ids[first].astype(object))
+    # L'identité (nom, courriel…) est celle du dernier export ingéré
+    placeholders = ", ".join("?" * students.shape[1])
+    updates = ", ".join(f"{col} = excluded.{col}" for col in students.columns if col != "id")
+    conn.executemany(
+        f"INSERT INTO students ({', '.join(students.columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(id) DO UPDATE SET {updates}",
+        students.itertuples(index=False, name=None),
+    )
+
+    activities = df[list(ACTIVITY_COLUMNS)].rename(columns=ACTIVITY_COLUMNS).astype(object)
+    activity_ids = _upsert_dimension(conn, "activities", activities.where(activities.notna(), None),
+                                     list(ACTIVITY_COLUMNS.values()))
+
+    slots = df[list(SLOT_COLUMNS)].rename(columns=SLOT_COLUMNS).astype(object)
+    slots.insert(0, "activity_id", activity_ids)
+    slots = slots.where(slots.notna(), None)
+    minutes = parse_horaires(df["Horaires"]).rename(columns=SLOT_MINUTE_COLUMNS)
+    slots = slots.join(minutes.astype("int64"))
+    slot_ids = _upsert_dimension(conn, "slots", slots,
+                                 ["activity_id", *SLOT_COLUMNS.values(), *SLOT_MINUTE_COLUMNS.values()])
+
+    registrations = df[list(REGISTRATION_COLUMNS)].rename(columns=REGISTRATION_COLUMNS).astype(object)
+    registrations = registrations.where(registrations.notna(), None)
+    registrations.insert(0, "slot_id", slot_ids)
+    registrations.insert(0, "student_id", student_ids.to_numpy())
+    registrations.insert(0, "dataset", dataset)
+
+    conn.execute("DELETE FROM registrations WHERE dataset = ?", (dataset,))
+    placeholders = ", ".join("?" * registrations.shape[1])
+    conn.executemany(
+        f"INSERT INTO registrations ({', '.join(registrations.columns)}) VALUES ({placeholders})",
+        registrations.itertuples(index=False, name=None),
+    )
+    conn.commit()
+    return len(registrations)
+
+
+def _where(dataset, site):
+    clause, params = "WHERE r.dataset = ?", [dataset]
+    if site and site != "Tous":
+        clause += " AND r.site = ?"
+        params.append(site)
+    return clause, params
+
+
+def count_by(conn, dataset, column, site=None):
+    """Registrations per value of an export column, most frequent first.
+
+    Ties keep the order of first appearance in the export, as value_counts().
+
+    Args:
+        conn: Database connection.
+        dataset: Dataset key.
+        column: Export column name (e.g. "Activité").
+        site: Optional site filter ("Tous" means no filter).
+
+    Returns:
+        A Series indexed by the column values, like value_counts().
+    """
+    expr = COLUMN_EXPRESSIONS[column]
+    where, params = _where(dataset, site)
+    rows = conn.execute(
+        f"SELECT {expr}, COUNT(*) AS n {FROM_CLAUSE} {where} AND {expr} IS NOT NULL "
+        f"GROUP BY {expr} ORDER BY n DESC, MIN(r.id)",
+        params,
+    ).fetchall()
+    return pd.Series([n for _, n in rows], index=pd.Index([v for v, _ in rows], name=column),
+                     name="count")
+
+
+def count_pairs(conn, dataset, column_a, column_b, site=None):
+    """Registrations per (column_a, column_b) pair, like groupby().size()."""
+    expr_a, expr_b = COLUMN_EXPRESSIONS[column_a], COLUMN_EXPRESSIONS[column_b]
+    where, params = _where(dataset, site)
+    return pd.read_sql_query(
+        f"SELECT {expr_a} AS a, {expr_b} AS b, COUNT(*) AS n {FROM_CLAUSE} {where} "
+        f"AND {expr_a} IS NOT NULL AND {expr_b} IS NOT NULL "
+        f"GROUP BY {expr_a}, {expr_b} ORDER BY {expr_a}, {expr_b}",
+        conn, params=params,
+    ).rename(columns={"a": column_a, "b": column_b, "n": "size"})
+
+
+def count_distinct(conn, dataset, column, site=None):
+    """Number of distinct non-null values of an export column."""
+    expr = COLUMN_EXPRESSIONS[column]
+    where, params = _where(dataset, site)
+    return conn.execute(f"SELECT COUNT(DISTINCT {expr}) {FROM_CLAUSE} {where}", params).fetchone()[0]
+
+
+def count_people(conn, dataset, site=None, by=None):
+    """Distinct students (student keys), optionally per value of an export column."""
+    where, params = _where(dataset, site)
+    if by is not None:
+        expr = COLUMN_EXPRESSIONS[by]
+        rows = conn.execute(
+            f"SELECT {expr}, COUNT(DISTINCT r.student_id) AS n {FROM_CLAUSE} {where} "
+            f"AND {expr} IS NOT NULL GROUP BY {expr} ORDER BY n DESC, MIN(r.id)",
+            params,
+        ).fetchall()
+        return pd.Series([n for _, n in rows], index=pd.Index([v for v, _ in rows], name=by),
+                         name="count")
+    return conn.execute(f"SELECT COUNT(DISTINCT r.student_id) {FROM_CLAUSE} {where}", params).fetchone()[0]
+
+
+def count_periods(conn, dataset, site=None):
+    """Registrations per period of the day (Matin / Après-midi / Soir)."""
+    where, params = _where(dataset, site)
+    rows = dict(conn.execute(
+        f"SELECT {PERIOD_EXPRESSION} AS periode, COUNT(*) {FROM_CLAUSE} {where} GROUP BY periode",
+        params,
+    ).fetchall())
+    counts = pd.Series([rows.get(p, 0) for p in PERIODS], index=pd.Index(PERIODS, name="Période"),
+                       name="count")
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alimente la base SQLite des inscriptions SUAPS.")
+    parser.add_argument("files", nargs="*", help="exports CSV (par défaut ceux du tableau de bord)")
+    parser.add_argument("--dataset", help="clé du jeu de données (un seul fichier)")
+    parser.add_argument("--db", default=DB_PATH, help="fichier SQLite")
+    args = parser.parse_args()
+
+    files = args.files or list(DATASETS.values())
+    if args.dataset and len(files) != 1:
+        parser.error("--dataset ne s'utilise qu'avec un seul fichier")
+
+    conn = connect(args.db, read_only=False)
+    for path in files:
+        dataset = args.dataset or os.path.splitext(os.path.basename(path))[0]
+        count = ingest_dataframe(conn, dataset, load_csv(path))
+        print(f"{dataset}: {count} inscriptions")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
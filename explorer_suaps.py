@@ -0,0 +1,104 @@
+"""Explorateur des inscriptions, trié, filtré et paginé côté serveur.
+
+Pour chaque colonne triable, l'ordre des lignes est calculé une fois par
+version des données (tri sur les valeurs distinctes, sans accents ni casse)
+et partagé par toutes les sessions. Une requête ne fait ensuite que :
+
+- un masque des lignes retenues, lu dans l'index bitmap des filtres ;
+- le parcours de l'ordre pré-calculé en ne gardant que ces lignes ;
+- la lecture des seules lignes de la page, colonnes d'identité comprises.
+
+Le navigateur ne reçoit que la page affichée, quelle que soit la taille de
+l'export.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_suaps import DATASETS, cached, dataset_version, load_compact, load_filter_index
+
+# Colonnes affichées par l'explorateur, dans l'ordre
+EXPLORER_COLUMNS = [
+    "Nom de famille", "Prénom", "Numéro étudiant", "Type", "Département", "Site", "Activité", "Niveau",
+    "Jour", "Horaires", "Lieu", "Enseignant", "Type d’inscription", "Liste (statut inscription)",
+]
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+
+def sort_order(values):
+    """Row positions sorted by values, missing values last.
+
+    Only the distinct values are compared, text without case or accents
+    ("Élise" sorts with "Elise"), then the rows are ordered by the rank of
+    their value with a stable sort.
+
+    Returns:
+        (order, missing): int32 positions and the number of missing values.
+    """
+    codes, uniques = pd.factorize(values)
+    if pd.api.types.is_numeric_dtype(uniques.dtype):
+        ranks = np.argsort(np.argsort(np.asarray(uniques, dtype=float), kind="stable"))
+    else:
+        text = pd.Series(np.asarray(uniques, dtype=object), dtype="string")
+        folded = text.str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True).str.casefold()
+        ranks = np.empty(len(uniques), dtype=np.int64)
+        ranks[np.lexsort((text.to_numpy(dtype=object), folded.to_numpy(dtype=object)))] = np.arange(len(uniques))
+    keys = np.where(codes < 0, len(uniques), ranks[np.maximum(codes, 0)] if len(uniques) else 0)
+    return np.argsort(keys, kind="stable").astype(np.int32), int((codes < 0).sum())
+
+
+def load_order(option, column):
+    """Shared sort order of one column of a sidebar option (see sort_order())."""
+    return cached((os.path.abspath(DATASETS[option]), "order", column), dataset_version(option),
+                  lambda: sort_order(load_compact(option).frame([column])[column]))
+
+
+def select_rows(spec, sort=None, descending=False):
+    """Positions of the registrations matching spec, in display order.
+
+    Args:
+        spec: FilterSpec (analytics_suaps); dimensions without bitmap are
+            filtered on their values.
+        sort: Column to sort by, or None for the order of the export.
+        descending: Reverse the sort; missing values stay last.
+
+    Returns:
+        An array of row positions for page_frame().
+    """
+    index = load_filter_index(spec.dataset)
+    mask = index.mask({dim: values for dim, values in spec.filters.items() if dim in index.dimensions})
+    others = [dim for dim in spec.filters if dim not in index.dimensions]
+    if others:
+        frame = load_compact(spec.dataset).frame(others)
+        for dim in others:
+            mask &= frame[dim].astype("string").isin(spec.filters[dim]).to_numpy(dtype=bool, na_value=False)
+    if sort is None:
+        rows = np.flatnonzero(mask)
+        return rows[::-1] if descending else rows
+    order, missing = load_order(spec.dataset, sort)
+    if descending:
+        present = len(order) - missing
+        order = np.concatenate([order[:present][::-1], order[present:]])
+    return order[mask[order]]
+
+
+def page_count(total, page_size):
+    """Number of pages of total rows (at least one)."""
+    return max(1, math.ceil(total / page_size))
+
+
+def page_frame(option, rows, page, page_size, columns=EXPLORER_COLUMNS):
+    """Registrations of one page of rows.
+
+    Args:
+        option: One of the keys of DATASETS.
+        rows: Positions returned by select_rows().
+        page: Page number, from 1; clamped to the last page.
+        page_size: Rows per page.
+        columns: Columns to read; unknown names are ignored.
+    """
+    page = min(max(page, 1), page_count(len(rows), page_size))
+    return load_compact(option).take(rows[(page - 1) * page_size:page * page_size], columns)
@@ -0,0 +1,107 @@
+"""Index bitmap des filtres du tableau de bord.
+
+Pour chaque dimension filtrable (site, département, niveau, jour, type…),
+une bitmap compacte (un bit par inscription, np.packbits, sans autre
+compression) est calculée une fois par valeur. Un filtre combiné est un OU
+entre les valeurs retenues d'une dimension puis un ET entre les
+dimensions : quelques opérations bit à bit sur des tableaux uint8, sans
+copier le DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+from cube_suaps import ALL_SITES
+
+# Dimensions indexées par défaut
+FILTER_DIMENSIONS = ["Site", "Département", "Niveau", "Jour", "Type", "Type d’inscription"]
+
+# Nombre de bits à 1 de chaque octet
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class FilterIndex:
+    """One packed bitmap per value of each filter dimension.
+
+    Attributes:
+        n_rows: Number of indexed registrations.
+        dimensions: Indexed column names.
+    """
+
+    def __init__(self, n_rows, labels, bitmaps):
+        self.n_rows = n_rows
+        self._labels = labels
+        self._positions = {dim: {label: i for i, label in enumerate(values)} for dim, values in labels.items()}
+        self._bitmaps = bitmaps
+
+    @classmethod
+    def from_frame(cls, df, dimensions=FILTER_DIMENSIONS):
+        """Index the filter dimensions of a registration frame.
+
+        Args:
+            df: Registration frame (CSV or Parquet store).
+            dimensions: Columns to index; missing columns are skipped.
+        """
+        labels, bitmaps = {}, {}
+        for dim in dimensions:
+            if dim not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[dim], sort=True)
+            labels[dim] = [str(value) for value in uniques]
+            bitmaps[dim] = np.empty((len(uniques), (len(df) + 7) // 8), dtype=np.uint8)
+            for i in range(len(uniques)):
+                bitmaps[dim][i] = np.packbits(codes == i)
+        return cls(len(df), labels, bitmaps)
+
+    @property
+    def dimensions(self):
+        return list(self._labels)
+
+    def values(self, dimension):
+        """Indexed values of a dimension, sorted."""
+        return list(self._labels[dimension])
+
+    def bitmap(self, filters=None):
+        """Packed bitmap of the rows matching filters.
+
+        Args:
+            filters: Dict of dimension -> value or list of values. A value of
+                None, "Tous" or an empty list does not filter the dimension;
+                unknown values match no row.
+
+        Raises:
+            KeyError: A filtered dimension is not indexed.
+        """
+        result = np.full((self.n_rows + 7) // 8, 0xFF, dtype=np.uint8)
+        for dim, value in (filters or {}).items():
+            if value is None or value == ALL_SITES:
+                continue
+            values = [value] if isinstance(value, str) or not np.iterable(value) else list(value)
+            if not values:
+                continue
+            positions = self._positions[dim]
+            selected = [positions[str(v)] for v in values if str(v) in positions]
+            if not selected:
+                return np.zeros_like(result)
+            result &= np.bitwise_or.reduce(self._bitmaps[dim][selected], axis=0)
+        return result
+
+    def mask(self, filters=None):
+        """Boolean mask (one entry per row) of the rows matching filters."""
+        return np.unpackbits(self.bitmap(filters), count=self.n_rows).astype(bool)
+
+    def rows(self, filters=None):
+        """Positions of the rows matching filters, for DataFrame.take()."""
+        return np.flatnonzero(np.unpackbits(self.bitmap(filters), count=self.n_rows))
+
+    def count(self, filters=None):
+        """Number of rows matching filters, counted on the packed bitmap."""
+        bitmap = self.bitmap(filters)
+        if self.n_rows % 8:
+            # Bits de remplissage du dernier octet
+            bitmap[-1] &= np.uint8(0xFF << (8 - self.n_rows % 8) & 0xFF)
+        return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+
+    @property
+    def nbytes(self):
+        """Memory used by the bitmaps."""
+        return sum(bitmaps.nbytes for bitmaps in self._bitmaps.values())
@@ -0,0 +1,267 @@
+"""Réingestion incrémentale des exports SUAPS.
+
+Le gestionnaire garde l'empreinte (mtime, taille) de chaque export dans un
+manifeste du store et ne retraite que les fichiers nouveaux ou modifiés.
+Pour un export d'inscriptions, les lignes sont comparées par empreinte
+(hash de ligne) à la version précédente : le cube d'agrégats est mis à jour
+avec les seules lignes ajoutées et supprimées lorsque le delta est petit.
+L'index de recherche (search_suaps) est reconstruit, puis les vues des jeux
+modifiés sont préchauffées en arrière-plan (warmup_suaps), de sorte que les sessions en cours voient les nouvelles
+données sans redémarrage ni attente.
+
+    python ingest_suaps.py              # un passage
+    python ingest_suaps.py --watch 60   # surveillance toutes les 60 s
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import db_suaps
+import warmup_suaps
+from attendance_suaps import PRESENCE_DIR, get_index
+from cube_suaps import build_cube, read_cube, update_cube
+from data_suaps import (
+    DATASETS, REGISTRATION_COLUMNS, STORE_DIR, cube_path, file_fingerprint,
+    prepare_export, read_export, store_lock, store_path, temp_path, write_store,
+)
+from search_suaps import write_search_index
+
+MANIFEST_NAME = "manifest.json"
+
+# Au-delà de cette part de lignes modifiées, le cube est recalculé en entier
+MAX_DELTA_RATIO = 0.3
+
+# Erreurs des passages en arrière-plan gardées pour le panneau de performance
+MAX_ERRORS = 10
+
+
+def hashes_path(csv_path, store_dir=STORE_DIR):
+    """Return the file holding the row hashes of an ingested export."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_dir, name + ".hashes.npy")
+
+
+def row_hashes(df):
+    """64-bit hash of every row over the 26 export columns."""
+    columns = [col for col in REGISTRATION_COLUMNS if col in df.columns]
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def row_delta(old, new):
+    """Compare two versions of an export as multisets of row hashes.
+
+    Args:
+        old: Row hashes of the previous version.
+        new: Row hashes of the new version.
+
+    Returns:
+        (added, removed): positions of the rows of new missing from old, and
+        positions of the rows of old missing from new. Duplicate rows are
+        matched occurrence by occurrence.
+    """
+    def keyed(hashes):
+        occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+        return pd.MultiIndex.from_arrays([hashes, occurrence])
+
+    old_keys, new_keys = keyed(old), keyed(new)
+    return np.flatnonzero(~new_keys.isin(old_keys)), np.flatnonzero(~old_keys.isin(new_keys))
+
+
+def ingest_incremental(csv_path, store_dir=STORE_DIR, max_delta_ratio=MAX_DELTA_RATIO, export=None):
+    """Ingest a registration export, updating its cube from the row delta.
+
+    Args:
+        csv_path: Path of the CSV (or Excel) export.
+        store_dir: Directory of the columnar store.
+        max_delta_ratio: Largest share of changed rows for a delta update.
+        export: The export already read; read from csv_path when None.
+
+    Returns:
+        A dict (path, rows, added, removed, mode) where mode is "delta" or
+        "full".
+    """
+    df = prepare_export(read_export(csv_path) if export is None else export, csv_path)
+    hashes = row_hashes(df)
+    parquet, cube_file, hash_file = (store_path(csv_path, store_dir), cube_path(csv_path, store_dir),
+                                     hashes_path(csv_path, store_dir))
+
+    mode, added, removed = "full", np.arange(len(df)), np.array([], dtype=np.int64)
+    # Les empreintes ne valent que pour le store écrit en même temps qu'elles
+    # (un `python data_suaps.py` ultérieur réécrit le store sans elles)
+    if all(os.path.exists(path) for path in (parquet, cube_file, hash_file)) \
+            and file_fingerprint(hash_file)[0] >= file_fingerprint(parquet)[0]:
+        old_hashes = np.load(hash_file)
+        added, removed = row_delta(old_hashes, hashes)
+        if len(added) + len(removed) <= max_delta_ratio * max(len(df), 1):
+            mode = "delta"
+
+    if mode == "delta":
+        removed_rows = pq.read_table(parquet).to_pandas().take(removed) if len(removed) else df.iloc[:0]
+        cube = update_cube(read_cube(cube_file), df, df.take(added), removed_rows)
+    else:
+        cube = build_cube(df)
+    write_store(df, csv_path, store_dir, cube)
+
+    tmp_path = temp_path(hash_file, ".tmp.npy")
+    np.save(tmp_path, hashes)
+    os.replace(tmp_path, hash_file)
+    return {"path": csv_path, "rows": len(df), "added": len(added), "removed": len(removed), "mode": mode}
+
+
+def read_manifest(store_dir=STORE_DIR):
+    """Fingerprints of the exports at their last ingestion, as {path: (mtime_ns, size)}."""
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {source: tuple(fingerprint) for source, fingerprint in json.load(f).items()}
+
+
+def write_manifest(manifest, store_dir=STORE_DIR):
+    """Replace the manifest of the store (written atomically)."""
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({source: list(fingerprint) for source, fingerprint in manifest.items()}, f,
+                  ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+class IngestionManager:
+    """Reprocess the exports of data/ whose fingerprint changed.
+
+    Attributes:
+        store_dir: Directory of the columnar store (and of the manifest).
+        presence_dir: Directory of the presence exports.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, presence_dir=PRESENCE_DIR):
+        self.store_dir = store_dir
+        self.presence_dir = presence_dir
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._guard = threading.Lock()
+        self._status = {"runs": 0, "ingested": 0, "last_run": None, "errors": []}
+
+    def status(self):
+        """Snapshot of the background passes: runs, ingested exports, last run, errors."""
+        with self._guard:
+            return {**self._status, "errors": list(self._status["errors"])}
+
+    def changed(self):
+        """Registration exports that are new or changed since their last ingestion."""
+        manifest = read_manifest(self.store_dir)
+        return [path for path in DATASETS.values()
+                if os.path.exists(path) and manifest.get(path) != file_fingerprint(path)]
+
+    def run_once(self):
+        """Ingest the changed exports, refresh the search and presence indexes and warm the caches.
+
+        Returns:
+            One result dict per ingested export (see ingest_incremental()).
+        """
+        # Un seul passage à la fois, y compris entre processus (serveurs, import en masse)
+        with self._lock, store_lock(self.store_dir):
+            manifest = read_manifest(self.store_dir)
+            results = []
+            for path in self.changed():
+                fingerprint = file_fingerprint(path)
+                # Export lu une fois pour le store et pour la base SQLite
+                export = read_export(path)
+                results.append(ingest_incremental(path, self.store_dir, export=export))
+                if db_suaps.is_available():
+                    conn = db_suaps.connect(db_suaps.DB_PATH, read_only=False)
+                    try:
+                        db_suaps.ingest_dataframe(conn, os.path.splitext(os.path.basename(path))[0], export)
+                    finally:
+                        conn.close()
+                manifest[path] = fingerprint
+            if results:
+                write_manifest(manifest, self.store_dir)
+                write_search_index(self.store_dir)
+
+        # Préchauffage en arrière-plan : la première session après le changement
+        # ne paie ni le parsing ni les agrégats
+        changed = [option for option, path in DATASETS.items()
+                   if any(result["path"] == path for result in results)]
+        if changed:
+            warmup_suaps.schedule(changed)
+        # Feuilles de présence : index rafraîchi, chaque feuille lue à sa consultation
+        get_index(self.presence_dir)
+        return results
+
+    def start(self, interval=60):
+        """Run run_once() every interval seconds in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    results, error = self.run_once(), None
+                except Exception as exc:  # le tableau de bord continue avec les données précédentes
+                    results, error = [], f"{time.strftime('%Y-%m-%dT%H:%M:%S')} : {exc!r}"
+                with self._guard:
+                    self._status["runs"] += 1
+                    self._status["ingested"] += len(results)
+                    self._status["last_run"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+                    if error:
+                        # Seules les dernières erreurs sont gardées
+                        self._status["errors"] = (self._status["errors"] + [error])[-MAX_ERRORS:]
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="suaps-ingest", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Stop the background thread started by start()."""
+        self._stop.set()
+
+
+_manager = None
+_manager_guard = threading.Lock()
+
+
+def start_watcher(interval=60):
+    """Start the process-wide ingestion manager once; return it.
+
+    Errors of the background passes are kept in its status().
+    """
+    global _manager
+    with _manager_guard:
+        if _manager is None:
+            _manager = IngestionManager()
+        _manager.start(interval)
+    return _manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réingère les exports SUAPS modifiés.")
+    parser.add_argument("--watch", type=float, default=0, help="intervalle de surveillance en secondes")
+    args = parser.parse_args()
+
+    manager = IngestionManager()
+    while True:
+        started = time.perf_counter()
+        results = manager.run_once()
+        for result in results:
+            print(f"{result['path']}: {result['rows']} lignes, +{result['added']} -{result['removed']} "
+                  f"({result['mode']})")
+        if results:
+            print(f"{len(results)} export(s) réingéré(s) en {time.perf_counter() - started:.2f} s")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Parcours des étudiants d'un jeu de données à l'autre.
+
+Les exports (Semestre 1, Semestre 2, Événements…) sont joints sur la clé
+entière des étudiants (Clé étudiant, dérivée du Numéro étudiant) : les
+jointures sont des hachages d'entiers, jamais des fusions sur des colonnes
+texte. Pour un couple (source, cible), la jointure est calculée une fois par
+version des données puis partagée par toutes les sessions :
+
+- chaque étudiant de la source est retenu avec la même activité, retenu
+  avec une autre activité ou parti ; ceux de la cible seule sont arrivés ;
+- les transitions activité source → activité cible forment une matrice
+  creuse découpée par site et département de la source.
+
+Filtrer par site ou département ne fait que sélectionner des lignes ou des
+couches de ces structures.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from cube_suaps import ALL_SITES, STUDENT_KEY
+from data_suaps import DATASETS, cached, dataset_version, load_dataset
+from matrix_suaps import PairMatrix
+
+JOURNEY_COLUMNS = [STUDENT_KEY, "Activité", "Site", "Département"]
+SOURCE_ACTIVITY = "Activité (source)"
+TARGET_ACTIVITY = "Activité (cible)"
+
+# Statut d'un étudiant entre la source et la cible
+SAME, SWITCHED, CHURNED, NEW = "Même activité", "Autre activité", "Départ", "Arrivée"
+STATUSES = [SAME, SWITCHED, CHURNED, NEW]
+
+
+def _registrations(option):
+    # (clé, activité, site, département) des inscriptions d'un jeu de données
+    df = load_dataset(option, JOURNEY_COLUMNS).dropna(subset=["Activité"])
+    return df.astype({STUDENT_KEY: "int64", "Activité": "string", "Site": "string", "Département": "string"})
+
+
+def _filter_mask(frame, site=None, departments=None):
+    mask = np.ones(len(frame), dtype=bool)
+    if site not in (None, ALL_SITES):
+        mask &= (frame["Site"] == site).to_numpy(dtype=bool, na_value=False)
+    if departments:
+        mask &= frame["Département"].isin(list(departments)).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+class Transition:
+    """Students of two datasets joined on their integer key.
+
+    Attributes:
+        source, target: Keys of DATASETS.
+        students: One row per student of either dataset: key, Site and
+            Département (from the source, or the target for new students),
+            and status (see STATUSES).
+        moves: PairMatrix of the students per (source activity, target
+            activity), in layers of source Site and Département.
+    """
+
+    def __init__(self, source, target, students, moves):
+        self.source = source
+        self.target = target
+        self.students = students
+        self.moves = moves
+
+    @classmethod
+    def from_frames(cls, source_df, target_df, source="source", target="cible"):
+        """Join two registration frames with the JOURNEY_COLUMNS columns."""
+        # Un couple (étudiant, activité) par inscription distincte, activités codées
+        # sur un vocabulaire commun aux deux jeux
+        activities = pd.Index(pd.concat([source_df["Activité"], target_df["Activité"]]).unique())
+        pairs_a = pd.DataFrame({STUDENT_KEY: source_df[STUDENT_KEY].to_numpy(),
+                                "code": activities.get_indexer(source_df["Activité"])}).drop_duplicates()
+        pairs_b = pd.DataFrame({STUDENT_KEY: target_df[STUDENT_KEY].to_numpy(),
+                                "code": activities.get_indexer(target_df["Activité"])}).drop_duplicates()
+
+        # Site et département d'un étudiant : ceux de sa première inscription
+        first_a = source_df.drop_duplicates(STUDENT_KEY)[[STUDENT_KEY, "Site", "Département"]]
+        first_b = target_df.drop_duplicates(STUDENT_KEY)[[STUDENT_KEY, "Site", "Département"]]
+        keys_a = first_a[STUDENT_KEY].to_numpy()
+        keys_b = first_b[STUDENT_KEY].to_numpy()
+        retained = np.isin(keys_a, keys_b)
+        same_keys = pairs_a.merge(pairs_b, on=[STUDENT_KEY, "code"])[STUDENT_KEY].unique()
+        status_a = np.where(~retained, CHURNED, np.where(np.isin(keys_a, same_keys), SAME, SWITCHED))
+        students = pd.concat([
+            first_a.assign(status=status_a),
+            first_b[~np.isin(keys_b, keys_a)].assign(status=NEW),
+        ], ignore_index=True)
+        students["status"] = pd.Categorical(students["status"], categories=STATUSES)
+        students["Site"] = students["Site"].astype("category")
+        students["Département"] = students["Département"].astype("category")
+
+        # Transitions des étudiants retenus : jointure sur la clé entière
+        moves = pairs_a[np.isin(pairs_a[STUDENT_KEY].to_numpy(), keys_b)].merge(
+            pairs_b, on=STUDENT_KEY, suffixes=("_a", "_b")).merge(first_a, on=STUDENT_KEY)
+        labels = activities.to_numpy(dtype=object)
+        moves = pd.DataFrame({
+            SOURCE_ACTIVITY: labels[moves["code_a"].to_numpy()],
+            TARGET_ACTIVITY: labels[moves["code_b"].to_numpy()],
+            "Site": moves["Site"].to_numpy(),
+            "Département": moves["Département"].to_numpy(),
+        })
+        matrix = PairMatrix.from_frame(moves, SOURCE_ACTIVITY, TARGET_ACTIVITY, layers=("Site", "Département"))
+        return cls(source, target, students, matrix)
+
+    def retention(self, site=None, departments=None):
+        """Students per status for a site and departments.
+
+        Returns:
+            A dict with one count per status, "retained" (same or other
+            activity) and "rate", the share of source students found in the
+            target, in percent.
+        """
+        selected = self.students[_filter_mask(self.students, site, departments)]
+        counts = selected["status"].value_counts().reindex(STATUSES, fill_value=0)
+        result = {status: int(counts[status]) for status in STATUSES}
+        result["retained"] = result[SAME] + result[SWITCHED]
+        source_total = result["retained"] + result[CHURNED]
+        result["rate"] = round(100 * result["retained"] / source_total, 2) if source_total else 0.0
+        return result
+
+    def transitions(self, site=None, departments=None, k_rows=None, k_columns=None):
+        """Students per (source activity, target activity) pair.
+
+        Args:
+            site: Source site ("Tous" or None for every site).
+            departments: Source departments to keep (all when empty).
+            k_rows, k_columns: Keep only the pairs among the top-k source and
+                target activities.
+
+        Returns:
+            A DataFrame (Activité (source), Activité (cible), Nombre d'étudiants).
+        """
+        filters = {"Site": site, "Département": list(departments) if departments else None}
+        if k_rows or k_columns:
+            return self.moves.top_pairs(k_rows or len(self.moves.rows), k_columns or len(self.moves.columns),
+                                        "Nombre d'étudiants", **filters)
+        return self.moves.frame("Nombre d'étudiants", **filters)
+
+
+def load_transition(source, target):
+    """Return the shared Transition between two sidebar options.
+
+    Built once per version of the two datasets.
+
+    Args:
+        source, target: Keys of DATASETS.
+    """
+    return cached((os.path.abspath(DATASETS[source]), "journey", target),
+                  (dataset_version(source), dataset_version(target)),
+                  lambda: Transition.from_frames(_registrations(source), _registrations(target), source, target))
+
+
+def presence_patterns(options=None, site=None, departments=None):
+    """Number of students per combination of datasets they appear in.
+
+    Args:
+        options: Keys of DATASETS (all by default).
+        site, departments: Keep students whose first registration matches.
+
+    Returns:
+        A DataFrame (Parcours, Nombre d'étudiants), e.g. "Semestre 1 + Semestre 2".
+    """
+    options = list(options or DATASETS)
+    frames = []
+    for bit, option in enumerate(options):
+        first = _registrations(option).drop_duplicates(STUDENT_KEY)
+        first = first[_filter_mask(first, site, departments)]
+        frames.append(pd.DataFrame({STUDENT_KEY: first[STUDENT_KEY].to_numpy(), "bit": 1 << bit}))
+    # Un masque de bits par étudiant : somme des bits de ses jeux de données
+    masks = pd.concat(frames).groupby(STUDENT_KEY)["bit"].sum().value_counts()
+    labels = [" + ".join(option for bit, option in enumerate(options) if mask >> bit & 1) for mask in masks.index]
+    return pd.DataFrame({"Parcours": labels, "Nombre d'étudiants": masks.to_numpy()})
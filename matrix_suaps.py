@@ -0,0 +1,217 @@
+"""Matrices de comptage des inscriptions.
+
+Les inscriptions par créneau sont rangées dans un tableau numpy dense
+site × jour × horaire : la heatmap et le classement des créneaux les plus
+chargés sont des tranches ou des réductions vectorisées de ce tableau,
+sans regroupement sur des colonnes texte.
+"""
+import numpy as np
+import pandas as pd
+
+from cube_suaps import ALL_SITES, END_COLUMN, START_COLUMN, WEEKDAYS, parse_horaires
+
+
+def _slot_order(horaires):
+    """Horaires labels sorted by start then end time (unreadable slots last)."""
+    labels = pd.Series(pd.unique(pd.Series(horaires, dtype="string").dropna()), dtype="string")
+    minutes = parse_horaires(labels).replace(-1, 24 * 60)
+    order = np.lexsort((labels.to_numpy(), minutes[END_COLUMN].to_numpy(), minutes[START_COLUMN].to_numpy()))
+    return labels.iloc[order].tolist()
+
+
+class SlotMatrix:
+    """Registrations per (site, Jour, Horaires) as a dense integer array.
+
+    Attributes:
+        sites: Site labels (first axis).
+        days: Jour labels, lundi to dimanche then any other value (second axis).
+        slots: Horaires labels in time order (third axis).
+        counts: int64 array of shape (len(sites), len(days), len(slots)).
+    """
+
+    def __init__(self, sites, days, slots, counts=None):
+        self.sites = list(sites)
+        self.days = list(days)
+        self.slots = list(slots)
+        self._positions = [{label: i for i, label in enumerate(axis)}
+                           for axis in (self.sites, self.days, self.slots)]
+        shape = (len(self.sites), len(self.days), len(self.slots))
+        self.counts = np.zeros(shape, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def from_frame(cls, df, size=None):
+        """Build the matrix from registrations or from pre-aggregated counts.
+
+        Args:
+            df: Frame with Jour and Horaires columns, and optionally Site.
+            size: Optional column holding a count per row (e.g. "size" of a
+                groupby); each row counts once otherwise.
+        """
+        # Chaque colonne est factorisée : seules les valeurs distinctes sont normalisées
+        columns = [df["Site"] if "Site" in df.columns else pd.Series(ALL_SITES, index=df.index),
+                   df["Jour"], df["Horaires"]]
+        factorized = [pd.factorize(column) for column in columns]
+        sites, jours, horaires = (pd.Series(uniques, dtype="string") for _, uniques in factorized)
+        jours = jours.str.strip().str.lower()
+        days = [day for day in WEEKDAYS if day in set(jours)] + sorted(set(jours) - set(WEEKDAYS))
+        matrix = cls(sorted(sites), days, _slot_order(horaires))
+
+        index = []
+        for (codes, _), labels, axis in zip(factorized, (sites, jours, horaires),
+                                            (matrix.sites, matrix.days, matrix.slots)):
+            positions = np.append(pd.Index(axis).get_indexer(labels), -1)
+            index.append(positions[codes])
+        valid = (index[0] >= 0) & (index[1] >= 0) & (index[2] >= 0)
+        flat = np.ravel_multi_index([positions[valid] for positions in index], matrix.counts.shape)
+        weights = df[size].to_numpy(dtype=np.int64)[valid] if size else None
+        matrix.counts += np.bincount(flat, weights=weights, minlength=matrix.counts.size).astype(np.int64) \
+            .reshape(matrix.counts.shape)
+        return matrix
+
+    def matrix(self, site=ALL_SITES):
+        """Jour × Horaires counts of a site, or of every site for "Tous"."""
+        if site in (None, ALL_SITES):
+            return self.counts.sum(axis=0)
+        position = self._positions[0].get(site)
+        return self.counts[position] if position is not None else np.zeros(self.counts.shape[1:], dtype=np.int64)
+
+    def peaks(self, site=ALL_SITES, k=10):
+        """The k busiest (Jour, Horaires) slots, busiest first.
+
+        Returns:
+            A DataFrame (Jour, Horaires, Nombre d'inscriptions).
+        """
+        values = self.matrix(site).ravel()
+        k = min(k, int((values > 0).sum()))
+        top = np.argpartition(-values, k - 1)[:k] if k else np.array([], dtype=np.int64)
+        top = top[np.argsort(-values[top], kind="stable")]
+        days, slots = np.unravel_index(top, self.counts.shape[1:])
+        return pd.DataFrame({
+            "Jour": [self.days[i] for i in days],
+            "Horaires": [self.slots[i] for i in slots],
+            "Nombre d'inscriptions": values[top],
+        })
+
+
+class PairMatrix:
+    """Sparse co-occurrence counts of two columns, split into layers.
+
+    Only the non-empty (layer, row, column) cells are stored, in coordinate
+    format. Layers are the values of one or more columns (Site, semester…),
+    so a site or semester filter selects entries instead of regrouping the
+    registrations.
+
+    Attributes:
+        rows: Labels of the row column, sorted.
+        columns: Labels of the column column, sorted.
+        layers: DataFrame with one row per layer and one column per layer column.
+        row_name, column_name: Names of the two counted columns.
+    """
+
+    def __init__(self, rows, columns, layers, row_name, column_name, layer, row, column, values):
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.layers = layers
+        self.row_name = row_name
+        self.column_name = column_name
+        self._layer = layer
+        self._row = row
+        self._column = column
+        self._values = values
+
+    @classmethod
+    def from_frame(cls, df, row="Département", column="Activité", layers=("Site",), size=None):
+        """Build the matrix from registrations or from pre-aggregated counts.
+
+        Args:
+            df: Frame with the row, column and layer columns.
+            row, column: Counted columns.
+            layers: Columns splitting the counts; missing columns are ignored.
+            size: Optional column holding a count per row.
+        """
+        layers = [name for name in layers if name in df.columns]
+        codes, labels = [], []
+        for i, name in enumerate((row, column, *layers)):
+            values = df[name].astype("string") if isinstance(df[name].dtype, pd.CategoricalDtype) else df[name]
+            # Une valeur de découpage manquante forme sa propre couche
+            code, unique = pd.factorize(values, sort=True, use_na_sentinel=i < 2)
+            codes.append(code)
+            labels.append(pd.Series(unique, dtype="string"))
+        valid = np.logical_and.reduce([code >= 0 for code in codes])
+        codes = [code[valid] for code in codes]
+        weights = df[size].to_numpy(dtype=np.int64)[valid] if size else np.ones(int(valid.sum()), dtype=np.int64)
+
+        # Couches : combinaisons observées des colonnes de découpage
+        if layers:
+            layer_keys, layer_codes = np.unique(np.ravel_multi_index(
+                codes[2:], [len(label) for label in labels[2:]]), return_inverse=True)
+            layer_table = pd.DataFrame({
+                name: label.to_numpy()[index]
+                for name, label, index in zip(layers, labels[2:],
+                                              np.unravel_index(layer_keys, [len(label) for label in labels[2:]]))})
+        else:
+            layer_codes = np.zeros(len(weights), dtype=np.int64)
+            layer_table = pd.DataFrame(index=range(1))
+
+        shape = (len(layer_table), len(labels[0]), len(labels[1]))
+        keys, inverse = np.unique(np.ravel_multi_index((layer_codes, codes[0], codes[1]), shape),
+                                  return_inverse=True)
+        values = np.bincount(inverse, weights=weights, minlength=len(keys)).astype(np.int64)
+        layer, row_codes, column_codes = np.unravel_index(keys, shape)
+        return cls(labels[0].tolist(), labels[1].tolist(), layer_table, row, column,
+                   layer, row_codes, column_codes, values)
+
+    def _selected(self, filters):
+        """Entry mask of the layers matching filters (column -> value or list)."""
+        mask = np.ones(len(self.layers), dtype=bool)
+        for name, value in filters.items():
+            if value is None or value == ALL_SITES or name not in self.layers.columns:
+                continue
+            allowed = [value] if isinstance(value, str) or not np.iterable(value) else list(value)
+            mask &= self.layers[name].isin(allowed).to_numpy()
+        return mask[self._layer]
+
+    def _collapse(self, filters):
+        """Row codes, column codes and counts summed over the selected layers."""
+        selected = self._selected(filters)
+        keys = self._row[selected] * len(self.columns) + self._column[selected]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        values = np.bincount(inverse, weights=self._values[selected], minlength=len(unique)).astype(np.int64)
+        return unique // len(self.columns), unique % len(self.columns), values
+
+    def frame(self, name="size", **filters):
+        """Non-empty (row, column) pairs with their count, like groupby().size().
+
+        Args:
+            name: Name of the count column.
+            **filters: Layer filters, e.g. Site="VANNES" ("Tous" keeps every site).
+        """
+        rows, columns, values = self._collapse(filters)
+        return pd.DataFrame({
+            self.row_name: np.asarray(self.rows, dtype=object)[rows],
+            self.column_name: np.asarray(self.columns, dtype=object)[columns],
+            name: values,
+        })
+
+    def totals(self, axis="row", **filters):
+        """Row (or column) sums, indexed by label."""
+        rows, columns, values = self._collapse(filters)
+        labels = self.rows if axis == "row" else self.columns
+        sums = np.bincount(rows if axis == "row" else columns, weights=values, minlength=len(labels))
+        return pd.Series(sums.astype(np.int64), index=pd.Index(labels, name=self.row_name if axis == "row"
+                                                                    else self.column_name))
+
+    def top(self, k=10, axis="row", **filters):
+        """Labels of the k largest row (or column) sums, largest first."""
+        sums = self.totals(axis, **filters)
+        sums = sums[sums > 0]
+        order = np.argsort(-sums.to_numpy(), kind="stable")[:k]
+        return sums.index[order].tolist()
+
+    def top_pairs(self, k_rows=10, k_columns=10, name="size", **filters):
+        """Pairs whose row and column are both among the top-k, like the treemap input."""
+        pairs = self.frame(name, **filters)
+        top_rows = set(self.top(k_rows, "row", **filters))
+        top_columns = set(self.top(k_columns, "column", **filters))
+        keep = pairs[self.row_name].isin(top_rows) & pairs[self.column_name].isin(top_columns)
+        return pairs[keep.to_numpy()].reset_index(drop=True)
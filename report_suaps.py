@@ -0,0 +1,216 @@
+"""Rapports du tableau de bord sans interface, pour tous les jeux × sites.
+
+Pour chaque combinaison (Semestre 1, Semestre 2, Événements… × Tous,
+VANNES, LORIENT), les agrégats de chaque section sont calculés avec les
+mêmes fonctions que le tableau de bord (sections_suaps), dans un pool de
+processus, puis écrits :
+
+- <jeu>_<site>.json : indicateurs et tables de toutes les sections ;
+- <jeu>_<site>/<section>_<table>.csv : une table par fichier ;
+- <jeu>_<site>.html : page autonome avec les figures Plotly.
+
+Un index (index.html, index.json) et le taux de présence global complètent
+le rapport. Lancé chaque nuit (cron), il fournit des instantanés datés :
+
+    python report_suaps.py                    # reports/AAAA-MM-JJ
+    python report_suaps.py --sqlite --output reports/2025-S1 --format json csv
+"""
+import argparse
+import datetime
+import html
+import json
+import os
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import plotly.offline
+
+import db_suaps
+from data_suaps import DATASETS, SITE_CHOICES, dataset_version, file_fingerprint
+from analytics_suaps import Engine, FilterSpec
+from sections_suaps import DATASET_SECTIONS, SECTIONS, section_metrics
+
+REPORT_DIR = "reports"
+FORMATS = ["json", "csv", "html"]
+
+SECTION_TITLES = {
+    "overview": "Vue d'ensemble",
+    "stats": "Statistiques Principales",
+    "advanced": "Analyse Avancée",
+    "students": "Analyse des Étudiants",
+    "presence": "Taux de Présence Global",
+}
+
+
+def slug(text):
+    """ASCII file name fragment of a label ("Événements" -> "evenements")."""
+    ascii_text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return "_".join("".join(c if c.isalnum() else " " for c in ascii_text.lower()).split())
+
+
+def _serializable(data):
+    # Tables -> listes d'enregistrements, entiers numpy -> int
+    return {key: value.to_dict("records") if isinstance(value, pd.DataFrame) else value
+            for key, value in data.items()}
+
+
+def _write_tables(data, directory, prefix):
+    os.makedirs(directory, exist_ok=True)
+    for key, value in data.items():
+        if isinstance(value, pd.DataFrame):
+            value.to_csv(os.path.join(directory, f"{prefix}_{key}.csv"), index=False)
+
+
+def _page(title, sections):
+    """Standalone HTML page; sections is a list of (title, metrics, figures).
+
+    Figures load plotly.min.js from the directory of the page.
+    """
+    parts = [f"<!DOCTYPE html><html lang='fr'><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+             "<style>body{font-family:sans-serif;margin:2rem;color:#090D0F}h1{color:#104C8D}"
+             "table{border-collapse:collapse}td{padding:.2rem 1rem}</style></head><body>",
+             f"<h1>{html.escape(title)}</h1>"]
+    include = "directory"
+    for section_title, metrics, figures in sections:
+        parts.append(f"<h2>{html.escape(section_title)}</h2>")
+        if metrics:
+            parts.append("<table>" + "".join(f"<tr><td>{html.escape(key)}</td><td><b>{value}</b></td></tr>"
+                                             for key, value in metrics.items()) + "</table>")
+        for name, fig in figures.items():
+            parts.append(f"<h3>{html.escape(name)}</h3>")
+            parts.append(fig.to_html(full_html=False, include_plotlyjs=include))
+            include = False
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def write_combination(option, site, output, sqlite=False, formats=FORMATS):
+    """Compute every section of one dataset and site and write its reports.
+
+    Runs in a worker process.
+
+    Args:
+        option: One of the keys of DATASETS.
+        site: "Tous" or a site name.
+        output: Report directory.
+        sqlite: Read the counts from the SQLite database instead of the cube.
+        formats: Subset of FORMATS to write.
+
+    Returns:
+        A dict (dataset, site, name, rows, seconds) describing the report.
+    """
+    started = time.perf_counter()
+    # Toutes les sections en un seul lot : les intermédiaires sont partagés
+    results = Engine(sqlite).query(FilterSpec(option, {"Site": site}), section_metrics(DATASET_SECTIONS))
+    name = f"{slug(option)}_{slug(site)}"
+    version = file_fingerprint(db_suaps.DB_PATH) if sqlite else dataset_version(option)
+    report = {"dataset": option, "site": site, "backend": "sqlite" if sqlite else "cube",
+              "version": version, "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+              "sections": {}}
+    pages = []
+    for section in DATASET_SECTIONS:
+        _, compute, build = SECTIONS[section]
+        data = compute(results)
+        report["sections"][section] = _serializable(data)
+        if "csv" in formats:
+            _write_tables(data, os.path.join(output, name), section)
+        if "html" in formats:
+            figures = build(data)
+            metrics = {key: value for key, value in figures.items() if not hasattr(value, "to_html")}
+            pages.append((SECTION_TITLES[section], metrics,
+                          {key: fig for key, fig in figures.items() if key not in metrics}))
+
+    if "json" in formats:
+        with open(os.path.join(output, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1, default=str)
+    if "html" in formats:
+        with open(os.path.join(output, name + ".html"), "w", encoding="utf-8") as f:
+            f.write(_page(f"{option} - {site}", pages))
+    return {"dataset": option, "site": site, "name": name, "rows": results.rows(),
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def write_presence(output, formats=FORMATS):
+    """Write the global attendance rates of every indexed presence export."""
+    metrics, compute, build = SECTIONS["presence"]
+    data = compute(Engine().query(FilterSpec(next(iter(DATASETS))), metrics))
+    if "json" in formats:
+        with open(os.path.join(output, "presence.json"), "w", encoding="utf-8") as f:
+            json.dump(_serializable(data), f, ensure_ascii=False, indent=1, default=str)
+    if "csv" in formats:
+        _write_tables(data, os.path.join(output, "presence"), "taux")
+    if "html" in formats:
+        with open(os.path.join(output, "presence.html"), "w", encoding="utf-8") as f:
+            f.write(_page(SECTION_TITLES["presence"],
+                          [(SECTION_TITLES["presence"], {}, build(data))]))
+
+
+def generate(output, options=None, sites=SITE_CHOICES, sqlite=False, formats=FORMATS, workers=None, progress=print):
+    """Write the reports of every (dataset, site) combination with a process pool.
+
+    Args:
+        output: Report directory, created if needed.
+        options: Keys of DATASETS (all by default).
+        sites: Sites to report on ("Tous" included).
+        sqlite: Read the counts from the SQLite database instead of the cube.
+        formats: Subset of FORMATS to write.
+        workers: Number of processes (all cores by default).
+        progress: Callable receiving one line per finished report.
+
+    Returns:
+        A DataFrame with one row per combination (see write_combination()).
+    """
+    os.makedirs(output, exist_ok=True)
+    if "html" in formats:
+        with open(os.path.join(output, "plotly.min.js"), "w", encoding="utf-8") as f:
+            f.write(plotly.offline.get_plotlyjs())
+    combinations = [(option, site) for option in (options or list(DATASETS)) for site in sites]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(write_combination, option, site, output, sqlite, formats)
+                   for option, site in combinations]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            progress(f"[{done}/{len(futures)}] {result['dataset']} - {result['site']} : "
+                     f"{result['rows']} inscriptions en {result['seconds']:.2f} s")
+    write_presence(output, formats)
+
+    results.sort(key=lambda result: combinations.index((result["dataset"], result["site"])))
+    summary = pd.DataFrame(results, columns=["dataset", "site", "name", "rows", "seconds"])
+    with open(os.path.join(output, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(summary.to_dict("records"), f, ensure_ascii=False, indent=1)
+    links = "".join(
+        f"<tr><td>{html.escape(row.dataset)}</td><td>{html.escape(row.site)}</td><td>{row.rows}</td>"
+        + "".join(f"<td><a href='{row.name}.{ext}'>{ext}</a></td>" for ext in ("html", "json") if ext in formats)
+        + "</tr>" for row in summary.itertuples())
+    with open(os.path.join(output, "index.html"), "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html><html lang='fr'><head><meta charset='utf-8'><title>Rapports SUAPS</title></head>"
+                f"<body><h1>Rapports SUAPS</h1><table>{links}</table>"
+                "<p><a href='presence.html'>Taux de présence global</a></p></body></html>")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère les rapports du tableau de bord pour tous les jeux × sites.")
+    parser.add_argument("--output", default=os.path.join(REPORT_DIR, datetime.date.today().isoformat()),
+                        help="répertoire des rapports (par défaut reports/AAAA-MM-JJ)")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), help="jeux de données (tous par défaut)")
+    parser.add_argument("--sites", nargs="+", default=SITE_CHOICES, help="sites (Tous, VANNES, LORIENT par défaut)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=FORMATS, dest="formats")
+    parser.add_argument("--sqlite", action="store_true", help="lit les agrégats dans data/suaps.db")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (tous les cœurs)")
+    args = parser.parse_args()
+    if args.sqlite and not db_suaps.is_available():
+        parser.error(f"{db_suaps.DB_PATH} introuvable : lancez python db_suaps.py")
+
+    started = time.perf_counter()
+    summary = generate(args.output, args.datasets, args.sites, args.sqlite, args.formats, args.workers)
+    print(f"{len(summary)} rapports dans {args.output} en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
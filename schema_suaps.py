@@ -0,0 +1,174 @@
+"""Schéma compact des exports d'inscriptions en mémoire.
+
+Lu tel quel, un export garde une chaîne Python par cellule : Institution,
+Calendrier, Site ou Jour répètent une poignée de valeurs sur chaque ligne,
+et le nom, le prénom et l'adresse d'un étudiant sont recopiés sur chacune
+de ses inscriptions. Le schéma compact sépare :
+
+- les inscriptions : colonnes texte en catégories (codes de 1 ou 2 octets),
+  entiers réduits au plus petit type, étudiant repéré par sa position
+  (int32) dans la table des étudiants ;
+- les étudiants : une ligne par Clé étudiant (int64) avec les colonnes
+  d'identité (Numéro étudiant, Prénom, Nom de famille, Adresse de courriel,
+  Sexe).
+
+Un jeu de données n'est ainsi gardé qu'une fois par processus ; les colonnes
+demandées par les sections sont des vues de cette copie, les colonnes
+d'identité étant rattachées à la volée par la position de l'étudiant.
+
+    python schema_suaps.py      # empreinte mémoire de chaque jeu de données
+"""
+import numpy as np
+import pandas as pd
+
+from cube_suaps import STUDENT_KEY
+
+# Colonnes propres à la personne, identiques sur toutes ses inscriptions
+STUDENT_COLUMNS = ["Numéro étudiant", "Prénom", "Nom de famille", "Adresse de courriel", "Sexe"]
+
+# Au-delà de ce ratio valeurs distinctes / lignes, une colonne texte n'est pas catégorisée
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _compact_column(series, max_ratio=CATEGORY_MAX_RATIO):
+    """Smallest lossless dtype for a column: category, small integer or unchanged."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    if pd.api.types.is_string_dtype(series) or series.dtype == object:
+        if series.nunique() <= max_ratio * max(len(series), 1):
+            return series.astype("category")
+        # Copie des seules chaînes retenues, sans le tampon de l'export entier
+        return pd.Series(pd.array(series.to_numpy(dtype=object), dtype=series.dtype), name=series.name)
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if len(values) and (values % 1 == 0).all():
+            return pd.to_numeric(series.astype("Int64"), downcast="integer")
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    return series
+
+
+class CompactFrame:
+    """Registrations in the compact schema, with their student identity table.
+
+    Attributes:
+        registrations: One row per registration, without STUDENT_COLUMNS
+            and STUDENT_KEY.
+        students: One row per student, indexed by STUDENT_KEY, holding the
+            STUDENT_COLUMNS of their first registration.
+        columns: Columns of the original frame, in order.
+    """
+
+    def __init__(self, registrations, students, student_rows, columns):
+        self.registrations = registrations
+        self.students = students
+        self.columns = list(columns)
+        # Position de l'étudiant de chaque inscription dans la table des étudiants
+        self._student_rows = student_rows
+
+    @classmethod
+    def from_frame(cls, df):
+        """Split a registration frame with a STUDENT_KEY column."""
+        identity = [col for col in STUDENT_COLUMNS if col in df.columns]
+        # Les étudiants dans l'ordre de leur première inscription
+        student_rows, keys = pd.factorize(df[STUDENT_KEY].to_numpy(dtype=np.int64))
+        first = df.drop_duplicates(STUDENT_KEY)
+        students = pd.DataFrame({col: _compact_column(first[col].reset_index(drop=True)) for col in identity})
+        students.index = pd.Index(keys, name=STUDENT_KEY)
+        registrations = pd.DataFrame({col: _compact_column(df[col].reset_index(drop=True))
+                                      for col in df.columns if col not in identity and col != STUDENT_KEY})
+        return cls(registrations, students, student_rows.astype(np.int32), df.columns)
+
+    def __len__(self):
+        return len(self.registrations)
+
+    def frame(self, columns=None):
+        """Registrations with the requested columns, identity columns included.
+
+        Args:
+            columns: Optional list of columns; unknown names are ignored.
+
+        Returns:
+            A DataFrame sharing the memory of the compact copy (read-only).
+        """
+        return self._build(columns, None)
+
+    def take(self, positions, columns=None):
+        """Some registrations only, e.g. one page of a table.
+
+        Identity columns are attached after the selection, so the cost
+        depends on len(positions), not on the size of the export.
+
+        Args:
+            positions: Row positions, in the wanted order.
+            columns: Optional list of columns; unknown names are ignored.
+        """
+        return self._build(columns, np.asarray(positions, dtype=np.int64))
+
+    def _build(self, columns, positions):
+        columns = [col for col in columns if col in self.columns] if columns else self.columns
+        student_rows = self._student_rows if positions is None else self._student_rows[positions]
+        data = {}
+        for col in columns:
+            if col == STUDENT_KEY:
+                data[col] = self.students.index.to_numpy()[student_rows]
+            elif col in self.students.columns:
+                values = self.students[col]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    data[col] = pd.Categorical.from_codes(values.cat.codes.to_numpy()[student_rows],
+                                                          dtype=values.dtype)
+                else:
+                    data[col] = values.array.take(student_rows)
+            elif positions is None:
+                data[col] = self.registrations[col]
+            else:
+                data[col] = self.registrations[col].array.take(positions)
+        index = self.registrations.index if positions is None else pd.Index(positions)
+        return pd.DataFrame(data, index=index, columns=columns)
+
+    def memory_usage(self):
+        """Bytes per column, identity columns counted once per student."""
+        usage = pd.concat([self.registrations.memory_usage(deep=True, index=False),
+                           self.students.memory_usage(deep=True, index=False)])
+        usage[STUDENT_KEY] = self.students.index.nbytes + self._student_rows.nbytes
+        return usage
+
+    @property
+    def nbytes(self):
+        return int(self.memory_usage().sum())
+
+
+def memory_report(raw, compact):
+    """Memory footprint of each column, as read from the export and compacted.
+
+    Args:
+        raw: Frame as read from the export (read_export()).
+        compact: CompactFrame of the same export.
+
+    Returns:
+        A DataFrame (Colonne, Table, Type, Brut (Mo), Compact (Mo)); attrs hold
+        the totals and the reduction ratio.
+    """
+    raw_usage = raw.memory_usage(deep=True, index=False)
+    compact_usage = compact.memory_usage()
+    records = []
+    for col, size in compact_usage.items():
+        table = "étudiants" if col in compact.students.columns or col == STUDENT_KEY else "inscriptions"
+        dtype = compact.students[col].dtype if col in compact.students.columns else \
+            compact.registrations[col].dtype if col in compact.registrations.columns else "int64 + int32"
+        records.append((col, table, str(dtype), raw_usage.get(col, 0) / 2**20, size / 2**20))
+    report = pd.DataFrame(records, columns=["Colonne", "Table", "Type", "Brut (Mo)", "Compact (Mo)"])
+    report.attrs["raw_mb"] = round(float(raw_usage.sum()) / 2**20, 3)
+    report.attrs["compact_mb"] = round(float(compact_usage.sum()) / 2**20, 3)
+    report.attrs["ratio"] = round(report.attrs["raw_mb"] / max(report.attrs["compact_mb"], 1e-9), 1)
+    return report.round(4)
+
+
+if __name__ == "__main__":
+    from data_suaps import DATASETS, dataset_memory
+
+    for option in DATASETS:
+        report = dataset_memory(option)
+        print(f"{option} : {report.attrs['raw_mb']:.2f} Mo -> {report.attrs['compact_mb']:.2f} Mo "
+              f"({report.attrs['ratio']}×)")
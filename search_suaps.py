@@ -0,0 +1,270 @@
+"""Recherche plein texte sur les étudiants, activités, enseignants et lieux.
+
+L'index couvre tous les jeux de données (semestres, événements, exports
+importés) :
+
+- un document par étudiant (Prénom, Nom de famille, Adresse de courriel),
+  fusionné d'un jeu à l'autre par la Clé étudiant ;
+- un document par Activité détaillée, Enseignant et Lieu.
+
+Le texte est normalisé sans accents ni casse ("Élodie" = "elodie"). Chaque
+document est découpé en trigrammes, plus les débuts de mots (" a", " ab")
+pour les recherches d'une ou deux lettres. Une requête intersecte les
+listes de documents de ses trigrammes, vérifie les candidats puis les
+classe : mot exact, début de mot, puis fragment.
+
+L'index est écrit dans le store à chaque ingestion (search.parquet et
+search.grams.parquet) ; à défaut, il est construit en mémoire une fois par
+version des données.
+
+    python search_suaps.py "le goff"     # recherche en ligne de commande
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cube_suaps import STUDENT_KEY
+from data_suaps import DATASETS, STORE_DIR, cached, dataset_version, file_fingerprint, load_dataset, temp_path
+
+SEARCH_NAME = "search.parquet"
+GRAMS_NAME = "search.grams.parquet"
+
+# Champs indexés hors étudiants : colonne -> type de résultat
+ENTITY_COLUMNS = {"Activité détaillée": "Activité", "Enseignant": "Enseignant", "Lieu": "Lieu"}
+STUDENT_TYPE = "Étudiant"
+
+# Ligatures que NFKD ne décompose pas ("Œuvre" -> "OEuvre")
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "Œ": "OE", "Æ": "AE"})
+
+# Points d'un terme de la requête selon sa position dans le document
+EXACT, PREFIX, FRAGMENT = 3, 2, 1
+
+DOCUMENT_COLUMNS = ["Type", "Libellé", "Détail", "Jeux", "Inscriptions", STUDENT_KEY]
+
+
+def fold_text(values):
+    """Lower-case, accent-free text with single spaces between words.
+
+    Args:
+        values: Series of text ("Éloïse LE GOFF-Martin" -> "eloise le goff martin").
+
+    Returns:
+        A Series of strings aligned on values.
+    """
+    text = pd.Series(values, dtype="string").fillna("")
+    text = text.str.translate(LIGATURES).str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True).str.casefold()
+    return text.str.replace(r"[^0-9a-z@.]+", " ", regex=True).str.strip()
+
+
+def _grams(text):
+    # Trigrammes du texte et débuts de mots précédés d'une espace
+    grams = set()
+    for word in text.split():
+        padded = " " + word
+        grams.add(padded[:2])
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def search_documents(options=None):
+    """One document per student, detailed activity, teacher and place.
+
+    Args:
+        options: Keys of DATASETS (all by default).
+
+    Returns:
+        A DataFrame with the DOCUMENT_COLUMNS columns.
+    """
+    students, entities = [], []
+    for option in options or list(DATASETS):
+        df = load_dataset(option, [STUDENT_KEY, "Prénom", "Nom de famille", "Adresse de courriel",
+                                   *ENTITY_COLUMNS])
+        counts = df[STUDENT_KEY].value_counts()
+        first = df.drop_duplicates(STUDENT_KEY)
+        students.append(pd.DataFrame({
+            STUDENT_KEY: first[STUDENT_KEY].to_numpy(),
+            "Libellé": (first["Prénom"].astype("string").fillna("") + " "
+                        + first["Nom de famille"].astype("string").fillna("")).str.strip().to_numpy(),
+            "Détail": first["Adresse de courriel"].astype("string").to_numpy(),
+            "Jeux": option,
+            "Inscriptions": counts.reindex(first[STUDENT_KEY]).to_numpy(),
+        }))
+        for column, kind in ENTITY_COLUMNS.items():
+            if column in df.columns:
+                values = df[column].astype("string").value_counts()
+                entities.append(pd.DataFrame({"Type": kind, "Libellé": values.index.to_numpy(),
+                                              "Jeux": option, "Inscriptions": values.to_numpy()}))
+
+    # Fusion d'un jeu à l'autre : sur la clé pour les étudiants, le libellé sinon
+    students = pd.concat(students, ignore_index=True).groupby(STUDENT_KEY, sort=False).agg(
+        {"Libellé": "first", "Détail": "first", "Jeux": " · ".join, "Inscriptions": "sum"}).reset_index()
+    students["Type"] = STUDENT_TYPE
+    entities = pd.concat(entities, ignore_index=True).groupby(["Type", "Libellé"], sort=False).agg(
+        {"Jeux": " · ".join, "Inscriptions": "sum"}).reset_index()
+    documents = pd.concat([students, entities], ignore_index=True)
+    documents[STUDENT_KEY] = documents[STUDENT_KEY].astype("Int64")
+    documents["Inscriptions"] = documents["Inscriptions"].astype(np.int64)
+    return documents[DOCUMENT_COLUMNS]
+
+
+class SearchIndex:
+    """Trigram and word-prefix index over search documents.
+
+    Attributes:
+        documents: DataFrame with the DOCUMENT_COLUMNS columns.
+    """
+
+    def __init__(self, documents, grams, starts, postings):
+        self.documents = documents.reset_index(drop=True)
+        self._text = " " + fold_text(self.documents["Libellé"] + " " + self.documents["Détail"].fillna("")) + " "
+        self._grams = grams
+        self._starts = starts
+        self._postings = postings
+
+    @classmethod
+    def from_documents(cls, documents):
+        """Index documents built by search_documents()."""
+        folded = fold_text(documents["Libellé"] + " " + documents["Détail"].fillna(""))
+        pairs = [(gram, doc) for doc, text in enumerate(folded) for gram in _grams(text)]
+        grams = pd.DataFrame(pairs, columns=["gram", "doc"]) if pairs else pd.DataFrame({"gram": [], "doc": []})
+        return cls.from_pairs(documents, grams)
+
+    @classmethod
+    def from_pairs(cls, documents, pairs):
+        """Build the index from documents and a (gram, doc) table."""
+        order = np.lexsort((pairs["doc"].to_numpy(), pairs["gram"].to_numpy(dtype=object)))
+        grams = pairs["gram"].to_numpy(dtype=object)[order]
+        postings = pairs["doc"].to_numpy(dtype=np.int32)[order]
+        unique, starts = np.unique(grams, return_index=True) if len(grams) else (np.array([], dtype=object),
+                                                                                 np.array([], dtype=np.int64))
+        return cls(documents, unique, np.append(starts, len(grams)), postings)
+
+    def write(self, store_dir=STORE_DIR):
+        """Write the documents and the (gram, doc) postings into the store."""
+        os.makedirs(store_dir, exist_ok=True)
+        counts = np.diff(self._starts)
+        pairs = pa.table({"gram": pa.array(np.repeat(self._grams, counts), pa.string()),
+                          "doc": pa.array(self._postings, pa.int32())})
+        for table, name in [(pa.Table.from_pandas(self.documents, preserve_index=False), SEARCH_NAME),
+                            (pairs, GRAMS_NAME)]:
+            path = os.path.join(store_dir, name)
+            tmp_path = temp_path(path)
+            pq.write_table(table, tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, store_dir=STORE_DIR):
+        """Read an index written by write()."""
+        documents = pq.read_table(os.path.join(store_dir, SEARCH_NAME)).to_pandas()
+        pairs = pq.read_table(os.path.join(store_dir, GRAMS_NAME)).to_pandas()
+        return cls.from_pairs(documents, pairs)
+
+    def _docs(self, gram):
+        i = np.searchsorted(self._grams, gram)
+        if i == len(self._grams) or self._grams[i] != gram:
+            return np.array([], dtype=np.int32)
+        return self._postings[self._starts[i]:self._starts[i + 1]]
+
+    def _candidates(self, term):
+        if len(term) < 3:
+            return self._docs((" " + term)[:3])
+        postings = sorted((self._docs(term[i:i + 3]) for i in range(len(term) - 2)), key=len)
+        candidates = postings[0]
+        for docs in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, docs, assume_unique=True)
+        return candidates
+
+    def search(self, query, limit=20, kinds=None):
+        """Documents matching every term of query, best first.
+
+        Each term scores EXACT for a whole word, PREFIX for the start of a
+        word and FRAGMENT elsewhere; ties go to the most registrations.
+
+        Args:
+            query: Free text ("le goff", "bad", "gymnase")
+            limit: Maximum number of results.
+            kinds: Optional result types to keep (Étudiant, Activité…).
+
+        Returns:
+            A DataFrame with the DOCUMENT_COLUMNS columns and "Score".
+        """
+        terms = fold_text(pd.Series([query])).iloc[0].split()
+        if not terms:
+            return self.documents.iloc[:0].assign(Score=pd.Series(dtype=np.int64))
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            docs = self._candidates(term)
+            candidates = docs if candidates is None else np.intersect1d(candidates, docs, assume_unique=True)
+        if kinds:
+            candidates = candidates[np.isin(self.documents["Type"].to_numpy()[candidates], list(kinds))]
+        text = self._text.take(candidates)
+        scores = np.zeros(len(candidates), dtype=np.int64)
+        matched = np.ones(len(candidates), dtype=bool)
+        for term in terms:
+            exact = text.str.contains(f" {term} ", regex=False).to_numpy(dtype=bool)
+            prefix = text.str.contains(f" {term}", regex=False).to_numpy(dtype=bool)
+            fragment = text.str.contains(term, regex=False).to_numpy(dtype=bool)
+            matched &= fragment
+            scores += np.where(exact, EXACT, np.where(prefix, PREFIX, np.where(fragment, FRAGMENT, 0)))
+        results = self.documents.take(candidates[matched]).assign(Score=scores[matched])
+        return results.sort_values(["Score", "Inscriptions", "Libellé"], ascending=[False, False, True],
+                                   kind="stable").head(limit).reset_index(drop=True)
+
+    @property
+    def nbytes(self):
+        return int(self.documents.memory_usage(deep=True).sum() + self._postings.nbytes + self._starts.nbytes
+                   + sum(len(gram) for gram in self._grams))
+
+
+def write_search_index(store_dir=STORE_DIR):
+    """Rebuild the search index of every dataset and write it into the store."""
+    index = SearchIndex.from_documents(search_documents())
+    index.write(store_dir)
+    return index
+
+
+def _index_is_fresh(store_dir):
+    # L'index écrit doit être plus récent que toutes les données des jeux
+    paths = [os.path.join(store_dir, name) for name in (SEARCH_NAME, GRAMS_NAME)]
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    versions = [fingerprint for option in DATASETS for fingerprint in dataset_version(option) if fingerprint]
+    newest = max((mtime for mtime, _ in versions), default=0)
+    return min(file_fingerprint(path)[0] for path in paths) >= newest
+
+
+def load_search_index(store_dir=STORE_DIR):
+    """Return the shared search index of every dataset.
+
+    Reads the index written at ingest when it is up to date, otherwise
+    builds it in memory; either way once per version of the datasets.
+    """
+    def load():
+        if _index_is_fresh(store_dir):
+            return SearchIndex.read(store_dir)
+        return SearchIndex.from_documents(search_documents())
+
+    return cached((os.path.abspath(store_dir), "search"),
+                  tuple(dataset_version(option) for option in DATASETS), load)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche un étudiant, une activité, un enseignant ou un lieu.")
+    parser.add_argument("query", nargs="?", help="texte recherché (sans requête : reconstruit l'index)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    if not args.query:
+        index = write_search_index()
+        print(f"{len(index.documents)} documents indexés dans {STORE_DIR}")
+        return
+    print(load_search_index().search(args.query, args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
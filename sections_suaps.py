@@ -0,0 +1,302 @@
+"""Agrégats et figures des sections du tableau de bord, sans Streamlit.
+
+Chaque section est décrite par les métriques qu'elle lit dans le moteur
+d'analyse (analytics_suaps, évaluées en un seul lot), une fonction
+`<section>_data` qui en tire ses indicateurs et ses tables (DataFrames prêts
+pour un export JSON/CSV) et une fonction `<section>_figures` qui construit
+les figures Plotly à partir de ces tables. Le tableau de bord et le
+générateur de rapports (report_suaps.py) partagent ainsi exactement les
+mêmes chiffres. La section "Parcours" lit une Transition entre deux jeux
+de données (journey_suaps) plutôt que le moteur.
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from journey_suaps import CHURNED, NEW, STATUSES
+from matrix_suaps import SlotMatrix
+
+# Định nghĩa theme color palette
+COLORS = {
+    "primary": "#104C8D",
+    "secondary": "#15A193",
+    "accent": "#e28743",
+    "neutral": "#78909C",
+    "background": "#F5F7FA",
+    "text": "#090D0F",
+}
+
+# Color sequences cho các biểu đồ
+COLOR_SEQUENCE = [COLORS["primary"], COLORS["secondary"], COLORS["accent"],
+                  "#7986CB", "#4DB6AC", "#FFB74D", "#BA68C8", "#4FC3F7"]
+
+# Color scales cho heatmap và continuous colors
+COLOR_SCALE = ["#BCE3FF", "#7CBFF7", "#42A5F5", "#1E88E5", "#1565C0"]
+
+# Départements et activités retenus pour le treemap de l'analyse croisée
+TOP_K = 10
+
+# Mise en page commune des figures
+TRANSPARENT = dict(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font=dict(color=COLORS["text"]))
+
+
+def _table(counts, label, value):
+    # Comptages (Series) -> table à deux colonnes
+    table = counts.reset_index()
+    table.columns = [label, value]
+    return table
+
+
+def _bar(table, x, y, **layout):
+    fig = px.bar(table, x=x, y=y, text_auto=True, color=y, color_continuous_scale=COLOR_SCALE)
+    fig.update_layout(**TRANSPARENT, **layout)
+    return fig
+
+
+def _pie(table, margin, **layout):
+    label, value = table.columns[:2]
+    fig = px.pie(values=table[value].to_numpy(), names=table[label].to_numpy(),
+                 color_discrete_sequence=COLOR_SEQUENCE, hole=0.4)
+    fig.update_layout(**TRANSPARENT, margin=margin,
+                      legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5), **layout)
+    return fig
+
+
+def overview_data(results):
+    """Metrics and tables of the "Vue d'ensemble" section."""
+    data = {}
+    if "Prénom" in results.columns and "Nom de famille" in results.columns:
+        data["total_students"] = int(results.people())
+    else:
+        data["total_students"] = results.rows()
+    data["activities"] = int(results.distinct("Activité"))
+    data["teachers"] = int(results.distinct("Enseignant"))
+    if "Groupement d’activités" in results.columns:
+        data["groupement"] = _table(results.counts("Groupement d’activités"), "Groupement d’activités",
+                                    "Nombre d'étudiants")
+    if "Type d’inscription" in results.columns:
+        data["inscription"] = _table(results.counts("Type d’inscription"), "Type d’inscription",
+                                     "Nombre d'inscriptions")
+    if "Type" in results.columns:
+        data["type"] = _table(results.people(by="Type"), "Type", "Nombre d'étudiants")
+    return data
+
+
+def overview_figures(data):
+    """Figures of the "Vue d'ensemble" section, with its metrics."""
+    figs = {key: data[key] for key in ("total_students", "activities", "teachers")}
+    if "groupement" in data:
+        figs["groupement"] = _bar(data["groupement"], "Groupement d’activités", "Nombre d'étudiants",
+                                  margin=dict(l=0, r=0, t=10, b=40), height=400, autosize=True)
+    if "inscription" in data:
+        figs["inscription"] = _pie(data["inscription"], dict(l=20, r=20, t=10, b=20))
+    if "type" in data:
+        figs["type"] = _pie(data["type"], dict(l=20, r=20, t=10, b=20))
+    return figs
+
+
+def stats_data(results):
+    """Tables of the "Statistiques Principales" section."""
+    departments = _table(results.counts("Département"), "Département", "Nombre d'inscriptions")
+    return {
+        "top_activites": _table(results.counts("Activité").head(10), "Activité", "Nombre d'inscriptions"),
+        "departments": departments.sort_values(by="Nombre d'inscriptions", ascending=True),
+        "jours": _table(results.counts("Jour"), "Jour", "Nombre d'inscriptions"),
+        "sites": _table(results.counts("Site"), "Site", "Nombre d'inscriptions"),
+    }
+
+
+def stats_figures(data):
+    """Figures of the "Statistiques Principales" section."""
+    figs = {"top_activites": _bar(data["top_activites"], "Activité", "Nombre d'inscriptions",
+                                  margin=dict(l=40, r=40, t=10, b=80), xaxis=dict(tickangle=-45))}
+    fig = px.bar(data["departments"], y="Département", x="Nombre d'inscriptions", color="Nombre d'inscriptions",
+                 color_continuous_scale=COLOR_SCALE, text_auto=True)
+    fig.update_layout(**TRANSPARENT, margin=dict(l=40, r=40, t=10, b=40))
+    figs["departments"] = fig
+    figs["jours"] = _bar(data["jours"], "Jour", "Nombre d'inscriptions", margin=dict(l=40, r=40, t=10, b=40))
+    figs["sites"] = _bar(data["sites"], "Site", "Nombre d'inscriptions", margin=dict(l=40, r=40, t=10, b=40))
+    return figs
+
+
+def advanced_data(results):
+    """Tables of the "Analyse Avancée" section."""
+    return {
+        "niveaux": _table(results.counts("Niveau"), "Niveau", "Nombre d'inscriptions"),
+        "periodes": _table(results.periods(), "Période", "Nombre d'inscriptions"),
+        "enseignants": _table(results.counts("Enseignant").head(10), "Enseignant", "Nombre d'inscriptions"),
+        "heatmap": results.pairs("Jour", "Horaires", "Nombre d'inscriptions"),
+        "creneaux": results.heatmap().peaks(k=10),
+    }
+
+
+def advanced_figures(data):
+    """Figures of the "Analyse Avancée" section."""
+    figs = {
+        "niveaux": _bar(data["niveaux"], "Niveau", "Nombre d'inscriptions", margin_autoexpand=True),
+        "periodes": _bar(data["periodes"], "Période", "Nombre d'inscriptions",
+                         margin=dict(l=40, r=40, t=10, b=40),
+                         xaxis=dict(categoryorder='array', categoryarray=['Matin', 'Après-midi', 'Soir'])),
+        "enseignants": _bar(data["enseignants"], "Enseignant", "Nombre d'inscriptions",
+                            margin=dict(l=40, r=40, t=10, b=80), xaxis=dict(tickangle=-45)),
+    }
+    slot_matrix = SlotMatrix.from_frame(data["heatmap"], size="Nombre d'inscriptions")
+    fig = go.Figure(go.Heatmap(
+        z=slot_matrix.matrix().T,
+        x=slot_matrix.days,
+        y=slot_matrix.slots,
+        colorscale=COLOR_SCALE,
+        colorbar=dict(title="Nombre d'inscriptions"),
+        hovertemplate="Jour=%{x}<br>Horaires=%{y}<br>Nombre d'inscriptions=%{z}<extra></extra>"
+    ))
+    fig.update_layout(**TRANSPARENT, margin=dict(l=40, r=40, t=10, b=40))
+    figs["heatmap"] = fig
+    creneaux = data["creneaux"].assign(Créneau=data["creneaux"]["Jour"] + " " + data["creneaux"]["Horaires"])
+    figs["creneaux"] = _bar(creneaux, "Créneau", "Nombre d'inscriptions",
+                            margin=dict(l=40, r=40, t=10, b=80), xaxis=dict(tickangle=-45))
+    return figs
+
+
+def students_data(results):
+    """Tables of the "Analyse des Étudiants" section (empty without Département and Activité)."""
+    if "Département" not in results.columns or "Activité" not in results.columns:
+        return {}
+    pair_matrix = results.cross()
+    departments = _table(results.counts("Département").head(8), "Département", "Nombre d'inscriptions")
+    return {
+        "department_activity": pair_matrix.frame("Nombre d'étudiants"),
+        "departments": departments.sort_values(by="Nombre d'inscriptions", ascending=True),
+        "mosaic": pair_matrix.top_pairs(TOP_K, TOP_K, "Nombre d'étudiants"),
+    }
+
+
+def students_figures(data):
+    """Figures of the "Analyse des Étudiants" section."""
+    if not data:
+        return {}
+    figs = {}
+    # Créer le scatter plot avec taille ajustée
+    fig = px.scatter(
+        data["department_activity"],
+        x="Département",
+        y="Activité",
+        size="Nombre d'étudiants",
+        color="Département",
+        hover_data=["Nombre d'étudiants"],
+        color_discrete_sequence=COLOR_SEQUENCE,
+        title="Répartition des Étudiants par Département et Activité"
+    )
+    fig.update_layout(**TRANSPARENT, margin=dict(l=40, r=40, t=50, b=80), height=600)
+    figs["scatter"] = fig
+
+    fig = px.bar(data["departments"], x="Nombre d'inscriptions", y="Département", orientation='h',
+                 color="Nombre d'inscriptions", color_continuous_scale=COLOR_SCALE, text_auto=True)
+    fig.update_layout(**TRANSPARENT, margin=dict(l=20, r=40, t=10, b=20), xaxis_title="Nombre d'étudiants",
+                      yaxis_title="Département", showlegend=False)
+    figs["departments"] = fig
+
+    # Créer le graphique Treemap (Marimekko)
+    fig = px.treemap(
+        data["mosaic"],
+        path=["Département", "Activité"],
+        values="Nombre d'étudiants",
+        color="Nombre d'étudiants",
+        color_continuous_scale="Blues",
+        title="Distribution des Inscriptions - Top Départements et Activités"
+    )
+    fig.update_layout(**TRANSPARENT, margin=dict(l=20, r=20, t=50, b=20), height=500)
+    figs["mosaic"] = fig
+    return figs
+
+
+def presence_overview_data(results):
+    """Global attendance rate per activity and per site, over every presence register."""
+    data = {}
+    for column, label in [("activity", "Activité"), ("site", "Site")]:
+        rates = results.attendance(column).reset_index()
+        rates.columns = [label, "Présences", "Places", "Taux de Présence (%)"]
+        data[column] = rates
+    return data
+
+
+def presence_overview_figures(data):
+    """Figures of the global attendance rates."""
+    figs = {}
+    for column, rates in data.items():
+        fig = px.bar(rates, x=rates.columns[0], y="Taux de Présence (%)", text_auto=True,
+                     color="Taux de Présence (%)", color_continuous_scale=COLOR_SCALE, range_color=[0, 100])
+        fig.update_layout(**TRANSPARENT, margin=dict(l=40, r=40, t=10, b=80),
+                          yaxis=dict(range=[0, 100], ticksuffix="%"))
+        figs[column] = fig
+    return figs
+
+
+def journey_data(transition, site=None, departments=None, patterns=None):
+    """Retention metrics and tables of the "Parcours" section.
+
+    Args:
+        transition: Transition between two datasets (journey_suaps).
+        site, departments: Filters on the students' source site and department.
+        patterns: Optional presence_patterns() table over every dataset.
+    """
+    retention = transition.retention(site, departments)
+    statuses = pd.DataFrame({"Statut": STATUSES, "Nombre d'étudiants": [retention[status] for status in STATUSES]})
+    data = {
+        "retained": retention["retained"],
+        "churned": retention[CHURNED],
+        "new": retention[NEW],
+        "rate": retention["rate"],
+        "statuses": statuses,
+        "transitions": transition.transitions(site, departments, TOP_K, TOP_K),
+    }
+    if patterns is not None:
+        data["patterns"] = patterns
+    return data
+
+
+def journey_figures(data):
+    """Figures of the "Parcours" section, with its metrics."""
+    figs = {key: data[key] for key in ("retained", "churned", "new", "rate")}
+    figs["statuses"] = _pie(data["statuses"], dict(l=20, r=20, t=10, b=20))
+    transitions = data["transitions"]
+    source, target, value = transitions.columns
+    table = transitions.pivot(index=source, columns=target, values=value).fillna(0).astype(int)
+    fig = go.Figure(go.Heatmap(
+        z=table.to_numpy(),
+        x=table.columns.tolist(),
+        y=table.index.tolist(),
+        colorscale=COLOR_SCALE,
+        colorbar=dict(title=value),
+        hovertemplate=f"{source}=%{{y}}<br>{target}=%{{x}}<br>{value}=%{{z}}<extra></extra>"
+    ))
+    fig.update_layout(**TRANSPARENT, margin=dict(l=40, r=40, t=10, b=120), height=550,
+                      xaxis=dict(title=target, tickangle=-45), yaxis=dict(title=source))
+    figs["transitions"] = fig
+    if "patterns" in data:
+        figs["patterns"] = px.bar(data["patterns"], x="Nombre d'étudiants", y="Parcours", orientation="h",
+                                  text_auto=True, color="Nombre d'étudiants", color_continuous_scale=COLOR_SCALE)
+        figs["patterns"].update_layout(**TRANSPARENT, margin=dict(l=40, r=40, t=10, b=40),
+                                       yaxis=dict(categoryorder="total ascending"))
+    return figs
+
+
+# Sections calculées pour chaque jeu de données et chaque filtre :
+# (métriques du lot, indicateurs et tables, figures)
+SECTIONS = {
+    "overview": (["people", "distinct:Activité", "distinct:Enseignant", "counts:Groupement d’activités",
+                  "counts:Type d’inscription", "people:Type"], overview_data, overview_figures),
+    "stats": (["counts:Activité", "counts:Département", "counts:Jour", "counts:Site"], stats_data, stats_figures),
+    "advanced": (["counts:Niveau", "periods", "counts:Enseignant", "pairs:Jour|Horaires", "heatmap"],
+                 advanced_data, advanced_figures),
+    "students": (["cross", "counts:Département"], students_data, students_figures),
+    "presence": (["attendance:activity", "attendance:site"], presence_overview_data, presence_overview_figures),
+}
+
+
+# Sections propres à un jeu de données ; les présences sont communes à tous
+DATASET_SECTIONS = ["overview", "stats", "advanced", "students"]
+
+
+def section_metrics(sections=SECTIONS):
+    """Union of the metrics of several sections, for a single batch."""
+    return list(dict.fromkeys(metric for name in sections for metric in SECTIONS[name][0]))
@@ -0,0 +1,315 @@
+"""Générateur de données SUAPS synthétiques pour les tests de charge.
+
+Les distributions sont apprises sur un export réel : profils des inscrits
+(Type, Sexe, Département, Code étape…), créneaux complets (activité, site,
+jour, horaires, lieu, enseignant… tirés ensemble pour rester cohérents),
+nombre d'inscriptions par personne et réservoirs de prénoms et de noms.
+Les lignes sont générées par blocs vectorisés et écrites au fil de l'eau,
+en CSV ou en Parquet selon l'extension du fichier de sortie.
+
+    python synth_suaps.py --rows 5000000 --output data/synth/synth_ses1.csv
+    python synth_suaps.py --rows 0 --registers 50 --register-dir data/synth
+"""
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from attendance_suaps import MONTHS, PRESENT_STATUSES
+from cube_suaps import WEEKDAYS
+from data_suaps import DATASETS, REGISTRATION_COLUMNS
+
+# Colonnes propres à une personne, tirées ensemble depuis un inscrit réel
+PERSON_COLUMNS = [
+    "Type", "Sexe", "Institution", "Département", "Centre de gestion", "Code étape", "Cohorte",
+]
+
+# Colonnes propres à une inscription (créneau et statut), tirées ensemble depuis une ligne réelle
+SLOT_COLUMNS = [
+    "Calendrier", "Type de calendrier", "Site", "Type d’inscription", "Inscription (semestre)",
+    "Liste (statut inscription)", "Groupement d’activités", "Activité", "Libellé complémentaire",
+    "Niveau", "Jour", "Horaires", "Lieu", "Enseignant", "Activité détaillée",
+]
+
+# Les numéros étudiants générés démarrent après ceux des exports réels
+FIRST_STUDENT_NUMBER = 30_000_000
+
+# Colonnes d'une feuille de présence après les colonnes "Cours n°…"
+REGISTER_TAIL = ["Sexe", "Type d’inscription", "Jour", "Horaires", "Lieu", "Activité",
+                 "Liste (statut inscription)"]
+
+# Feuilles réelles : part des cases vides, puis assiduité et retards parmi les cases remplies
+BLANK_RATE = 0.64
+PRESENCE_ALPHA, PRESENCE_BETA = 2.5, 1.5
+LATE_RATE = 0.04
+
+
+def _weights(series):
+    counts = series.value_counts(dropna=False)
+    return counts.index.to_numpy(), (counts / counts.sum()).to_numpy()
+
+
+class Profile:
+    """Value distributions learned from one registration export.
+
+    Attributes:
+        persons: One row per real person (PERSON_COLUMNS + has_number).
+        slots: One row per real registration (SLOT_COLUMNS).
+        per_person: (values, probabilities) of the registrations per person.
+        first_names, last_names: (values, probabilities) name pools.
+    """
+
+    def __init__(self, persons, slots, per_person, first_names, last_names):
+        self.persons = persons
+        self.slots = slots
+        self.per_person = per_person
+        self.first_names = first_names
+        self.last_names = last_names
+
+    @classmethod
+    def from_export(cls, df):
+        """Learn the distributions of a registration export."""
+        key = df["Adresse de courriel"].fillna(df["Prénom"] + " " + df["Nom de famille"])
+        first = df.assign(_key=key).drop_duplicates("_key")
+        persons = first[PERSON_COLUMNS].reset_index(drop=True)
+        persons["has_number"] = first["Numéro étudiant"].notna().to_numpy()
+        slots = df[SLOT_COLUMNS].reset_index(drop=True)
+        return cls(persons, slots, _weights(key.value_counts()),
+                   _weights(first["Prénom"]), _weights(first["Nom de famille"]))
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_export(pd.read_csv(path))
+
+
+def _slug(values):
+    """Lower-case ASCII e-mail part of a name array."""
+    text = pd.Series(values, dtype="string").str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    return text.str.lower().str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-")
+
+
+def _identities(profile, rng, n, first_number):
+    """Draw n people: profile columns, names, student numbers and e-mails."""
+    persons = profile.persons.iloc[rng.integers(0, len(profile.persons), n)].reset_index(drop=True)
+    first_names = rng.choice(profile.first_names[0], n, p=profile.first_names[1])
+    last_names = rng.choice(profile.last_names[0], n, p=profile.last_names[1])
+    has_number = persons.pop("has_number").to_numpy()
+    numbers = np.where(has_number, first_number + np.arange(n), np.nan)
+
+    last_slug, first_slug = _slug(last_names), _slug(first_names)
+    suffix = pd.Series(numbers - 20_000_000).astype("Int64").astype("string")
+    student_mail = last_slug + ".e" + suffix + "@etud.univ-ubs.fr"
+    staff_mail = first_slug + "." + last_slug + "@univ-ubs.fr"
+    persons["Numéro étudiant"] = numbers
+    persons["Prénom"] = first_names
+    persons["Nom de famille"] = last_names
+    persons["Adresse de courriel"] = student_mail.where(pd.Series(has_number), staff_mail).to_numpy()
+    return persons
+
+
+def generate_chunk(profile, rng, n_people, first_number=FIRST_STUDENT_NUMBER):
+    """Generate the registrations of n_people new people.
+
+    Args:
+        profile: Learned Profile.
+        rng: numpy Generator.
+        n_people: Number of people in the chunk.
+        first_number: Student number of the first person of the chunk.
+
+    Returns:
+        A DataFrame with the 26 REGISTRATION_COLUMNS, one row per registration.
+    """
+    people = _identities(profile, rng, n_people, first_number)
+    per_person = rng.choice(profile.per_person[0], n_people, p=profile.per_person[1])
+    owner = np.repeat(np.arange(n_people), per_person)
+    rows = people.iloc[owner].reset_index(drop=True)
+    slots = profile.slots.iloc[rng.integers(0, len(profile.slots), len(owner))].reset_index(drop=True)
+    return pd.concat([rows, slots], axis=1)[REGISTRATION_COLUMNS]
+
+
+def _schema():
+    return pa.schema([(col, pa.float64() if col == "Numéro étudiant" else pa.string())
+                      for col in REGISTRATION_COLUMNS])
+
+
+def generate(profile, n_rows, output, chunk_rows=250_000, seed=0):
+    """Stream n_rows synthetic registrations to a CSV or Parquet file.
+
+    Args:
+        profile: Learned Profile.
+        n_rows: Number of registrations to write.
+        output: Destination; ".parquet" files are written as Parquet, others as CSV.
+        chunk_rows: Approximate number of rows generated per chunk.
+        seed: Seed of the random generator.
+
+    Returns:
+        The number of rows written.
+    """
+    rng = np.random.default_rng(seed)
+    values, probabilities = profile.per_person
+    people_per_chunk = max(1, int(chunk_rows / float(np.dot(values, probabilities))))
+    parquet = output.endswith(".parquet")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp_path = output + ".tmp"
+    schema = _schema()
+    writer = pq.ParquetWriter(tmp_path, schema, compression="zstd") if parquet else None
+
+    written, first_number = 0, FIRST_STUDENT_NUMBER
+    try:
+        while written < n_rows:
+            chunk = generate_chunk(profile, rng, people_per_chunk, first_number).iloc[:n_rows - written]
+            first_number += people_per_chunk
+            if parquet:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            else:
+                chunk.to_csv(tmp_path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if written == 0 and not parquet:
+        pd.DataFrame(columns=REGISTRATION_COLUMNS).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output)
+    return written
+
+
+def session_dates(jour, horaires, start, n_sessions):
+    """Weekly session datetimes on a given day and start time.
+
+    Args:
+        jour: French weekday name ("lundi"…).
+        horaires: "HH:MM-HH:MM" slot; its start time is used.
+        start: First possible date.
+        n_sessions: Number of sessions.
+    """
+    start = pd.Timestamp(start).normalize()
+    offset = (WEEKDAYS.index(jour.lower()) - start.weekday()) % 7 if jour.lower() in WEEKDAYS else 0
+    hour, minute = (int(part) for part in re.findall(r"\d+", horaires)[:2])
+    first = start + pd.Timedelta(days=offset, hours=hour, minutes=minute)
+    return [first + pd.Timedelta(weeks=i) for i in range(n_sessions)]
+
+
+def session_header(numero, date):
+    """"Cours n°16 du lundi 6 janvier 2025, 17:30" header of a session column."""
+    months = {number: name for name, number in MONTHS.items()}
+    return (f"Cours n°{numero} du {WEEKDAYS[date.weekday()]} {date.day} {months[date.month]} "
+            f"{date.year}, {date:%H:%M}")
+
+
+def generate_register(profile, rng, activity=None, n_students=50, n_sessions=11,
+                      first_session=16, start="2025-01-06", slot=None):
+    """Generate a presence register for one class.
+
+    Args:
+        profile: Learned Profile.
+        rng: numpy Generator.
+        activity: Activité of the class; drawn from the profile when None.
+        n_students: Number of students in the register.
+        n_sessions: Number of "Cours n°…" columns.
+        first_session: Number of the first session.
+        start: Date from which the weekly sessions are scheduled.
+        slot: Row of profile.slots of the class (day, time slot, place…);
+            drawn among the slots of activity when None.
+
+    Returns:
+        A DataFrame in the layout of a presence export.
+    """
+    if slot is None:
+        slots = profile.slots
+        if activity is not None:
+            slots = slots[slots["Activité"] == activity]
+        slot = slots.iloc[rng.integers(0, len(slots))]
+    people = _identities(profile, rng, n_students, FIRST_STUDENT_NUMBER + int(rng.integers(0, 10**6)))
+
+    # Assiduité propre à chaque étudiant, puis statut de chaque case
+    assiduity = rng.beta(PRESENCE_ALPHA, PRESENCE_BETA, (n_students, 1))
+    draws = rng.random((n_students, n_sessions))
+    present = rng.random((n_students, n_sessions)) < assiduity
+    late = rng.random((n_students, n_sessions)) < LATE_RATE
+    statuses = np.where(present, np.where(late, PRESENT_STATUSES[1], PRESENT_STATUSES[0]), "Absent")
+    statuses = np.where(draws < BLANK_RATE, None, statuses).astype(object)
+
+    dates = session_dates(slot["Jour"], slot["Horaires"], start, n_sessions)
+    headers = [session_header(first_session + i, date) for i, date in enumerate(dates)]
+    register = pd.DataFrame({
+        "Prénom": people["Prénom"], "Nom de famille": people["Nom de famille"],
+        "Numéro étudiant_x": people["Numéro étudiant"].astype("Int64"),
+        "Adresse de courriel": people["Adresse de courriel"],
+    })
+    register = pd.concat([register, pd.DataFrame(statuses, columns=headers)], axis=1)
+    register["Sexe"] = people["Sexe"]
+    for col in REGISTER_TAIL[1:]:
+        register[col] = slot[col]
+    return register
+
+
+def register_filename(activity, level, day=None, hours=None):
+    """presence_<activité>_<niveau>.csv name understood by the presence index.
+
+    The activity part keeps the site, day and time slot of the class
+    ("presence_badminton-vannes-jeudi-17-30-19-00_tousniveaux.csv"), so two
+    classes of the same sport get different names.
+    """
+    parts = [part for part in (activity, day, hours) if part is not None and not pd.isna(part)]
+    activity_slug = _slug([" ".join(map(str, parts))]).iloc[0]
+    level_slug = _slug([level]).iloc[0].replace("-", "")
+    return f"presence_{activity_slug}_{level_slug}.csv"
+
+
+def generate_registers(profile, directory, count, seed=0, **kwargs):
+    """Write count presence registers of distinct classes to directory.
+
+    A class is an (Activité, Jour, Horaires, Niveau) slot of the profile; two
+    classes whose names still collide get a numeric suffix before the level
+    ("…-2_tousniveaux.csv").
+
+    Returns:
+        The paths of the written files, all distinct.
+    """
+    rng = np.random.default_rng(seed)
+    classes = profile.slots.drop_duplicates(["Activité", "Jour", "Horaires", "Niveau"])
+    classes = classes.iloc[rng.permutation(len(classes))[:count]]
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for _, slot in classes.iterrows():
+        register = generate_register(profile, rng, slot["Activité"], slot=slot, **kwargs)
+        name = register_filename(slot["Activité"], slot["Niveau"], slot["Jour"], slot["Horaires"])
+        stem, level = name[:-len(".csv")].rsplit("_", 1)
+        path, suffix = os.path.join(directory, name), 2
+        while path in paths:
+            path = os.path.join(directory, f"{stem}-{suffix}_{level}.csv")
+            suffix += 1
+        register.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère des exports SUAPS synthétiques.")
+    parser.add_argument("--source", default=DATASETS["Semestre 1"], help="export réel servant de modèle")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="nombre d'inscriptions à générer")
+    parser.add_argument("--output", default="data/synth/synth_ses1.csv", help="fichier .csv ou .parquet")
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--registers", type=int, default=0, help="nombre de feuilles de présence")
+    parser.add_argument("--register-dir", default="data/synth")
+    parser.add_argument("--register-students", type=int, default=50)
+    parser.add_argument("--register-sessions", type=int, default=11)
+    args = parser.parse_args()
+
+    profile = Profile.from_csv(args.source)
+    if args.rows:
+        written = generate(profile, args.rows, args.output, args.chunk_rows, args.seed)
+        print(f"{written} inscriptions -> {args.output}")
+    if args.registers:
+        paths = generate_registers(profile, args.register_dir, args.registers, args.seed,
+                                   n_students=args.register_students, n_sessions=args.register_sessions)
+        print(f"{len(paths)} feuilles de présence -> {args.register_dir}")
+
+
+if __name__ == "__main__":
+    main()
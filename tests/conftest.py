@@ -0,0 +1,7 @@
+"""Configuration pytest : modules du dépôt importables, chemins relatifs à la racine."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
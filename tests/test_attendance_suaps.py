@@ -0,0 +1,63 @@
+import os
+import shutil
+import threading
+
+from attendance_suaps import PresenceIndex
+
+SHEETS = ["presence_basket_debutant.csv", "presence_basket_confirme.csv"]
+
+
+def _directory(tmp_path):
+    for name in SHEETS:
+        shutil.copy(os.path.join("data", name), tmp_path / name)
+    return PresenceIndex(str(tmp_path)).refresh()
+
+
+def test_reads_while_refreshing(tmp_path):
+    index = _directory(tmp_path)
+    activity = index.entries()["activity"].iloc[0]
+    errors, stop = [], threading.Event()
+
+    def read():
+        try:
+            while not stop.is_set():
+                index.entries()
+                index.find(activity)
+        except Exception as error:  # noqa: BLE001
+            errors.append(error)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    extra = tmp_path / "presence_basket_copie_debutant.csv"
+    for _ in range(30):
+        shutil.copy(tmp_path / SHEETS[0], extra)
+        index.refresh()
+        os.remove(extra)
+        index.refresh()
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
+    assert len(index.entries()) == len(SHEETS)
+
+
+def test_find_returns_every_sheet_of_a_level(tmp_path):
+    index = _directory(tmp_path)
+    entry = index.entries().iloc[0]
+    shutil.copy(entry["path"], tmp_path / "presence_basket_soir_debutant.csv")
+    index.refresh()
+    found = index.find(entry["activity"], entry["level"])
+    assert len(found) == 2
+    assert [item["path"] for item in found] == sorted(item["path"] for item in found)
+
+
+def test_summary_reads_only_selected_sheets(tmp_path):
+    index = _directory(tmp_path)
+    path = index.entries()["path"].iloc[0]
+    summary = index.summary({path})
+    assert len(summary) == 1
+    register = index.register(path)
+    assert summary["students"].iloc[0] == len(register)
+    assert summary["presences"].iloc[0] == register.long["present"].sum()
+    assert len(index.summary()) == len(SHEETS)
@@ -0,0 +1,32 @@
+import os
+import shutil
+
+from bulk_suaps import bulk_import, import_file, presence_target
+
+SHEET = os.path.join("data", "presence_basket_debutant.csv")
+
+
+def test_presence_sheet_is_written_without_leftovers(tmp_path):
+    source = tmp_path / "in" / "basket_debutant.csv"
+    source.parent.mkdir()
+    shutil.copy(SHEET, source)
+    presence_dir = tmp_path / "presence"
+
+    result = import_file(str(source), str(tmp_path / "store"), str(presence_dir))
+
+    assert result["status"] == "ok" and result["kind"] == "presence"
+    assert os.listdir(presence_dir) == ["presence_basket_debutant.csv"]
+    assert presence_target(str(source), str(presence_dir)) == str(presence_dir / "presence_basket_debutant.csv")
+
+
+def test_same_named_exports_conflict(tmp_path):
+    for folder in ("a", "b"):
+        (tmp_path / "in" / folder).mkdir(parents=True)
+        shutil.copy(SHEET, tmp_path / "in" / folder / "basket.csv")
+
+    results = bulk_import(str(tmp_path / "in"), str(tmp_path / "store"), str(tmp_path / "presence"),
+                          workers=1, progress=lambda line: None)
+
+    assert results["status"].tolist() == ["ok", "error"]
+    assert "même nom de fichier" in results["message"].iloc[1]
+    assert os.listdir(tmp_path / "presence") == ["presence_basket.csv"]
@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+
+from cube_suaps import build_cube, read_cube, student_key, update_cube, write_cube
+from data_suaps import load_dataset
+
+
+def _export(rows):
+    return pd.DataFrame(rows, columns=["Numéro étudiant", "Adresse de courriel", "Prénom", "Nom de famille"])
+
+
+def test_student_key_uses_number_then_email_then_name():
+    df = _export([
+        [22400001, "a.e22400001@etud.univ-ubs.fr", "Ana", "Durand"],
+        [None, "a.e22400001@etud.univ-ubs.fr", "Ana", "Durand"],
+        [None, "Jean.Martin@univ-ubs.fr ", "Jean", "Martin"],
+        [None, "jean.martin@univ-ubs.fr", "Jean", "Martin"],
+        [None, None, "Jo", "Doe"],
+        [None, None, " jo", "DOE "],
+    ])
+    keys = student_key(df).tolist()
+    assert keys[0] == keys[1] == 22400001
+    assert keys[2] == keys[3] < 0
+    assert keys[4] == keys[5] < 0
+    assert len({keys[0], keys[2], keys[4]}) == 3
+
+
+def test_anonymous_rows_get_one_key_each():
+    df = _export([[None, None, None, None], [None, "", "  ", ""], [None, None, None, None]])
+    keys = student_key(df, "data/fixed_ses1.csv")
+    assert keys.nunique() == 3
+    assert (keys < 0).all()
+
+
+def test_anonymous_rows_do_not_merge_across_exports():
+    anonymous = _export([[None, None, None, None]])
+    first = student_key(anonymous, "data/fixed_ses1.csv")
+    second = student_key(anonymous, "data/fixed_ses2.csv")
+    assert first.iloc[0] != second.iloc[0]
+    # Même export : la clé est stable d'une lecture à l'autre (store et SQLite)
+    assert student_key(anonymous, "fixed_ses1").iloc[0] == first.iloc[0]
+
+
+def _sorted(cube):
+    frame = cube.to_frame().astype({"a": "string", "b": "string"})
+    return frame.sort_values(["metric", "site", "a", "b"], ignore_index=True)
+
+
+def test_incremental_cube_matches_a_full_rebuild():
+    df = load_dataset("Semestre 1")
+    before, after = df.iloc[:3000], df.iloc[500:].reset_index(drop=True)
+
+    cube = update_cube(build_cube(before), after, added=df.iloc[3000:], removed=df.iloc[:500])
+
+    pd.testing.assert_frame_equal(_sorted(cube), _sorted(build_cube(after)))
+
+
+def test_write_cube_round_trips_without_leftovers(tmp_path):
+    cube = build_cube(load_dataset("Événements"))
+    path = tmp_path / "even.cube.parquet"
+    write_cube(cube, str(path))
+    assert os.listdir(tmp_path) == ["even.cube.parquet"]
+    pd.testing.assert_frame_equal(_sorted(read_cube(str(path))), _sorted(cube))
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import data_suaps
+from data_suaps import cached, clear_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(data_suaps, "CACHE_BUDGET", 2500)
+    for name in ("a", "b"):
+        cached(("test", name), 1, lambda: np.zeros(1000, dtype=np.uint8))
+    cached(("test", "a"), 1, lambda: pytest.fail("a is still cached"))
+    cached(("test", "c"), 1, lambda: np.zeros(1000, dtype=np.uint8))
+
+    assert list(data_suaps._cache) == [("test", "a"), ("test", "c")]
+
+
+def test_stale_fingerprint_reloads():
+    assert cached(("test", "v"), 1, lambda: "old") == "old"
+    assert cached(("test", "v"), 2, lambda: "new") == "new"
+    assert cached(("test", "v"), 2, lambda: "newer") == "new"
+
+
+def test_concurrent_loads_run_once_and_drop_their_locks():
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return np.arange(10)
+
+    threads = [threading.Thread(target=cached, args=(("test", "shared"), 1, load)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert data_suaps._locks == {}
+
+
+def test_failed_load_releases_its_lock():
+    def load():
+        raise ValueError("export illisible")
+
+    with pytest.raises(ValueError):
+        cached(("test", "broken"), 1, load)
+    assert data_suaps._locks == {}
+    assert cached(("test", "broken"), 1, lambda: "ok") == "ok"
@@ -0,0 +1,64 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import db_suaps
+from cube_suaps import build_cube
+from data_suaps import prepare_export, read_export
+
+EXPORT = "data/fixed_even.csv"
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "suaps.db")
+    conn = db_suaps.connect(path, read_only=False)
+    try:
+        db_suaps.ingest_dataframe(conn, "fixed_even", read_export(EXPORT))
+    finally:
+        conn.close()
+    return path
+
+
+def test_counts_match_the_cube(database):
+    cube = build_cube(prepare_export(read_export(EXPORT), EXPORT))
+    with db_suaps.connection(database) as conn:
+        for site in ("Tous", "VANNES"):
+            assert db_suaps.count_people(conn, "fixed_even", site) == cube.people(site)
+            people = db_suaps.count_people(conn, "fixed_even", site, "Type")
+            pd.testing.assert_series_equal(people.sort_index(), cube.people(site, "Type").sort_index(),
+                                           check_names=False, check_dtype=False, check_index_type=False)
+
+
+def test_reingesting_keeps_one_row_per_student(database):
+    conn = db_suaps.connect(database, read_only=False)
+    try:
+        students = conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        db_suaps.ingest_dataframe(conn, "fixed_even", read_export(EXPORT))
+        assert conn.execute("SELECT COUNT(*) FROM students").fetchone()[0] == students
+        registrations = conn.execute("SELECT COUNT(*) FROM registrations").fetchone()[0]
+    finally:
+        conn.close()
+    assert registrations == len(read_export(EXPORT))
+
+
+def test_connections_are_pooled_and_bounded(database, monkeypatch):
+    monkeypatch.setattr(db_suaps, "_pool", {})
+    barrier = threading.Barrier(8)
+
+    def query():
+        with db_suaps.connection(database) as conn:
+            barrier.wait()
+            db_suaps.count_people(conn, "fixed_even")
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(db_suaps._pool[database]) == db_suaps.POOL_SIZE
+    # Une connexion inactive est réutilisée plutôt qu'ouverte
+    with db_suaps.connection(database):
+        assert len(db_suaps._pool[database]) == db_suaps.POOL_SIZE - 1
@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+import pytest
+
+import db_suaps
+import ingest_suaps
+from ingest_suaps import MAX_ERRORS, IngestionManager
+
+EXPORT = "data/fixed_even.csv"
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_suaps, "DATASETS", {"Événements": EXPORT})
+    monkeypatch.setattr(ingest_suaps, "write_search_index", lambda store_dir: None)
+    monkeypatch.setattr(db_suaps, "DB_PATH", str(tmp_path / "suaps.db"))
+    db_suaps.connect(db_suaps.DB_PATH, read_only=False).close()
+    return IngestionManager(str(tmp_path / "store"), "data")
+
+
+def test_run_once_reads_each_export_once(manager, monkeypatch):
+    reads = []
+    read_export = ingest_suaps.read_export
+    monkeypatch.setattr(ingest_suaps, "read_export", lambda path: reads.append(path) or read_export(path))
+
+    results = manager.run_once()
+
+    assert [result["mode"] for result in results] == ["full"]
+    assert reads == [EXPORT]
+    with sqlite3.connect(db_suaps.DB_PATH) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM registrations").fetchone()[0] == results[0]["rows"]
+    # Export inchangé : rien à refaire au passage suivant
+    assert manager.run_once() == []
+    assert reads == [EXPORT]
+
+
+def test_background_errors_are_bounded(manager, monkeypatch):
+    def fail():
+        raise OSError("export verrouillé")
+
+    monkeypatch.setattr(manager, "run_once", fail)
+    manager.start(interval=0.001)
+    deadline = time.monotonic() + 5
+    while manager.status()["runs"] <= MAX_ERRORS and time.monotonic() < deadline:
+        time.sleep(0.01)
+    manager.stop()
+
+    status = manager.status()
+    assert status["runs"] > MAX_ERRORS
+    assert len(status["errors"]) == MAX_ERRORS
+    assert "export verrouillé" in status["errors"][-1]
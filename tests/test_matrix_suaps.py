@@ -0,0 +1,34 @@
+import pandas as pd
+
+from analytics_suaps import Engine, FilterSpec
+from data_suaps import load_dataset
+from matrix_suaps import SlotMatrix
+
+
+def test_matrix_matches_groupby():
+    df = pd.DataFrame({
+        "Site": ["VANNES", "VANNES", "LORIENT", "LORIENT", "VANNES"],
+        "Jour": ["Lundi", "lundi ", "mardi", "Lundi", "mardi"],
+        "Horaires": ["18:00 - 19:30", "18:00 - 19:30", "12:00 - 13:30", "18:00 - 19:30", "12:00 - 13:30"],
+    })
+    matrix = SlotMatrix.from_frame(df)
+    assert matrix.days == ["lundi", "mardi"]
+    assert matrix.slots == ["12:00 - 13:30", "18:00 - 19:30"]
+    assert matrix.matrix().tolist() == [[0, 3], [2, 0]]
+    assert matrix.matrix("VANNES").tolist() == [[0, 2], [1, 0]]
+    assert matrix.matrix("BREST").sum() == 0
+
+
+def test_peaks_rank_the_busiest_slots():
+    df = pd.DataFrame({"Jour": ["lundi", "mardi", "mercredi"], "Horaires": ["10h", "11h", "12h"],
+                       "size": [5, 9, 0]})
+    peaks = SlotMatrix.from_frame(df, size="size").peaks(k=10)
+    assert peaks["Jour"].tolist() == ["mardi", "lundi"]
+    assert peaks["Nombre d'inscriptions"].tolist() == [9, 5]
+
+
+def test_engine_heatmap_peaks_match_the_registrations():
+    df = load_dataset("Semestre 1", ["Jour", "Horaires"])
+    expected = df.groupby(["Jour", "Horaires"], observed=True).size().sort_values(ascending=False)
+    peaks = Engine().query(FilterSpec("Semestre 1"), ["heatmap"]).heatmap().peaks(k=3)
+    assert peaks["Nombre d'inscriptions"].tolist() == expected.head(3).tolist()
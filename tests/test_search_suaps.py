@@ -0,0 +1,36 @@
+import pandas as pd
+
+from search_suaps import STUDENT_TYPE, SearchIndex, fold_text
+
+
+def test_fold_text_drops_accents_case_and_punctuation():
+    folded = fold_text(pd.Series(["Éloïse LE GOFF-Martin", None, "  Cœur d'Œuvre  ", "Cæcilia"]))
+    assert folded.tolist() == ["eloise le goff martin", "", "coeur d oeuvre", "caecilia"]
+
+
+def _index():
+    documents = pd.DataFrame({
+        "Type": [STUDENT_TYPE, STUDENT_TYPE, "Activité", "Lieu"],
+        "Libellé": ["Élodie Le Goff", "Elodie Martin", "Badminton", "Maison de l'Œuvre"],
+        "Détail": ["le-goff.e1@etud.univ-ubs.fr", "martin.e2@etud.univ-ubs.fr", None, None],
+        "Jeux": "Semestre 1",
+        "Inscriptions": [1, 5, 40, 3],
+        "Clé étudiant": pd.array([1, 2, None, None], dtype="Int64"),
+    })
+    return SearchIndex.from_documents(documents)
+
+
+def test_search_ignores_accents_and_ranks_exact_words_first():
+    results = _index().search("elodie goff")
+    assert results["Libellé"].tolist() == ["Élodie Le Goff"]
+
+    results = _index().search("ELODIE")
+    # Deux mots exacts : départage par le nombre d'inscriptions
+    assert results["Libellé"].tolist() == ["Elodie Martin", "Élodie Le Goff"]
+
+
+def test_search_matches_ligatures_and_prefixes():
+    assert _index().search("oeuvre")["Libellé"].tolist() == ["Maison de l'Œuvre"]
+    assert _index().search("ba")["Libellé"].tolist() == ["Badminton"]
+    assert _index().search("mint")["Score"].tolist() == [1]
+    assert _index().search("elodie", kinds=["Activité"]).empty
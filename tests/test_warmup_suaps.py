@@ -0,0 +1,19 @@
+import warmup_suaps
+from warmup_suaps import WarmupScheduler
+
+
+def test_refresh_requeues_only_changed_datasets(monkeypatch):
+    versions = {"Semestre 1": 1, "Semestre 2": 1, "Événements": 1}
+    monkeypatch.setattr(warmup_suaps, "DATASETS", dict.fromkeys(versions, "export.csv"))
+    monkeypatch.setattr(warmup_suaps, "dataset_version", versions.get)
+    monkeypatch.setattr(warmup_suaps, "warm_view", lambda option, site, sqlite=False: 0)
+    scheduler = WarmupScheduler(sites=["Tous"])
+    scheduler.schedule()
+    assert scheduler.wait(5)
+
+    assert scheduler.refresh() == []
+    versions["Semestre 2"] = 2
+    assert scheduler.refresh() == ["Semestre 2"]
+    assert scheduler.wait(5)
+    assert scheduler.status()["total"] == 1
+    assert scheduler.refresh() == []
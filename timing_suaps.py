@@ -0,0 +1,113 @@
+"""Instrumentation des temps d'exécution du tableau de bord.
+
+Chaque exécution du script Streamlit est un run : les étapes chronométrées
+(chargement des données, agrégations, construction des figures, envoi des
+graphiques) y sont enregistrées comme des spans avec leur durée et leur
+nombre de lignes. À la fin du run, une ligne JSON est ajoutée au journal
+SUAPS_TIMING_LOG (logs/timing.jsonl par défaut, vide pour désactiver).
+
+Hors d'un run (scripts, benchmark), span() ne mesure rien.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+
+TIMING_LOG = os.environ.get("SUAPS_TIMING_LOG", "logs/timing.jsonl")
+
+# Streamlit exécute chaque session dans son propre thread
+_local = threading.local()
+_log_guard = threading.Lock()
+
+
+class Run:
+    """Timing spans of one execution of the dashboard script.
+
+    Attributes:
+        id: Short unique identifier, written in every log line.
+        name: Name of the instrumented program.
+        context: Free-form context (dataset, site, section…).
+        spans: Finished spans, in completion order.
+        total_ms: Duration of the run, set by finish_run().
+    """
+
+    def __init__(self, name, **context):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.context = context
+        self.started = time.time()
+        self.spans = []
+        self.total_ms = None
+        self._origin = time.perf_counter()
+        self._stack = []
+
+    def to_record(self):
+        """JSON-serializable summary of the run."""
+        return {
+            "run": self.id,
+            "name": self.name,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "total_ms": self.total_ms,
+            **self.context,
+            "spans": self.spans,
+        }
+
+
+def start_run(name, **context):
+    """Start a run in the current thread, replacing any unfinished one."""
+    run = Run(name, **context)
+    _local.run = run
+    return run
+
+
+def current_run():
+    """Return the run of the current thread, or None."""
+    return getattr(_local, "run", None)
+
+
+@contextlib.contextmanager
+def span(name, **fields):
+    """Time a block of the current run.
+
+    Yields a dict the block can complete, e.g. with record["rows"] = len(df).
+
+    Args:
+        name: Stage name ("load", "aggregate:counts", "chart:heatmap"…).
+        **fields: Extra fields stored with the span.
+    """
+    run = current_run()
+    record = {"name": name, "rows": None, **fields}
+    if run is None:
+        yield record
+        return
+    record["parent"] = run._stack[-1] if run._stack else None
+    run._stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["start_ms"] = round((start - run._origin) * 1000, 3)
+        record["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        run._stack.pop()
+        run.spans.append(record)
+
+
+def finish_run(path=TIMING_LOG):
+    """End the run of the current thread and append it to the JSON-lines log.
+
+    Returns:
+        The finished Run, or None when no run was started.
+    """
+    run = current_run()
+    if run is None:
+        return None
+    _local.run = None
+    run.total_ms = round((time.perf_counter() - run._origin) * 1000, 3)
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        line = json.dumps(run.to_record(), ensure_ascii=False, default=str)
+        with _log_guard, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    return run
@@ -0,0 +1,214 @@
+"""Préchauffage des caches pour toutes les vues jeu de données × site.
+
+Sans préchauffage, le premier utilisateur après un démarrage ou une
+réingestion paie la lecture de l'export et le calcul des agrégats de la vue
+qu'il choisit. Le planificateur parcourt en arrière-plan toutes les vues
+(Semestre 1, Semestre 2, Événements… × Tous, VANNES, LORIENT) :
+
+- chargement du jeu compact, du cube, de l'index des filtres, de l'index
+  de recherche et du parcours vers le jeu suivant (les feuilles de
+  présence ne sont lues qu'à la demande) ;
+- évaluation du lot de métriques des sections, comme le tableau de bord ;
+- tâches supplémentaires enregistrées par l'application (ses propres caches
+  de figures).
+
+Les caches étant propres à chaque processus, le travail se fait dans un
+thread du serveur : les sessions continuent d'être servies, et une session
+qui demande une donnée en cours de calcul attend ce calcul au lieu de le
+refaire (un verrou par clé du cache partagé). L'avancement est lisible par
+status().
+
+Une ingestion faite hors du serveur (`python ingest_suaps.py`, import en
+masse) change la version des jeux de données : les caches ne servent plus
+les anciennes valeurs, et refresh() replanifie les vues des jeux modifiés.
+
+    python warmup_suaps.py          # un passage, temps par vue
+"""
+import threading
+import time
+
+from analytics_suaps import Engine, FilterSpec
+from cube_suaps import ALL_SITES
+from data_suaps import DATASETS, SITE_CHOICES, dataset_version, load_compact, load_cube, load_filter_index
+from journey_suaps import load_transition
+from search_suaps import load_search_index
+from sections_suaps import DATASET_SECTIONS, SECTIONS, section_metrics
+
+
+def views(options=None, sites=SITE_CHOICES):
+    """(option, site) pairs of the dashboard, "Tous" first for each dataset."""
+    return [(option, site) for option in (options or list(DATASETS)) for site in sites]
+
+
+def warm_view(option, site, sqlite=False):
+    """Load and aggregate everything one dashboard view reads.
+
+    Args:
+        option: One of the keys of DATASETS.
+        site: "Tous" or a site name.
+        sqlite: Query the SQLite database instead of the aggregate cube.
+
+    Returns:
+        The number of registrations of the view.
+    """
+    load_compact(option)
+    load_cube(option)
+    load_filter_index(option)
+    results = Engine(sqlite).query(FilterSpec(option, {"Site": site}), section_metrics(DATASET_SECTIONS))
+    for section in DATASET_SECTIONS:
+        SECTIONS[section][1](results)
+    if site == ALL_SITES:
+        load_search_index()
+        others = [name for name in DATASETS if name != option]
+        if others:
+            load_transition(option, others[0])
+    return results.rows()
+
+
+class WarmupScheduler:
+    """Warm every dataset × site view in a background thread.
+
+    Views scheduled while a pass is running are queued once; a view already
+    queued keeps its place.
+
+    Attributes:
+        sites: Sites warmed for each dataset.
+        sqlite: Query the SQLite database instead of the aggregate cube.
+        tasks: Extra callables (option, site) run after warm_view(), e.g.
+            the figure caches of the dashboard.
+        progress: Optional callable receiving one line per warmed view.
+    """
+
+    def __init__(self, sites=SITE_CHOICES, sqlite=False, tasks=(), progress=None):
+        self.sites = list(sites)
+        self.sqlite = sqlite
+        self.tasks = list(tasks)
+        self.progress = progress
+        self._pending = {}
+        # Version de chaque jeu de données à sa dernière planification
+        self._versions = {}
+        self._guard = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+        self._status = {"state": "idle", "done": 0, "total": 0, "current": None, "errors": [],
+                        "seconds": 0.0, "finished": None}
+
+    def schedule(self, options=None):
+        """Queue the views of some datasets (all by default) and start the thread if needed."""
+        versions = {option: dataset_version(option) for option in options or list(DATASETS)}
+        with self._guard:
+            self._versions.update(versions)
+            if self._status["state"] == "idle":
+                self._status.update(done=0, total=0, errors=[], seconds=0.0)
+            for view in views(options, self.sites):
+                if view not in self._pending:
+                    self._pending[view] = None
+                    self._status["total"] += 1
+            self._status["state"] = "running"
+            self._idle.clear()
+            self._wake.set()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="suaps-warmup", daemon=True)
+                self._thread.start()
+
+    def refresh(self):
+        """Queue the datasets whose data changed since they were last scheduled.
+
+        Returns:
+            The options queued again.
+        """
+        with self._guard:
+            seen = dict(self._versions)
+        changed = [option for option in DATASETS if dataset_version(option) != seen.get(option)]
+        if changed:
+            self.schedule(changed)
+        return changed
+
+    def status(self):
+        """Snapshot of the progress: state, done, total, current view, errors, seconds, finished."""
+        with self._guard:
+            return {**self._status, "errors": list(self._status["errors"])}
+
+    def wait(self, timeout=None):
+        """Block until every queued view is warm; return False on timeout."""
+        return self._idle.wait(timeout)
+
+    def _next(self):
+        with self._guard:
+            if not self._pending:
+                self._status.update(state="idle", current=None,
+                                    finished=time.strftime("%Y-%m-%dT%H:%M:%S"))
+                self._wake.clear()
+                self._idle.set()
+                return None
+            view = next(iter(self._pending))
+            del self._pending[view]
+            self._status["current"] = view
+            return view
+
+    def _loop(self):
+        while True:
+            view = self._next()
+            if view is None:
+                self._wake.wait()
+                continue
+            option, site = view
+            started = time.perf_counter()
+            try:
+                rows = warm_view(option, site, self.sqlite)
+                for task in self.tasks:
+                    task(option, site)
+                error = None
+            except Exception as exc:  # une vue en erreur n'empêche pas les suivantes
+                rows, error = None, f"{option} - {site} : {exc!r}"
+            seconds = time.perf_counter() - started
+            with self._guard:
+                self._status["done"] += 1
+                self._status["seconds"] = round(self._status["seconds"] + seconds, 3)
+                if error:
+                    self._status["errors"].append(error)
+                done, total = self._status["done"], self._status["total"]
+            if self.progress:
+                self.progress(f"[{done}/{total}] {option} - {site} : "
+                              + (error or f"{rows} inscriptions en {seconds:.2f} s"))
+
+
+_scheduler = None
+_scheduler_guard = threading.Lock()
+
+
+def start_warmup(sqlite=False, tasks=(), progress=None):
+    """Create the process-wide scheduler and warm every view once; return it.
+
+    Later calls return the running scheduler, after queuing the datasets
+    changed by an ingestion made outside this process (see refresh()).
+    """
+    global _scheduler
+    with _scheduler_guard:
+        if _scheduler is not None:
+            _scheduler.refresh()
+            return _scheduler
+        _scheduler = WarmupScheduler(sqlite=sqlite, tasks=tasks, progress=progress)
+    _scheduler.schedule()
+    return _scheduler
+
+
+def schedule(options=None):
+    """Re-warm the views of some datasets with the process-wide scheduler, if started."""
+    if _scheduler is not None:
+        _scheduler.schedule(options)
+
+
+def main():
+    started = time.perf_counter()
+    scheduler = WarmupScheduler(progress=print)
+    scheduler.schedule()
+    scheduler.wait()
+    status = scheduler.status()
+    print(f"{status['done']} vues en {time.perf_counter() - started:.1f} s, {len(status['errors'])} erreur(s)")
+
+
+if __name__ == "__main__":
+    main()